@@ -0,0 +1,117 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from crReportGenerater import BRD_CHUNK_ROWS, write_brd_pdf
+from textCleaner import clean_brd_text
+
+# No "##" headings: the old renderer's fixed-width cuts can split the markup clean_brd_text turns them into
+DESCRIPTION = """Business objective: reduce manual reconciliation for requirement {iid}.
+{filler}
+Acceptance criteria: {filler}
+"""
+
+FILLER = "The system shall record every change with the user, time and reason for audit purposes. "
+
+
+def make_issues(count):
+    """Requirements with descriptions of a few hundred to a couple of thousand characters."""
+    return [
+        SimpleNamespace(iid=iid, title=f"Requirement {iid}: keep an audit trail of every change", description=DESCRIPTION.format(iid=iid, filler=FILLER * (1 + iid % 12)))
+        for iid in range(1, count + 1)
+    ]
+
+
+def legacy_write_brd_pdf(issues, config, output_file):
+    """The old renderer: one Table for every requirement, text cut into 150 character pieces."""
+    doc = SimpleDocTemplate(output_file, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('Title', parent=styles['Title'], fontSize=18, alignment=1, textColor=colors.HexColor("#333333"))
+    header_style = ParagraphStyle('Header', parent=styles['Heading2'], fontSize=12, alignment=1, textColor=colors.whitesmoke, spaceAfter=10)
+    cell_style = ParagraphStyle('Cell', parent=styles['BodyText'], fontSize=10, alignment=1, textColor=colors.HexColor("#333333"))
+
+    elements.append(Paragraph(f"BR Report for CR {config['CR Number']}", title_style))
+    elements.append(Spacer(1, 12))
+    data = [[Paragraph("<b>Issue ID</b>", header_style), Paragraph("<b>Issue Title</b>", header_style), Paragraph("<b>Issue Description</b>", header_style)]]
+
+    character_limit = 150
+    for issue in issues:
+        clean_description = clean_brd_text(issue.description or "N/A")
+        wrapped_description = "<br/>".join([clean_description[i:i + character_limit] for i in range(0, len(clean_description), character_limit)])
+        wrapped_title = "<br/>".join([issue.title[i:i + character_limit] for i in range(0, len(issue.title), character_limit)])
+        data.append([Paragraph(str(issue.iid), cell_style), Paragraph(wrapped_title, cell_style), Paragraph(wrapped_description, cell_style)])
+
+    data = [data[0]] + data[1:][::-1]
+    table = Table(data, colWidths=[50, 150, 250])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4CAF50")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor("#CCCCCC")),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f9f9f9")),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(table)
+    doc.build(elements)
+
+
+def measure(render, issues, path, trace):
+    """Runs one renderer and returns (seconds, peak MB or None)."""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    render(issues, {"CR Number": 42}, path)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def describe(result):
+    elapsed, peak = result
+    return f"{elapsed:7.1f}s" + (f", peak {peak:7.1f} MB" if peak is not None else "")
+
+
+def main():
+    """Times the single-table BRD renderer against the chunked LongTable one."""
+    parser = argparse.ArgumentParser(description="Benchmark the CR/BRD PDF renderer on synthetic requirements")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Requirement counts to render")
+    parser.add_argument("--chunk-rows", type=int, default=BRD_CHUNK_ROWS, help="Requirements per table chunk")
+    parser.add_argument("--legacy-limit", type=int, default=5000, help="Largest size the single-table renderer is run on")
+    parser.add_argument("--memory", action="store_true", help="Also report peak memory (tracemalloc slows both renderers down)")
+
+    args = parser.parse_args()
+    chunked = lambda issues, config, path: write_brd_pdf(issues, config, path, args.chunk_rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            issues = make_issues(size)
+            if size <= args.legacy_limit:
+                legacy = describe(measure(legacy_write_brd_pdf, issues, os.path.join(tmp, "legacy.pdf"), args.memory))
+            else:
+                legacy = "skipped (--legacy-limit)"
+            result = describe(measure(chunked, issues, os.path.join(tmp, "chunked.pdf"), args.memory))
+            print(f"{size:5d} requirements  single Table: {legacy}  chunked LongTable: {result}")
+
+
+if __name__ == "__main__":
+    main()
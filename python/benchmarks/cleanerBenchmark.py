@@ -0,0 +1,130 @@
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from textCleaner import CleaningDictWriter, clean_text
+
+CELL_SAMPLES = [
+    "N/A",
+    "",
+    "Ready for review",
+    "2024-03-18",
+    "John Smith, Jane Doe",
+    "Priority::High",
+    "<!-- Describe the change below -->\r\nThe login page times out after `30 seconds` when SSO is slow.",
+    "`Insert date here:` `03-18-2024`",
+    "- [x] Web\n- [ ] Mobile\n- [x] API",
+    "- [ ] Not started\n_Waiting on vendor (ACME)_ \\\nEnter Text here",
+    "Plain description text\u00A0with a non-breaking space and no markdown at all.",
+    "<!-- template comment\nspanning lines -->\n`Release 4.2, hotfix`\n_see linked issues_",
+]
+
+
+def legacy_clean_text(text):
+    """The per-cell cleaner the reports ran through df.applymap before textCleaner."""
+    if pd.isna(text):
+        return ""  # Handle NaN values
+
+    text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
+    text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
+    text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
+    checkedCheckboxes = re.findall(r"- \[x\] (.+)", text)  # Extract only checked items
+    text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"_([\w\s()]+)_", r"\1", text)
+    text = re.sub(r"`(\d{2}-\d{2}-\d{4})`", r"\1", text)
+    text = re.sub(r" \\", "", text)
+    text = re.sub(r"Enter Text here","",text, flags=re.IGNORECASE)
+    text = re.sub(r"`([\w\s,]+)`", r"\1", text)
+    if checkedCheckboxes:
+        text = ", ".join(checkedCheckboxes)  # Keep checked items as a comma-separated string
+    else:
+        text = text.strip()
+    return text.strip()
+
+
+def make_cell(rng, row, column):
+    """Odd columns stand in for titles and descriptions, which are unique per row."""
+    cell = rng.choice(CELL_SAMPLES)
+    if column % 2:
+        cell = f"{cell} (#{row})"
+    return cell
+
+
+def make_rows(cells, columns, seed):
+    """Builds report rows with roughly `cells` cells drawn from typical issue and epic fields."""
+    rng = random.Random(seed)
+    fieldnames = [f"Field {i}" for i in range(columns)]
+    rows = [
+        {name: make_cell(rng, row, column) for column, name in enumerate(fieldnames)}
+        for row in range(cells // columns)
+    ]
+    return fieldnames, rows
+
+
+def write_then_clean(rows, fieldnames, path):
+    """The old flow: write the CSV, read it back with pandas, clean every cell and rewrite it."""
+    with open(path, mode="w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    df = pd.read_csv(path, dtype=str)
+    # DataFrame.applymap was renamed to DataFrame.map in pandas 2.1
+    df = df.map(legacy_clean_text) if hasattr(df, "map") else df.applymap(legacy_clean_text)
+    df.to_csv(path, index=False, encoding="utf-8")
+
+
+def clean_while_writing(rows, fieldnames, path):
+    """The new flow: cells are cleaned by the writer, the file is written once."""
+    with open(path, mode="w", newline="", encoding="utf-8") as csv_file:
+        writer = CleaningDictWriter(csv_file, fieldnames, clean_text)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def best_of(fn, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Times the old read-back cleaning against in-stream cleaning and checks both write the same file."""
+    parser = argparse.ArgumentParser(description="Benchmark CSV cleaning on a synthetic report")
+    parser.add_argument("-n", "--cells", type=int, default=50000, help="Number of cells in the report")
+    parser.add_argument("-c", "--columns", type=int, default=20, help="Number of columns in the report")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per flow, the best one is reported")
+    parser.add_argument("-s", "--seed", type=int, default=42, help="Seed for the synthetic cells")
+
+    args = parser.parse_args()
+    fieldnames, rows = make_rows(args.cells, args.columns, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.csv")
+        stream_path = os.path.join(tmp, "stream.csv")
+        legacy = best_of(write_then_clean, args.repeat, rows, fieldnames, legacy_path)
+        stream = best_of(clean_while_writing, args.repeat, rows, fieldnames, stream_path)
+
+        with open(legacy_path, encoding="utf-8") as a, open(stream_path, encoding="utf-8") as b:
+            identical = a.read() == b.read()
+
+    print(f"{len(rows) * len(fieldnames)} cells ({len(rows)} rows x {len(fieldnames)} columns)")
+    print(f"Write, read back and clean with pandas: {legacy:.3f}s")
+    print(f"Clean while writing:                   {stream:.3f}s")
+    print(f"Speedup: {legacy / stream:.1f}x, output identical: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
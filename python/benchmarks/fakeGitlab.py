@@ -0,0 +1,656 @@
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+GROUP_ID = 1
+PROJECT_ID = 1
+# Issues under each epic, and epics in each release chain (the first of every chain is the release epic)
+EPIC_SIZE = 20
+RELEASE_CHAIN = 10
+RELEASES = 5
+# Time between synthetic issues, so 100k issues span about a year
+ISSUE_INTERVAL = timedelta(minutes=5)
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Label every tenth open issue carries, the one the reminder config in gitlabToolsBenchmark.py matches on
+REMINDER_LABEL = "Needs Review"
+
+# Requests allowed per window when the server is not rate limiting, reported in the RateLimit headers
+UNLIMITED = 1000000
+RATE_LIMIT_WINDOW = 60
+# Filtered listings kept so paging through one does not filter the whole project again for every page
+LISTING_CACHE_SIZE = 32
+
+TYPES = ["Requirement", "Bug", "Task", "Story"]
+PRIORITIES = ["High", "Medium", "Low"]
+STATUSES = ["Open", "In Progress", "Review", "Done"]
+LABEL_CHILDREN = ["Open", "InProgress", "Review", "Done"]
+COLORS = ["#cc338b", "#dc143c", "#009966", "#6699cc", "#9400d3", "#808080"]
+
+FILLER = "The system shall record every change with the user, time and reason for audit purposes. "
+
+DESCRIPTION = """## 1. Business Objective
+Reduce manual reconciliation for item {iid}.
+
+## 2. Description
+{filler}
+
+## 3. Module
+{module}
+
+## 4. Design Document
+https://example.com/design/{iid}
+
+## 5. Acceptance Criteria
+{filler}
+"""
+
+
+def api_time(moment):
+    """Formats a datetime the way the GitLab API does, 2024-01-01T00:00:00.000Z"""
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+class FakeGitlabData:
+    '''
+    Synthetic group, project, issues, epics, notes, links and labels
+
+    Everything is derived from the issue count and each item's iid, so 100k issues
+    cost nothing until they are asked for and every run sees the same data. Only
+    the changes tools make (labels set, notes added, project labels edited) are
+    kept, on top of the generated data.
+
+        Parameters:
+            issues: Number of issues in the project
+            labels: Number of labels the project starts with, issues // 10 when None
+    '''
+
+    def __init__(self, issues, labels=None):
+        self.issues = issues
+        self.epics = max(1, -(-issues // EPIC_SIZE))
+        self._lock = threading.Lock()
+        self._issue_changes = {}
+        self._notes = {}
+        self._listings = OrderedDict()
+
+        label_count = issues // 10 if labels is None else labels
+        self.labels = OrderedDict()
+        for index in range(label_count):
+            name = f"Team{index // len(LABEL_CHILDREN)}{LABEL_CHILDREN[index % len(LABEL_CHILDREN)]}"
+            self.labels[name] = self.label(index + 1, name, COLORS[index % len(COLORS)], f"Work in state {LABEL_CHILDREN[index % len(LABEL_CHILDREN)]}", index % 4 or None)
+
+    # Issues
+
+    def has_issue(self, iid):
+        return 1 <= iid <= self.issues
+
+    def issue_labels(self, iid):
+        labels = [
+            f"Type::{TYPES[iid % len(TYPES)]}",
+            f"Priority::{PRIORITIES[iid % len(PRIORITIES)]}",
+            f"Release::{(iid - 1) // (EPIC_SIZE * RELEASE_CHAIN) % RELEASES + 1}",
+            f"CR::{iid % 13}",
+            f"team::Status::{STATUSES[iid % len(STATUSES)]}",
+        ]
+        if iid % 10 == 1:
+            labels.append(REMINDER_LABEL)
+        return labels
+
+    def issue(self, iid):
+        """The issue as the REST API returns it, with any change a tool made applied."""
+        created = BASE_TIME + ISSUE_INTERVAL * iid
+        attributes = {
+            "id": PROJECT_ID * 10000000 + iid, "iid": iid, "project_id": PROJECT_ID,
+            "title": f"Item {iid}: keep an audit trail of every change",
+            "description": DESCRIPTION.format(iid=iid, filler=FILLER * (1 + iid % 8), module=f"Module {iid % 17}"),
+            "state": "closed" if iid % 4 == 0 else "opened",
+            "created_at": api_time(created), "updated_at": api_time(created + timedelta(days=3)),
+            "closed_at": api_time(created + timedelta(days=7)) if iid % 4 == 0 else None, "closed_by": None,
+            "labels": self.issue_labels(iid), "milestone": None,
+            "assignees": [{"id": 2, "username": "assignee", "name": "Assignee", "state": "active"}] if iid % 3 else [],
+            "author": {"id": 1, "username": "author", "name": "Author", "state": "active"},
+            "type": "ISSUE", "user_notes_count": 2, "merge_requests_count": 0, "upvotes": 0, "downvotes": 0,
+            "due_date": (created + timedelta(days=30)).strftime("%Y-%m-%d") if iid % 5 == 0 else None,
+            "confidential": False, "discussion_locked": None, "issue_type": "issue",
+            "web_url": f"https://gitlab.example.com/bench/project/-/issues/{iid}",
+            "time_stats": {"time_estimate": 0, "total_time_spent": 0},
+            "task_completion_status": {"count": 0, "completed_count": 0}, "weight": None,
+            "references": {"short": f"#{iid}", "relative": f"#{iid}", "full": f"bench/project#{iid}"},
+            "severity": "UNKNOWN", "moved_to_id": None,
+        }
+        attributes.update(self._issue_changes.get(iid, {}))
+        return attributes
+
+    def update_issue(self, iid, changes):
+        with self._lock:
+            change = self._issue_changes.setdefault(iid, {})
+            if "labels" in changes:
+                labels = changes["labels"]
+                change["labels"] = [label for label in labels.split(",") if label] if isinstance(labels, str) else list(labels)
+            change["updated_at"] = api_time(now())
+            self._listings.clear()
+        return self.issue(iid)
+
+    def issue_links(self, iid):
+        """Each issue links to the next one under the same epic, except every third."""
+        if iid % 3 == 0 or iid % EPIC_SIZE == 0 or iid >= self.issues:
+            return []
+        return [{**self.issue(iid + 1), "issue_link_id": iid, "link_type": "relates_to"}]
+
+    def list_issues(self, params):
+        '''
+        IIDs of the issues matching a listing's filters, in the order asked for
+
+        Filtering is done on the generated values without building the issues, and
+        the result is kept for the next pages of the same listing.
+        '''
+        key = tuple(sorted((name, value) for name, value in params.items() if name not in ("page", "per_page", "cursor", "pagination")))
+        with self._lock:
+            if key in self._listings:
+                self._listings.move_to_end(key)
+                return self._listings[key]
+
+        state = params.get("state", "all")
+        labels = params.get("labels")
+        wanted = set(labels.split(",")) if labels and labels not in ("Any", "None") else None
+        bounds = {name: params[name][:19] for name in ("created_after", "created_before", "updated_after", "updated_before") if params.get(name)}
+
+        only = params.get("iids[]")
+        candidates = sorted({int(iid) for iid in only.split(",") if iid} & set(range(1, self.issues + 1))) if only else range(1, self.issues + 1)
+        iids = []
+        for iid in candidates:
+            changes = self._issue_changes.get(iid)
+            if state != "all" and ("closed" if iid % 4 == 0 else "opened") != state:
+                continue
+            if wanted is not None or labels == "None" or bounds or changes:
+                issue_labels = changes.get("labels", self.issue_labels(iid)) if changes else self.issue_labels(iid)
+                if wanted is not None and not wanted.issubset(issue_labels):
+                    continue
+                if labels == "None" and issue_labels:
+                    continue
+                created = api_time(BASE_TIME + ISSUE_INTERVAL * iid)[:19]
+                updated = (changes or {}).get("updated_at") or api_time(BASE_TIME + ISSUE_INTERVAL * iid + timedelta(days=3))
+                if not (bounds.get("created_after", "") <= created and created <= bounds.get("created_before", "9999")):
+                    continue
+                if not (bounds.get("updated_after", "") <= updated[:19] and updated[:19] <= bounds.get("updated_before", "9999")):
+                    continue
+            iids.append(iid)
+
+        if params.get("order_by") == "updated_at" and self._issue_changes:
+            iids.sort(key=lambda iid: self.issue(iid)["updated_at"])
+        if params.get("sort", "desc") == "desc":
+            iids.reverse()
+
+        with self._lock:
+            self._listings[key] = iids
+            while len(self._listings) > LISTING_CACHE_SIZE:
+                self._listings.popitem(last=False)
+        return iids
+
+    # Notes
+
+    def notes(self, kind, iid):
+        """A system note and two comments per issue or epic, followed by any a tool added, newest first."""
+        created = BASE_TIME + ISSUE_INTERVAL * iid
+        notes = [
+            {"id": iid * 10 + 1, "body": "changed the description", "system": True, "created_at": api_time(created + timedelta(hours=1))},
+            {"id": iid * 10 + 2, "body": f"Requirements for {iid} reviewed with the business.", "system": False, "created_at": api_time(created + timedelta(hours=2))},
+            {"id": iid * 10 + 3, "body": f"Design for {iid} is ready, see the linked document.", "system": False, "created_at": api_time(created + timedelta(hours=3))},
+        ]
+        notes += [dict(note) for note in self._notes.get((kind, iid), [])]
+        for note in notes:
+            note.update({"author": {"id": 1, "username": "author", "name": "Author"}, "noteable_iid": iid, "type": None, "resolvable": False})
+        return notes[::-1]
+
+    def add_note(self, kind, iid, body):
+        with self._lock:
+            added = self._notes.setdefault((kind, iid), [])
+            note = {"id": 10 ** 9 + len(added), "body": body, "system": False, "created_at": api_time(now())}
+            added.append(note)
+        return dict(note, author={"id": 1, "username": "author", "name": "Author"}, noteable_iid=iid)
+
+    # Epics
+
+    def epic_id(self, iid):
+        return GROUP_ID * 10000000 + iid
+
+    def epic_iid(self, epic_id):
+        """Epic notes are addressed by the epic's id, everything else by its iid."""
+        return epic_id - GROUP_ID * 10000000 if epic_id > GROUP_ID * 10000000 else epic_id
+
+    def has_epic(self, iid):
+        return 1 <= iid <= self.epics
+
+    def epic(self, iid):
+        created = BASE_TIME + ISSUE_INTERVAL * (iid - 1) * EPIC_SIZE
+        release = (iid - 1) // RELEASE_CHAIN % RELEASES + 1
+        kind = "Release" if iid % RELEASE_CHAIN == 1 else "Epic"
+        return {
+            "id": self.epic_id(iid), "iid": iid, "group_id": GROUP_ID,
+            "title": f"{kind} {iid}", "description": DESCRIPTION.format(iid=iid, filler=FILLER * 2, module=f"Module {iid % 17}"),
+            "state": "opened", "labels": [f"Type::{kind}", f"Release::{release}", f"Priority::{PRIORITIES[iid % len(PRIORITIES)]}"],
+            "author": {"id": 1, "username": "author", "name": "Author", "state": "active"},
+            "start_date": (created + timedelta(days=1)).strftime("%Y-%m-%d") if iid % 2 else None,
+            "end_date": (created + timedelta(days=60)).strftime("%Y-%m-%d") if iid % 3 else None,
+            "created_at": api_time(created), "updated_at": api_time(created + timedelta(days=5)),
+            "closed_at": None, "web_url": f"https://gitlab.example.com/groups/bench/-/epics/{iid}",
+            "references": {"short": f"&{iid}", "relative": f"&{iid}", "full": f"bench&{iid}"},
+        }
+
+    def related_epics(self, iid):
+        """Every epic of a release chain relates to the next one, so the walk from a release epic goes deep."""
+        if iid % RELEASE_CHAIN == 0 or iid >= self.epics:
+            return []
+        return [{**self.epic(iid + 1), "related_epic_link_id": iid, "link_type": "relates_to"}]
+
+    def epic_issues(self, iid):
+        first = (iid - 1) * EPIC_SIZE + 1
+        return [{**self.issue(child), "epic_issue_id": child} for child in range(first, min(first + EPIC_SIZE, self.issues + 1))]
+
+    # Project labels
+
+    def label(self, label_id, name, color, description, priority):
+        return {
+            "id": label_id, "name": name, "color": color, "text_color": "#FFFFFF", "description": description,
+            "description_html": description, "priority": priority, "is_project_label": True,
+            "open_issues_count": 0, "closed_issues_count": 0, "open_merge_requests_count": 0, "subscribed": False,
+        }
+
+    def save_label(self, name, fields, create):
+        with self._lock:
+            if create == (name in self.labels):
+                return None
+            current = self.labels.get(name) or self.label(len(self.labels) + 100000, name, "#808080", "", None)
+            for field in ("color", "description"):
+                if field in fields:
+                    current[field] = fields[field]
+            if "priority" in fields:
+                current["priority"] = int(fields["priority"]) if str(fields["priority"]).isdigit() else None
+            self.labels[name] = current
+            return current
+
+    def delete_label(self, name):
+        with self._lock:
+            return self.labels.pop(name, None)
+
+
+def paginate(items, params, url, keyset=False):
+    '''
+    Cuts one page out of a listing and builds the pagination headers GitLab sends
+
+    Offset pagination gets Link first/prev/next/last and the X-Page family of
+    headers. Keyset pagination, asked for with pagination=keyset, only gets a
+    next link carrying a cursor, as GitLab does.
+
+        Returns:
+            page_items, headers
+    '''
+    per_page = min(max(int(params.get("per_page", 20)), 1), 100)
+    if keyset:
+        start = int(params.get("cursor", 0))
+        page_items = items[start:start + per_page]
+        headers = {}
+        if start + per_page < len(items):
+            headers["Link"] = f'<{url}?{urlencode({**params, "cursor": start + per_page})}>; rel="next"'
+        return page_items, headers
+
+    page = max(int(params.get("page", 1)), 1)
+    total_pages = max(1, -(-len(items) // per_page))
+    page_items = items[(page - 1) * per_page:page * per_page]
+    links = {"first": 1, "last": total_pages}
+    if page > 1:
+        links["prev"] = page - 1
+    if page < total_pages:
+        links["next"] = page + 1
+    headers = {
+        "Link": ", ".join(f'<{url}?{urlencode({**params, "page": number, "per_page": per_page})}>; rel="{rel}"' for rel, number in links.items()),
+        "X-Page": str(page), "X-Per-Page": str(per_page), "X-Total": str(len(items)), "X-Total-Pages": str(total_pages),
+        "X-Next-Page": str(page + 1) if page < total_pages else "", "X-Prev-Page": str(page - 1) if page > 1 else "",
+    }
+    return page_items, headers
+
+
+class FakeGitlabHandler(BaseHTTPRequestHandler):
+    """Answers the REST calls of the report, reminder and label tools from the server's FakeGitlabData."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled sessions reuse their connections as they would with GitLab
+    # Headers and body go out in separate writes, with Nagle on every keep-alive response would wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", r"/projects/(\d+)", "get_project"),
+        ("GET", r"/projects/(\d+)/issues", "list_issues"),
+        ("GET", r"/projects/(\d+)/issues/(\d+)", "get_issue"),
+        ("PUT", r"/projects/(\d+)/issues/(\d+)", "update_issue"),
+        ("GET", r"/projects/(\d+)/issues/(\d+)/notes", "list_issue_notes"),
+        ("POST", r"/projects/(\d+)/issues/(\d+)/notes", "add_issue_note"),
+        ("GET", r"/projects/(\d+)/issues/(\d+)/links", "list_issue_links"),
+        ("GET", r"/projects/(\d+)/labels", "list_labels"),
+        ("POST", r"/projects/(\d+)/labels", "create_label"),
+        ("PUT", r"/projects/(\d+)/labels/([^/]+)", "update_label"),
+        ("DELETE", r"/projects/(\d+)/labels/([^/]+)", "delete_label"),
+        ("PUT", r"/projects/(\d+)/labels/([^/]+)/promote", "promote_label"),
+        ("GET", r"/groups/(\d+)", "get_group"),
+        ("GET", r"/groups/(\d+)/epics", "list_epics"),
+        ("GET", r"/groups/(\d+)/epics/(\d+)", "get_epic"),
+        ("GET", r"/groups/(\d+)/epics/(\d+)/notes", "list_epic_notes"),
+        ("GET", r"/groups/(\d+)/epics/(\d+)/epics", "list_child_epics"),
+        ("GET", r"/groups/(\d+)/epics/(\d+)/related_epics", "list_related_epics"),
+        ("GET", r"/groups/(\d+)/epics/(\d+)/issues", "list_epic_issues"),
+    ]
+
+    def log_message(self, format, *args):
+        """Requests are counted, not logged."""
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        query = parse_qsl(url.query)
+        self.params = dict(query)
+        if "iids[]" in self.params:
+            # Array parameters repeat their key, kept as one comma separated value
+            self.params["iids[]"] = ",".join(value for name, value in query if name == "iids[]")
+        self.url = f"http://{self.headers.get('Host')}{url.path}"
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.parse_body(self.rfile.read(length)) if length else {}
+
+        status, retry_after = self.server.admit()
+        if status == 429:
+            self.respond(429, {"message": "429 Too Many Requests"}, {"Retry-After": str(retry_after)})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        path = unquote(url.path)
+        if not path.startswith("/api/v4/"):
+            self.respond(404, {"message": "404 Not Found"})
+            return
+        for route_method, pattern, name in self.ROUTES:
+            match = re.fullmatch(pattern, path[len("/api/v4"):])
+            if match and route_method == method:
+                try:
+                    getattr(self, name)(*match.groups())
+                except (KeyError, ValueError) as e:
+                    self.respond(400, {"message": f"400 Bad request - {e}"})
+                except Exception as e:
+                    self.respond(500, {"message": f"500 Internal Server Error - {e}"})
+                return
+        self.respond(404, {"message": "404 Not Found"})
+
+    def parse_body(self, raw):
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(raw or b"{}")
+        return dict(parse_qsl(raw.decode()))
+
+    def respond(self, status, payload=None, headers=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        headers = dict(headers or {})
+        if self.command == "GET" and status == 200:
+            etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in {**self.server.rate_limit_headers(), **headers}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond_page(self, items, keyset=False):
+        page_items, headers = paginate(items, self.params, self.url, keyset)
+        self.respond(200, page_items, headers)
+
+    def not_found(self):
+        self.respond(404, {"message": "404 Not Found"})
+
+    def data(self, project_id=None, group_id=None):
+        """The data set, or None when the request is for a project or group the server does not have."""
+        if project_id is not None and int(project_id) != PROJECT_ID:
+            return None
+        if group_id is not None and int(group_id) != GROUP_ID:
+            return None
+        return self.server.data
+
+    # Projects and issues
+
+    def get_project(self, project_id):
+        if not self.data(project_id=project_id):
+            return self.not_found()
+        self.respond(200, {"id": PROJECT_ID, "name": "project", "path": "project", "path_with_namespace": "bench/project", "web_url": "https://gitlab.example.com/bench/project"})
+
+    def list_issues(self, project_id):
+        data = self.data(project_id=project_id)
+        if not data:
+            return self.not_found()
+        iids = data.list_issues(self.params)
+        page_iids, headers = paginate(iids, self.params, self.url, self.params.get("pagination") == "keyset")
+        self.respond(200, [data.issue(iid) for iid in page_iids], headers)
+
+    def get_issue(self, project_id, iid):
+        data = self.data(project_id=project_id)
+        if not data or not data.has_issue(int(iid)):
+            return self.not_found()
+        self.respond(200, data.issue(int(iid)))
+
+    def update_issue(self, project_id, iid):
+        data = self.data(project_id=project_id)
+        if not data or not data.has_issue(int(iid)):
+            return self.not_found()
+        self.respond(200, data.update_issue(int(iid), self.body))
+
+    def list_issue_notes(self, project_id, iid):
+        data = self.data(project_id=project_id)
+        if not data or not data.has_issue(int(iid)):
+            return self.not_found()
+        self.respond_page(data.notes("issue", int(iid)))
+
+    def add_issue_note(self, project_id, iid):
+        data = self.data(project_id=project_id)
+        if not data or not data.has_issue(int(iid)):
+            return self.not_found()
+        self.respond(201, data.add_note("issue", int(iid), self.body["body"]))
+
+    def list_issue_links(self, project_id, iid):
+        data = self.data(project_id=project_id)
+        if not data or not data.has_issue(int(iid)):
+            return self.not_found()
+        self.respond(200, data.issue_links(int(iid)))
+
+    # Labels
+
+    def list_labels(self, project_id):
+        data = self.data(project_id=project_id)
+        if not data:
+            return self.not_found()
+        self.respond_page(list(data.labels.values()))
+
+    def create_label(self, project_id):
+        data = self.data(project_id=project_id)
+        if not data:
+            return self.not_found()
+        label = data.save_label(self.body["name"], self.body, create=True)
+        if label is None:
+            return self.respond(409, {"message": "Label already exists"})
+        self.respond(201, label)
+
+    def update_label(self, project_id, name):
+        data = self.data(project_id=project_id)
+        label = data and data.save_label(name, self.body, create=False)
+        if not label:
+            return self.not_found()
+        self.respond(200, label)
+
+    def delete_label(self, project_id, name):
+        data = self.data(project_id=project_id)
+        if not data or not data.delete_label(name):
+            return self.not_found()
+        self.respond(204)
+
+    def promote_label(self, project_id, name):
+        data = self.data(project_id=project_id)
+        if not data or name not in data.labels:
+            return self.not_found()
+        self.respond(200, {**data.labels[name], "is_project_label": False})
+
+    # Groups and epics
+
+    def get_group(self, group_id):
+        if not self.data(group_id=group_id):
+            return self.not_found()
+        self.respond(200, {"id": GROUP_ID, "name": "bench", "path": "bench", "full_path": "bench", "web_url": "https://gitlab.example.com/groups/bench"})
+
+    def list_epics(self, group_id):
+        data = self.data(group_id=group_id)
+        if not data:
+            return self.not_found()
+        iids = list(range(data.epics, 0, -1)) if self.params.get("sort", "desc") == "desc" else list(range(1, data.epics + 1))
+        page_iids, headers = paginate(iids, self.params, self.url)
+        self.respond(200, [data.epic(iid) for iid in page_iids], headers)
+
+    def get_epic(self, group_id, iid):
+        data = self.data(group_id=group_id)
+        if not data or not data.has_epic(int(iid)):
+            return self.not_found()
+        self.respond(200, data.epic(int(iid)))
+
+    def list_epic_notes(self, group_id, epic_id):
+        data = self.data(group_id=group_id)
+        iid = data and data.epic_iid(int(epic_id))
+        if not data or not data.has_epic(iid):
+            return self.not_found()
+        self.respond_page(data.notes("epic", iid))
+
+    def list_child_epics(self, group_id, iid):
+        data = self.data(group_id=group_id)
+        if not data or not data.has_epic(int(iid)):
+            return self.not_found()
+        self.respond_page([])
+
+    def list_related_epics(self, group_id, iid):
+        data = self.data(group_id=group_id)
+        if not data or not data.has_epic(int(iid)):
+            return self.not_found()
+        self.respond(200, data.related_epics(int(iid)))
+
+    def list_epic_issues(self, group_id, iid):
+        data = self.data(group_id=group_id)
+        if not data or not data.has_epic(int(iid)):
+            return self.not_found()
+        self.respond_page(data.epic_issues(int(iid)))
+
+
+class FakeGitlabServer(ThreadingHTTPServer):
+    '''
+    Local stand-in for the GitLab REST API, serving a FakeGitlabData set
+
+    Every response carries RateLimit headers. With a rate limit, requests over the
+    limit in a window get a 429 with Retry-After, as gitlab.com does. Requests are
+    counted, so a benchmark can report how many calls a tool made.
+
+        Parameters:
+            data: FakeGitlabData to serve
+            port: Port to listen on, 0 for any free port
+            latency: Seconds added to every response
+            rate_limit: Requests allowed per window, 0 for no limit
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, data, port=0, latency=0.0, rate_limit=0):
+        super().__init__(("127.0.0.1", port), FakeGitlabHandler)
+        self.data = data
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self):
+        """Counts a request against the window, returning (429, retry after) when it is over the limit."""
+        with self._lock:
+            self.requests += 1
+            current = time.time()
+            if current - self._window_start >= RATE_LIMIT_WINDOW:
+                self._window_start = current
+                self._window_requests = 0
+            self._window_requests += 1
+            if self.rate_limit and self._window_requests > self.rate_limit:
+                self.throttled += 1
+                return 429, int(self._window_start + RATE_LIMIT_WINDOW - current) + 1
+            return 200, None
+
+    def rate_limit_headers(self):
+        limit = self.rate_limit or UNLIMITED
+        with self._lock:
+            return {
+                "RateLimit-Limit": str(limit),
+                "RateLimit-Observed": str(self._window_requests),
+                "RateLimit-Remaining": str(max(0, limit - self._window_requests)),
+                "RateLimit-Reset": str(int(self._window_start + RATE_LIMIT_WINDOW)),
+            }
+
+    def start(self):
+        """Serves on a background thread, returning the server."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    """Runs the fake GitLab in the foreground, for pointing the tools at it by hand with GITLAB_URL."""
+    parser = argparse.ArgumentParser(description="Serve a synthetic GitLab project and group on localhost")
+    parser.add_argument("-n", "--issues", type=int, default=1000, help="Number of issues in the project")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Milliseconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=0, help=f"Requests allowed per {RATE_LIMIT_WINDOW}s window, 0 for no limit")
+
+    args = parser.parse_args()
+    server = FakeGitlabServer(FakeGitlabData(args.issues), args.port, args.latency_ms / 1000, args.rate_limit)
+    print(f"Serving {args.issues} issues and {server.data.epics} epics, run the tools with GITLAB_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.requests} requests served, {server.throttled} throttled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import yaml
+from fakeGitlab import GROUP_ID, PROJECT_ID, REMINDER_LABEL, FakeGitlabData, FakeGitlabServer
+
+TOOLS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Report window covering every synthetic issue and epic
+FROM_DATE = "01-01-2024"
+TO_DATE = "12-31-2026"
+
+# Command line of each tool, run from a scratch directory holding the config files written below
+TOOLS = {
+    "issueReportGenerater": ["-p", str(PROJECT_ID), "-fd", FROM_DATE, "-td", TO_DATE, "-l", "Type::Requirement", "-o", "bench"],
+    "epicsReportGenerater": ["-g", str(GROUP_ID), "-o", "bench"],
+    "relatedLinksReport": ["-g", str(GROUP_ID), "-n", "1", "-o", "bench"],
+    "gitlabIssuesChecker": [],
+    "gitlabLabelActions": [],
+}
+
+
+def labels_config(data):
+    """Label groups that leave most of the project's labels unchanged, update some, create new ones and delete a few."""
+    teams = len(data.labels) // 4
+    labels = []
+    for team in range(teams + max(1, teams // 10)):
+        children = [{"name": name, "description": f"Work in state {name}", "priority": index or None} for index, name in enumerate(["Open", "InProgress", "Review", "Done"])]
+        if team % 5 == 0:
+            children[0]["description"] = "Work not started yet"
+        labels.append({"name": f"Team{team}", "projectNumber": PROJECT_ID, "color": ["#cc338b", "#6699cc"][team % 2], "children": children})
+    delete = [{"name": f"Team{team}Done", "projectNumber": PROJECT_ID} for team in range(0, teams, 20)]
+    return {"labels": labels, "deleteLabels": delete}
+
+
+def write_configs(data, directory):
+    """Writes the config files the tools read from their working directory."""
+    os.makedirs(os.path.join(directory, "config"))
+    os.makedirs(os.path.join(directory, "Reports", "Issues"))
+    configs = {
+        "report.yaml": {"labels": ["Type::"], "fromDate": FROM_DATE, "toDate": TO_DATE, "state": None},
+        "issuesConfig.yaml": {"projects": [{
+            "projectId": PROJECT_ID,
+            "labelTag": "Reminder Sent",
+            "labels": [{"name": REMINDER_LABEL, "firstReminderDate": 3, "secondReminderDate": 5, "firstComment": "Please update this issue", "secondComment": "Reminder: please update this issue"}],
+        }]},
+        "labelsConfig.yaml": labels_config(data),
+    }
+    for name, config in configs.items():
+        with open(os.path.join(directory, "config", name), "w", encoding="utf-8") as file:
+            yaml.safe_dump(config, file, sort_keys=False)
+
+
+def run_tool(tool, server, directory):
+    '''
+    Runs one tool against the fake GitLab and measures it
+
+    The tool runs in its own process, so its peak RSS comes from the kernel's
+    accounting for that child alone, with nothing of this process mixed in.
+
+        Returns:
+            (exit code, seconds, requests, peak RSS in MB)
+    '''
+    env = {**os.environ, "GITLAB_URL": server.url}
+    command = [sys.executable, os.path.join(TOOLS_DIR, f"{tool}.py"), "-t", "benchmark-token", *TOOLS[tool]]
+    requests_before = server.requests
+    start = time.perf_counter()
+    with open(os.path.join(directory, f"{tool}.log"), "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    return os.waitstatus_to_exitcode(status), elapsed, server.requests - requests_before, usage.ru_maxrss / 1024
+
+
+def log_tail(directory, tool, lines=5):
+    with open(os.path.join(directory, f"{tool}.log"), encoding="utf-8", errors="replace") as log:
+        return "".join(log.readlines()[-lines:])
+
+
+def main():
+    """Times the GitLab tools against a local fake GitLab at several data set sizes."""
+    parser = argparse.ArgumentParser(description="Benchmark the report, reminder and label tools offline against a fake GitLab")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Issues in the synthetic project")
+    parser.add_argument("--tools", nargs="+", choices=list(TOOLS), default=list(TOOLS), help="Tools to run")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Milliseconds the fake GitLab adds to every response")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests the fake GitLab allows per minute, 0 for no limit")
+    parser.add_argument("--keep", action="store_true", help="Keep each run's directory with its reports and log")
+
+    args = parser.parse_args()
+    print(f"{'issues':>7}  {'tool':<22} {'wall':>9} {'requests':>9} {'peak RSS':>10}")
+    for size in args.sizes:
+        for tool in args.tools:
+            # A fresh data set per tool, so changes the reminder and label tools make are not seen by the next one
+            data = FakeGitlabData(size)
+            server = FakeGitlabServer(data, latency=args.latency_ms / 1000, rate_limit=args.rate_limit).start()
+            directory = tempfile.mkdtemp(prefix=f"{tool}_{size}_")
+            try:
+                write_configs(data, directory)
+                code, elapsed, requests, peak = run_tool(tool, server, directory)
+            finally:
+                server.stop()
+            result = f"{size:7d}  {tool:<22} {elapsed:8.1f}s {requests:9d} {peak:7.1f} MB"
+            if server.throttled:
+                result += f"  ({server.throttled} throttled)"
+            if code:
+                result += f"  exit {code}:\n{log_tail(directory, tool)}"
+            print(result, flush=True)
+            if args.keep:
+                print(f"         kept {directory}")
+            else:
+                shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
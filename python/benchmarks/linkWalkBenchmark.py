@@ -0,0 +1,179 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from relatedLinksReport import compact_issue, extract_all_headers, extract_labels, iter_linked_rows
+
+DESCRIPTION = """## 1. Business Objective
+Reduce manual reconciliation for release {iid}.
+
+## 2. Description
+{filler}
+
+## 3. Module
+Billing
+
+## 4. Design Document
+https://example.com/design/{iid}
+
+## 5. Acceptance Criteria
+{filler}
+"""
+
+FILLER = "The system shall record every change with the user, time and reason for audit purposes. " * 8
+
+
+def make_attributes(project_id, iid):
+    """An issue shaped like a GitLab REST response, with a description of a couple of KB."""
+    return {
+        "id": project_id * 1000000 + iid, "iid": iid, "project_id": project_id,
+        "title": f"Release item {iid}", "description": DESCRIPTION.format(iid=iid, filler=FILLER),
+        "state": "opened", "created_at": "2024-01-01T00:00:00.000Z", "updated_at": "2024-03-01T00:00:00.000Z",
+        "closed_at": None, "closed_by": None, "labels": ["Type::Requirement", f"Release::{iid % 7}", f"CR::{iid % 13}", "Priority::High"],
+        "milestone": None, "assignees": [], "author": {"id": 1, "username": "author", "name": "Author", "state": "active"},
+        "type": "ISSUE", "assignee": None, "user_notes_count": 3, "merge_requests_count": 0, "upvotes": 0,
+        "downvotes": 0, "due_date": None, "confidential": False, "discussion_locked": None, "issue_type": "issue",
+        "web_url": f"https://gitlab.com/group/project/-/issues/{iid}", "time_stats": {"time_estimate": 0, "total_time_spent": 0},
+        "task_completion_status": {"count": 0, "completed_count": 0}, "weight": None, "blocking_issues_count": 0,
+        "has_tasks": False, "references": {"short": f"#{iid}", "relative": f"#{iid}", "full": f"group/project#{iid}"},
+        "severity": "UNKNOWN", "moved_to_id": None, "service_desk_reply_to": None,
+    }
+
+
+def make_links(nodes, seed, block=1000, chain=3000):
+    """Release-like link trees of `block` issues with a few cross links, and one long chain so the walk goes deep."""
+    rng = random.Random(seed)
+    links = {}
+    for index, node in enumerate(nodes):
+        start = index - index % block
+        end = min(start + block, len(nodes))
+        first_child = start + (index - start) * 3 + 1
+        refs = [nodes[child] for child in range(first_child, min(first_child + 3, end))]
+        if rng.random() < 0.2:
+            refs.append(nodes[rng.randrange(start, end)])
+        links[node] = refs
+
+    tail = nodes[-chain:]
+    for node, next_node in zip(tail, tail[1:]):
+        links[node] = [next_node]
+    links[tail[-1]] = []
+    return {node: [{"project_id": p, "iid": i} for p, i in refs] for node, refs in links.items()}
+
+
+def legacy_report(nodes, links, output):
+    """The old flow: full attribute dicts per node and a recursive walk into a list of rows."""
+    all_issues = []
+    for project_id, iid in nodes:
+        issue_data = make_attributes(project_id, iid).copy()
+        issue_data["_links_to"] = links[(project_id, iid)]
+        all_issues.append(issue_data)
+
+    issue_lookup = {f"{i['project_id']}:{i['iid']}": i for i in all_issues}
+    visited = set()
+    all_headers = set()
+    all_rows = []
+
+    def walk_and_collect(issue, depth=0):
+        issue_key = f"{issue['project_id']}:{issue['iid']}"
+        if issue_key in visited:
+            return
+        visited.add(issue_key)
+
+        label_data = extract_labels(issue)
+        extracted_fields = extract_all_headers(issue.get("description", ""))
+        all_headers.update(extracted_fields.keys())
+
+        all_rows.append({
+            "Issue ID": f"{'→' * depth} {issue['iid']}" if depth > 0 else issue["iid"],
+            "Depth": depth,
+            "Issue Title": issue['title'],
+            "Release #": label_data["Release"],
+            "CR #": label_data["CR"],
+            **extracted_fields
+        })
+
+        for linked_ref in issue.get("_links_to", []):
+            linked_issue = issue_lookup.get(f"{linked_ref['project_id']}:{linked_ref['iid']}")
+            if linked_issue:
+                walk_and_collect(linked_issue, depth + 1)
+
+    for issue in all_issues:
+        walk_and_collect(issue)
+
+    fieldnames = ["Issue ID", "Depth", "Issue Title", "Release #", "CR #"] + sorted(all_headers)
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(all_rows)
+
+
+def compact_report(nodes, links, output):
+    """The new flow: IssueRecords per node and rows streamed from an explicit-stack walk."""
+    all_issues = [compact_issue(make_attributes(project_id, iid), links[(project_id, iid)]) for project_id, iid in nodes]
+
+    all_headers = set()
+    for issue in all_issues:
+        all_headers.update(issue.fields.keys())
+
+    fieldnames = ["Issue ID", "Depth", "Issue Title", "Release #", "CR #"] + sorted(all_headers)
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(iter_linked_rows(all_issues))
+
+
+def measure(report, nodes, links):
+    """Runs one flow under tracemalloc and returns (peak MB, seconds)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, mode="w", newline="", encoding="utf-8") as output:
+        report(nodes, links, output)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed
+
+
+def measure_recursive(report, nodes, links):
+    """The recursive walk needs a raised recursion limit and a large thread stack to finish at all."""
+    result = {}
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(nodes) * 2 + 1000)
+    threading.stack_size(1024 * 1024 * 1024)
+    thread = threading.Thread(target=lambda: result.update(value=measure(report, nodes, links)))
+    thread.start()
+    thread.join()
+    threading.stack_size(0)
+    sys.setrecursionlimit(limit)
+    return result.get("value")
+
+
+def main():
+    """Measures peak memory of the release report walk on a synthetic link graph, before and after."""
+    parser = argparse.ArgumentParser(description="Benchmark the release report link walk on a synthetic graph")
+    parser.add_argument("-n", "--nodes", type=int, default=100000, help="Number of issues in the graph")
+    parser.add_argument("-s", "--seed", type=int, default=42, help="Seed for the synthetic links")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only run the compact walk")
+
+    args = parser.parse_args()
+    nodes = [(project_id, iid) for iid in range(1, args.nodes // 5 + 1) for project_id in range(1, 6)]
+    links = make_links(nodes, args.seed)
+    print(f"{len(nodes)} issues, {sum(len(refs) for refs in links.values())} links")
+
+    if not args.skip_legacy:
+        legacy = measure_recursive(legacy_report, nodes, links)
+        if legacy:
+            print(f"Full dicts, recursive walk:      peak {legacy[0]:8.1f} MB in {legacy[1]:.1f}s")
+        else:
+            print("Full dicts, recursive walk:      failed (recursion)")
+
+    compact = measure(compact_report, nodes, links)
+    print(f"IssueRecords, explicit stack:    peak {compact[0]:8.1f} MB in {compact[1]:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
-import gitlab
 import argparse
-import re
-import pandas as pd
+import multiprocessing
+import time
 import yaml
-from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from reportQuery import build_issue_query, cr_label, iter_items, matches_params
+from reportCache import DEFAULT_CACHE_PATH, ReportCache
+from reportFanout import DEFAULT_MAX_TARGETS, fan_out
+from textCleaner import clean_brd_text
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import Flowable, LongTable, SimpleDocTemplate, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 def load_config():
     """Load YAML config for filtering labels and date range."""
@@ -15,171 +21,300 @@ def load_config():
         return yaml.safe_load(file)
 
 
-def get_issues_details(gl, project_id, config):
+REQUIREMENT_LABEL = "Type::Requirement"
+
+CR_LABEL_PREFIX = "CR::"
+
+# A requirement as sent to a PDF worker process, python-gitlab objects hold the client and do not pickle
+BrdRequirement = namedtuple("BrdRequirement", ["iid", "title", "description"])
+
+
+def brd_labels(config):
+    """The CR label and the requirement label every issue in the BRD carries."""
+    return [cr_label(config), REQUIREMENT_LABEL]
+
+
+def get_issues_details(gl, project_id, config, cache=None):
     """Retrieve all issues in a GitLab project matching labels and date range."""
-    cr_filter = f"CR::{config['CR Number']}"
-    label_filter = "Type::Requirement"
-    print(cr_filter)
-    print(label_filter)
+    cr_filter, label_filter = brd_labels(config)
 
-    from_date = datetime.strptime(config["fromDate"], "%m-%d-%Y")
-    to_date = datetime.strptime(config["toDate"], "%m-%d-%Y")
+    # Both labels are exact matches, so GitLab does all of the filtering
+    params, _ = build_issue_query(config, exact_labels=[cr_filter, label_filter])
 
     project = gl.projects.get(project_id)
 
-    all_issues = []
-    page = 1
-    while True:
-        issues = project.issues.list(per_page=100, page=page)  # Request 100 issues per page
-        if not issues:
-            break
-        all_issues.extend(issues)
-        page += 1
-
-    filtered_issues = []
-    for issue in all_issues:
-        issue_created_at = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
-
-
-        if from_date <= issue_created_at <= to_date and issue.labels:
-            for label in issue.labels:
-                if cr_filter == label:
-                    print(label)
-                    if label_filter in issue.labels:
-                        print(label)
-                        filtered_issues.append(issue)
-    print(filtered_issues)
+    if cache:
+        filtered_issues = [issue for issue in cache.sync_issues(project) if matches_params(issue, params)]
+    else:
+        filtered_issues = list(iter_items(project.issues, **params))
+
     return filtered_issues
 
 
-def clean_text(text):
-    """Applies regex to remove comments and 'Insert date here:' from text fields."""
-    if pd.isna(text):
-        return ""  # Handle NaN values
-
-    text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
-    text = re.sub(r"^##\s*(.*)", r"<b>\1</b><br/>", text, flags=re.MULTILINE)
-    text = re.sub(r"(<b>.*?</b><br/>(.*?))(?=(<b>|$))", r"\1<br/><br/>", text, flags=re.DOTALL)
-    text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
-    text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
-    checkedCheckboxes = re.findall(r"- \[x\] (.+)", text)  # Extract only checked items
-    text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"_([\w\s()]+)_", r"\1", text)
-    text = re.sub(r"`(\d{2}-\d{2}-\d{4})`", r"\1", text)
-    text = re.sub(r" \\", "", text)
-    text = re.sub(r"Enter Text here","",text, flags=re.IGNORECASE)
-    text = re.sub(r"`([\w\s,]+)`", r"\1", text)
-    if checkedCheckboxes:
-        text = ", ".join(checkedCheckboxes)  # Keep checked items as a comma-separated string
-    else:
-        text = text.strip()
-    return text.strip()
+# Requirements per table chunk, so ReportLab lays out and splits many small tables instead of one huge one
+BRD_CHUNK_ROWS = 10
 
+BRD_COL_WIDTHS = [50, 150, 250]
 
-def generate_brd_pdf(gl, project_id, config, output_file):
-    """Generates an issue report and saves it to a PDF file."""
-    issues = get_issues_details(gl, project_id, config)
-    today = datetime.utcnow().date()
+# Styles are built once and shared by every report and cell
+SAMPLE_STYLES = getSampleStyleSheet()
+
+# Define custom styles for modern look
+TITLE_STYLE = ParagraphStyle(
+    'Title',
+    parent=SAMPLE_STYLES['Title'],
+    fontSize=18,
+    alignment=1,  # Center alignment
+    textColor=colors.HexColor("#333333")
+)
+
+HEADER_STYLE = ParagraphStyle(
+    'Header',
+    parent=SAMPLE_STYLES['Heading2'],
+    fontSize=12,
+    alignment=1,  # Center alignment
+    textColor=colors.whitesmoke,
+    spaceAfter=10
+)
+
+CELL_STYLE = ParagraphStyle(
+    'Cell',
+    parent=SAMPLE_STYLES['BodyText'],
+    fontSize=10,
+    alignment=1,  # Center alignment
+    textColor=colors.HexColor("#333333")
+)
+
+# Requirement rows, the same in every chunk
+BRD_ROW_STYLE = [
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor("#CCCCCC")),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#f9f9f9")),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+]
+
+BRD_CHUNK_STYLE = TableStyle(BRD_ROW_STYLE)
+
+# The first chunk leads with the header row
+BRD_FIRST_CHUNK_STYLE = TableStyle(BRD_ROW_STYLE + [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4CAF50")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+])
+
+
+def brd_table(issues, first=False):
+    """One chunk of the requirement table, the first one with the header row."""
+    rows = [
+        [
+            Paragraph(str(issue.iid), CELL_STYLE),
+            Paragraph(issue.title, CELL_STYLE),
+            Paragraph(clean_brd_text(issue.description or "N/A"), CELL_STYLE)
+        ]
+        for issue in issues
+    ]
+    if first:
+        header = [
+            Paragraph("<b>Issue ID</b>", HEADER_STYLE),
+            Paragraph("<b>Issue Title</b>", HEADER_STYLE),
+            Paragraph("<b>Issue Description</b>", HEADER_STYLE)
+        ]
+        rows = [header] + rows
+    # Chunks share column widths and have no spacing, so they read as one table;
+    # splitInRow lets a requirement longer than a page continue on the next one
+    return LongTable(rows, colWidths=BRD_COL_WIDTHS, style=BRD_FIRST_CHUNK_STYLE if first else BRD_CHUNK_STYLE, splitInRow=1)
+
+
+class BrdChunk(Flowable):
+    '''
+    A chunk of requirements that only becomes a table when the document reaches it
+
+    The chunk builds its Paragraphs on the first wrap and hands the document its
+    table, or the table's page split, so only the chunk being laid out holds
+    Paragraphs and the ones already drawn are released.
+
+        Parameters:
+            issues: The chunk's requirements
+            first: Lead with the header row
+    '''
+
+    def __init__(self, issues, first=False):
+        Flowable.__init__(self)
+        self.issues = issues
+        self.first = first
+        self._table = None
+
+    def table(self):
+        if self._table is None:
+            self._table = brd_table(self.issues, self.first)
+        return self._table
+
+    def wrap(self, availWidth, availHeight):
+        return self.table().wrap(availWidth, availHeight)
+
+    def split(self, availWidth, availHeight):
+        return self.table().split(availWidth, availHeight)
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.table().drawOn(canvas, x, y, _sW)
+
+
+def iter_brd_chunks(issues, chunk_rows=BRD_CHUNK_ROWS):
+    '''
+    Yields the requirement table as BrdChunks of at most chunk_rows requirements
 
+    ReportLab wraps the cell text itself (long words included), so descriptions
+    are no longer cut into fixed-width pieces, which could also cut through the
+    markup clean_brd_text adds. Chunks are LongTables, which stop measuring rows
+    once a page is full, and each is only built when the document gets to it.
+    '''
+    for start in range(0, len(issues), chunk_rows):
+        yield BrdChunk(issues[start:start + chunk_rows], first=start == 0)
+
+
+def write_brd_pdf(issues, config, output_file, chunk_rows=BRD_CHUNK_ROWS):
+    """Writes the BRD PDF for issues already fetched and filtered."""
     if not issues:
         print("No issues found")
         return
-    
+
     doc = SimpleDocTemplate(output_file, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Define custom styles for modern look
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Title'],
-        fontSize=18,
-        alignment=1,  # Center alignment
-        textColor=colors.HexColor("#333333")
-    )
-
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Heading2'],
-        fontSize=12,
-        alignment=1,  # Center alignment
-        textColor=colors.whitesmoke,
-        spaceAfter=10
-    )
-
-    cell_style = ParagraphStyle(
-        'Cell',
-        parent=styles['BodyText'],
-        fontSize=10,
-        alignment=1,  # Center alignment
-        textColor=colors.HexColor("#333333")
-    )
 
     # Title
-    title = Paragraph(f"BR Report for CR {config['CR Number']}", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Table headers
-    data = [
-        [Paragraph("<b>Issue ID</b>", header_style), 
-         Paragraph("<b>Issue Title</b>", header_style), 
-         Paragraph("<b>Issue Description</b>", header_style)]
-    ]
+    elements = [Paragraph(f"BR Report for CR {config['CR Number']}", TITLE_STYLE), Spacer(1, 12)]
+    # Requirements are listed oldest first
+    elements.extend(iter_brd_chunks(issues[::-1], chunk_rows))
+
+    doc.build(elements)
+    print(f"PDF report saved as {output_file}")
+
+
+def generate_brd_pdf(gl, project_id, config, output_file, cache=None, chunk_rows=BRD_CHUNK_ROWS):
+    """Generates an issue report and saves it to a PDF file."""
+    issues = get_issues_details(gl, project_id, config, cache)
+    write_brd_pdf(issues, config, output_file, chunk_rows)
+
+
+def get_requirements(gl, project_id, config, cache=None):
+    """Retrieve every requirement in a GitLab project matching the date range, whatever its CR."""
+    params, _ = build_issue_query(config, exact_labels=[REQUIREMENT_LABEL])
+
+    project = gl.projects.get(project_id)
+
+    if cache:
+        return [issue for issue in cache.sync_issues(project) if matches_params(issue, params)]
+    return list(iter_items(project.issues, **params))
 
-    # Set a character limit per cell for wrapping
-    character_limit = 150
 
-    # Add issue details to the data with text wrapping
+def partition_by_cr(issues, cr_numbers=None):
+    '''
+    Splits requirements by their CR:: labels in one pass
+
+        Parameters:
+            issues: Requirements
+            cr_numbers: CR numbers to keep, every CR found when empty
+
+        Returns:
+            partitions: {CR number: [BrdRequirement]}, each in the order the issues came in
+    '''
+    wanted = {str(number) for number in cr_numbers or []}
+    partitions = {number: [] for number in sorted(wanted)}
     for issue in issues:
-        clean_description = clean_text(issue.description or "N/A")
-        wrapped_description = "<br/>".join([clean_description[i:i + character_limit] for i in range(0, len(clean_description), character_limit)])
-        wrapped_title = "<br/>".join([issue.title[i:i + character_limit] for i in range(0, len(issue.title), character_limit)])
-        
-        data.append([
-            Paragraph(str(issue.iid), cell_style),
-            Paragraph(wrapped_title, cell_style),
-            Paragraph(wrapped_description, cell_style)
-        ])
-
-    # Create a modern-style table
-    data = [data[0]] + data[1:][::-1] 
-    table = Table(data, colWidths=[50, 150, 250])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4CAF50")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor("#CCCCCC")),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f9f9f9")),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 6),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(table)
+        requirement = BrdRequirement(issue.iid, issue.title, issue.description)
+        for label in issue.labels:
+            if not label.startswith(CR_LABEL_PREFIX):
+                continue
+            number = label[len(CR_LABEL_PREFIX):]
+            if not wanted or number in wanted:
+                partitions.setdefault(number, []).append(requirement)  # A requirement can belong to several CRs
+    return partitions
 
-    doc.build(elements)
-    print(f"PDF report saved as {output_file}")
+
+def render_cr_pdf(config, requirements, output_file, chunk_rows=BRD_CHUNK_ROWS):
+    """Worker process entry point, renders one CR's BRD and returns how long it took."""
+    start = time.perf_counter()
+    write_brd_pdf(requirements, config, output_file, chunk_rows)
+    return time.perf_counter() - start
+
+
+def generate_cr_batch(gl, project_id, config, cr_numbers, output_base, cache=None, chunk_rows=BRD_CHUNK_ROWS, workers=None):
+    '''
+    Generates the BRD of many CRs from one fetch of the project's requirements
+
+    Requirements are fetched once and split by CR label, then every CR's PDF is
+    rendered in its own spawned worker process, so rendering runs on every core. A CR
+    whose PDF fails is reported and the others still render.
+
+        Parameters:
+            gl: Authenticated python-gitlab client
+            project_id: GitLab project ID
+            config: Report config, its date range and state select the requirements
+            cr_numbers: CR numbers to render, every CR found when empty
+            output_base: PDFs are written to <output_base>_CR<number>_<fromDate>_<toDate>.pdf
+            cache: Optional ReportCache
+            chunk_rows: Requirements per PDF table chunk
+            workers: Worker processes, one per core when None
+    '''
+    start = time.perf_counter()
+    partitions = partition_by_cr(get_requirements(gl, project_id, config, cache), cr_numbers)
+    print(f"Fetched requirements for {len(partitions)} CRs in {time.perf_counter() - start:.2f}s")
+
+    # Spawned, not forked: --cr runs under fan_out's threads, and a fork of a process with threads holding
+    # the rate limiter lock, pooled connections or SQLite handles can deadlock in the child
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for number, requirements in partitions.items():
+            if not requirements:
+                print(f"No issues found for CR {number}")
+                continue
+            output_file = f"{output_base}_CR{number}_{config['fromDate']}_{config['toDate']}.pdf"
+            future = executor.submit(render_cr_pdf, {**config, "CR Number": number}, requirements, output_file, chunk_rows)
+            futures[future] = (number, len(requirements))
+
+        for future in as_completed(futures):
+            number, count = futures[future]
+            try:
+                print(f"CR {number}: {count} requirements rendered in {future.result():.2f}s")
+            except Exception as e:
+                print(f"Error rendering CR {number}: {e}")
+
+    print(f"Rendered {len(futures)} CR PDFs in {time.perf_counter() - start:.2f}s")
         
 
 def main():
     """Main function to run the GitLab issues report."""
     parser = argparse.ArgumentParser(description="Generate an issue report for a GitLab project")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-p", "--project", required=True, help="GitLab project ID")
+    parser.add_argument("-p", "--project", required=True, nargs="+", help="GitLab project ID(s), several are reported on concurrently")
     parser.add_argument("-o", "--output", default="gitlab_brd_report", help="Output CSV file name")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local issue cache, only fetching issues updated since the last run")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_MAX_TARGETS, help="Number of projects to report on at once")
+    parser.add_argument("--chunk-rows", type=int, default=BRD_CHUNK_ROWS, help="Requirements per PDF table chunk")
+    parser.add_argument("--cr", nargs="*", help="Render the BRD of each of these CR numbers from one fetch, or of every CR found when no numbers are given")
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes rendering CR PDFs, one per core by default")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
 
     config = load_config()
-    output_file = f"{args.output}_CR{config['CR Number']}_{config['fromDate']}_{config['toDate']}.pdf"
 
-    generate_brd_pdf(gl, args.project, config, output_file)
+    cache = ReportCache(args.cache) if args.cache else None
+
+    # One PDF per project, PDFs are not merged
+    if args.cr is not None:
+        run = lambda project_id, target_base: generate_cr_batch(gl, project_id, config, args.cr, target_base, cache, args.chunk_rows, args.workers)
+        fan_out(run, args.project, args.output, max_workers=args.jobs)
+    else:
+        output_file = f"{args.output}_CR{config['CR Number']}_{config['fromDate']}_{config['toDate']}.pdf"
+        run = lambda project_id, target_file: generate_brd_pdf(gl, project_id, config, target_file, cache, args.chunk_rows)
+        fan_out(run, args.project, output_file, max_workers=args.jobs)
 
 
 if __name__ == "__main__":
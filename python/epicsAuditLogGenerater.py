@@ -1,8 +1,105 @@
-import gitlab
-import csv
 import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from reportCache import DEFAULT_CACHE_PATH, ReportCache
+from reportQuery import iter_items
+from reportParquet import OUTPUT_FORMATS
+from reportStream import open_report_writer, ordered_map
 
 import re
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
+
+
+# Event streams fetched at once, three per linked issue
+DEFAULT_CONCURRENCY = 8
+
+# Resource event streams of an issue, by the name used for their row types
+EVENT_STREAMS = {
+    "Label": "resourcelabelevents",
+    "Milestone": "resourcemilestoneevents",
+    "State": "resourcestateevents",
+}
+
+# Finished event streams a batch run keeps for later epics linking the same issues, three per issue
+SHARED_EVENT_STREAMS = 3000
+
+
+class GitlabObjects:
+    '''
+    Request-scoped cache of the groups, epics, issues and issue events a run works with
+
+    Groups and epics are loaded from GitLab at most once per run, however many helpers
+    or epics ask for them. A key being loaded by one thread is waited on by the others
+    instead of being requested twice. Issues are only needed to reach their event
+    endpoints, so they are built lazily without a request and not kept.
+
+    Event streams make up nearly all of a run's data, so only the most recently
+    loaded ones are kept, for the epics of a batch run that link the same issues.
+    A single epic asks for each stream once and keeps none of them.
+
+        Parameters:
+            gl: Authenticated python-gitlab client
+            shared_streams: Most finished event streams kept for reuse, 0 for none
+    '''
+
+    def __init__(self, gl, shared_streams=SHARED_EVENT_STREAMS):
+        self.gl = gl
+        self.shared_streams = shared_streams
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._streams = OrderedDict()
+        self.loads = Counter()
+        self.reuses = Counter()
+
+    def _get(self, key, load, objects=None):
+        objects = self._objects if objects is None else objects
+        with self._lock:
+            future = objects.get(key)
+            owner = future is None
+            if owner:
+                future = objects[key] = Future()
+                self.loads[key[0]] += 1
+            else:
+                self.reuses[key[0]] += 1
+        if owner:
+            try:
+                future.set_result(load())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def group(self, group_id):
+        return self._get(("group", group_id), lambda: self.gl.groups.get(group_id))
+
+    def epic(self, group_id, epic_id):
+        return self._get(("epic", group_id, epic_id), lambda: self.group(group_id).epics.get(epic_id))
+
+    def project_issue(self, project_id, issue_iid):
+        """Returns a lazy project issue, enough to list its resource events."""
+        project = self.gl.projects.get(project_id, lazy=True)
+        return project.issues.get(issue_iid, lazy=True)
+
+    def event_stream(self, issue, kind, load):
+        """Returns one event stream of an issue, reusing it while it is among the most recently loaded."""
+        key = ("events", issue.project_id, issue.iid, kind)
+        try:
+            return self._get(key, load, self._streams)
+        finally:
+            with self._lock:
+                if key in self._streams:
+                    self._streams.move_to_end(key)
+                while len(self._streams) > self.shared_streams:
+                    self._streams.popitem(last=False)
+
 
 def extract_first_heading(description):
     """Extracts the first heading (AsciiDoc or Markdown style) from the description."""
@@ -36,16 +133,26 @@ def extract_first_heading(description):
 
     return f"{extracted_heading}\n{extracted_text}" if extracted_text else extracted_heading
 
-def get_epic_details(gl, group_id, epic_id):
-    group = gl.groups.get(group_id)
-    epic = group.epics.get(epic_id)
-    return epic
+def get_epic_details(objects, group_id, epic_id):
+    return objects.epic(group_id, epic_id)
+
+
+def get_epic_notes(objects, group_id, epic_id, cache=None):
+    epic = objects.epic(group_id, epic_id)
+    if cache:
+        return cache.cached_list(epic, "notes", epic.notes)
+    return epic.notes.list(iterator=True, per_page=100)  # Pages are fetched as the notes are written
 
 
-def get_epic_notes(gl, group_id, epic_id):
-    group = gl.groups.get(group_id)
-    epic = group.epics.get(epic_id)
-    return epic.notes.list(all=True)
+def get_new_epic_notes(objects, group_id, epic_id, after=None):
+    """Fetches notes created after the watermark, newest first, without paging further back."""
+    epic = objects.epic(group_id, epic_id)
+    notes = []
+    for note in epic.notes.list(iterator=True, order_by="created_at", sort="desc", per_page=100):
+        if after and note.created_at <= after:
+            break
+        notes.append(note)
+    return notes
 
 
 def parse_epic_changes(notes):
@@ -62,48 +169,253 @@ def parse_epic_changes(notes):
     return change_log
 
 
-def get_epic_issues(gl, group_id, epic_id):
+def get_epic_issues(objects, group_id, epic_id):
     """Fetches issues linked to an epic."""
-    group = gl.groups.get(group_id)
-    epic = group.epics.get(epic_id)
-    return epic.issues.list(all=True)
-
-
-def get_issue_events(issue):
-    """Fetches label, assignee, and milestone change history for an issue."""
-    events = issue.resource_state_events.list(all=True)
-    event_log = []
-
-
-    for event in events:
-        action = "Added" if event.action == "add" else "Removed"
-        event_type = event.resource_type.capitalize()
-
-
-        if event_type in ["Label", "Assignee", "Milestone"]:
-            event_log.append({
-                "Type": f"{event_type} {action}",
-                "Author": event.user['name'],
-                "Date": event.created_at,
-                "Content": event.resource_type if event.resource_type else "N/A"
-            })
-   
-    return event_log
-
-
-def generate_audit_report(gl, group_id, epic_id, output_file):
-    """Generates an audit report and saves it to a CSV file."""
-    epic = get_epic_details(gl, group_id, epic_id)
-    notes = get_epic_notes(gl, group_id, epic_id)
-    epic_changes = parse_epic_changes(notes)
-    issues = get_epic_issues(gl, group_id, epic_id)
-
-
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csv_file:
-        fieldnames = ["Type", "Author", "Date", "Content", "Last Updated", "Closed Date"]
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-        writer.writeheader()
-
+    epic = objects.epic(group_id, epic_id)
+    # Always listed fresh: the epic's updated_at does not move when a child issue changes, so the
+    # issues' own updated_at, which keys their cached event streams, would go stale under it
+    return epic.issues.list(iterator=True, per_page=100)
+
+
+def parse_issue_event(kind, event):
+    """Turns one label, milestone or state event into an audit row."""
+    user = event.user["name"] if event.user else "N/A"
+    if kind == "State":
+        return {"Stream": kind, "Type": f"State {event.state.capitalize()}", "Author": user, "Date": event.created_at, "Content": event.state}
+
+    action = "Added" if event.action == "add" else "Removed"
+    if kind == "Label":
+        content = event.label["name"] if event.label else "N/A"  # Deleted labels come back empty
+    else:
+        content = event.milestone["title"] if event.milestone else "N/A"
+    return {"Stream": kind, "Type": f"{kind} {action}", "Author": user, "Date": event.created_at, "Content": content}
+
+
+def get_issue_event_stream(objects, issue, kind, cache=None):
+    """Fetches one of an issue's label, milestone or state event streams as audit rows."""
+    def load():
+        manager = getattr(objects.project_issue(issue.project_id, issue.iid), EVENT_STREAMS[kind])
+        if cache:
+            events = cache.cached_list(issue, f"{kind.lower()}_events", manager)
+        else:
+            events = manager.list(iterator=True, per_page=100)
+        return [parse_issue_event(kind, event) for event in events]
+    return objects.event_stream(issue, kind, load)
+
+
+def get_issue_events(objects, issues, concurrency=DEFAULT_CONCURRENCY, cache=None, executor=None):
+    '''
+    Fetches the label, milestone and state events of many issues on a bounded thread pool
+
+    Every stream of every issue is its own task, so an issue's three streams are
+    fetched side by side as well as alongside other issues. Issues are read once,
+    so they can come straight from a paginated iterator.
+
+        Parameters:
+            objects: GitlabObjects for the run
+            issues: Issues linked to the epic, any iterable
+            concurrency: Most event streams fetched at once
+            cache: Optional ReportCache
+            executor: Thread pool shared with other epics, a private one is used when None
+
+        Yields:
+            (issue, events): Each issue in order with its events sorted by date
+    '''
+    start = time.perf_counter()
+    streams = ((issue, kind) for issue in issues for kind in EVENT_STREAMS)
+    results = ordered_map(lambda stream: (stream[0], get_issue_event_stream(objects, *stream, cache)), streams, concurrency, executor)
+
+    count = 0
+    for issue, events in results:
+        for _ in range(len(EVENT_STREAMS) - 1):
+            events = events + next(results)[1]  # The issue's other streams follow in order
+        count += 1
+        yield issue, sorted(events, key=lambda event: event["Date"])
+
+    print(f"Fetched events for {count} issues with {concurrency} workers in {time.perf_counter() - start:.2f}s")
+
+
+AUDIT_FIELDS = ["Type", "Author", "Date", "Content", "Last Updated", "Closed Date"]
+
+# Typed columns of the Parquet output, the rest are text
+AUDIT_TYPES = {"Date": "timestamp", "Last Updated": "timestamp", "Closed Date": "timestamp"}
+
+
+def new_state():
+    return {"epics": {}}
+
+
+@contextmanager
+def open_audit_log(output_file, incremental=False, output_format="csv"):
+    '''
+    Opens an audit CSV, for appending when an incremental run finds the previous run's state
+
+    The state sits next to the CSV in <output>.state.json. It keeps, per epic, the
+    created_at of its newest note and, per linked issue, its updated_at and the
+    created_at of the newest event written from each of its event streams. Without a
+    state file the CSV is written from scratch, so it never holds rows the state does
+    not know about. An appending run writes its rows to <output>.pending first; they
+    are added to the CSV and the state is saved only once the run has succeeded, so
+    a failed run adds nothing and the next one picks up where the last good one ended.
+    As Parquet, the output is a dataset directory and appending adds a file to
+    today's run_date partition.
+
+        Yields:
+            (writer, state): csv.DictWriter (or ParquetDictWriter) and the incremental state, None when not incremental
+    '''
+    state_file = f"{output_file}.state.json"
+    state = None
+    if incremental and os.path.exists(output_file) and os.path.exists(state_file):
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+    elif incremental:
+        state = new_state()
+
+    append = bool(state and state["epics"])
+    pending = f"{output_file}.pending" if append and output_format == "csv" else None
+    try:
+        with open_report_writer(pending or output_file, AUDIT_FIELDS, output_format=output_format, column_types=AUDIT_TYPES, append=append and not pending) as writer:
+            if not append:
+                writer.writeheader()
+            yield writer, state
+
+        if pending:
+            with open(pending, encoding="utf-8", newline="") as new_rows, open(output_file, mode="a", encoding="utf-8", newline="") as csv_file:
+                shutil.copyfileobj(new_rows, csv_file)
+    finally:
+        if pending and os.path.exists(pending):
+            os.remove(pending)
+
+    if state is not None:
+        with open(f"{state_file}.tmp", mode="w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(f"{state_file}.tmp", state_file)  # Saved right after the rows it describes were added
+
+
+def write_notes(writer, notes):
+    '''
+    Writes the Epic Change rows of the system notes, then a row for every note
+
+    Notes are read once, so they can come straight from a paginated iterator. The
+    note rows are spooled to a temporary file until the Epic Change rows are out.
+
+        Returns:
+            count, newest: Number of notes written and the created_at of the newest one
+    '''
+    count = 0
+    newest = None
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as spool:
+        for note in notes:
+            for change in parse_epic_changes([note]):
+                writer.writerow({
+                    "Type": change["Type"],
+                    "Author": change["Author"],
+                    "Date": change["Date"],
+                    "Content": change["Content"],
+                    "Last Updated": "",
+                    "Closed Date": ""
+                })
+            spool.write(json.dumps({
+                "Type": "Comment" if note.system is False else "System Note",
+                "Author": note.author["name"],
+                "Date": note.created_at,
+                "Content": note.body
+            }) + "\n")
+            count += 1
+            newest = max(newest or note.created_at, note.created_at)
+
+        spool.seek(0)
+        for line in spool:
+            writer.writerow(json.loads(line))
+    return count, newest
+
+
+def write_issue(writer, issue, issue_events, linked=True):
+    """Writes an issue's event rows, after its Linked Issue row unless the issue was already written."""
+    if linked:
+        writer.writerow({
+            "Type": "Linked Issue",
+            "Author": issue.author["name"],
+            "Date": issue.created_at,
+            "Last Updated": issue.updated_at,
+            "Closed Date": issue.closed_at if issue.state == "closed" else "N/A",
+            "Content": f"{issue.title} ({issue.web_url})"
+        })
+
+
+    for event in issue_events:
+        writer.writerow({
+            "Type": event["Type"],
+            "Author": event["Author"],
+            "Date": event["Date"],
+            "Content": event["Content"],
+            "Last Updated": "",
+            "Closed Date": ""
+        })
+
+
+class RowSpool:
+    """Writer keeping rows in a temporary file as JSON lines, until they are passed on to the real writer."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def writerow(self, rowdict):
+        self.file.write(json.dumps(rowdict) + "\n")
+
+
+def write_epic_audit(writer, objects, group_id, epic_id, cache=None, concurrency=DEFAULT_CONCURRENCY, executor=None, state=None):
+    '''
+    Writes the audit rows of one epic: its details, notes, linked issues and their events
+
+    With an incremental state only what is new since the last run is written: notes
+    newer than the newest known note, and for issues whose updated_at moved (event
+    streams of unchanged issues are not fetched at all) the events newer than the
+    newest one written from the same stream. The resource event endpoints cannot
+    filter by date, so a changed issue's streams are still listed in full. A Linked
+    Issue row is only written the first time an issue shows up under the epic.
+
+    The epic's rows are spooled and its state updated on a copy, and both only reach
+    the writer and the state once the whole epic is done. An epic that fails, which
+    a batch run reports and skips, leaves neither rows nor state behind and is
+    picked up where it was on the next run.
+    '''
+    if state is None:
+        write_epic_rows(writer, objects, group_id, epic_id, cache, concurrency, executor)
+        return
+
+    epic_key = f"{group_id}:{epic_id}"
+    epic_state = copy.deepcopy(state["epics"].get(epic_key))
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as spool:
+        note_count, changed_issues, new_events, epic_state = write_epic_rows(RowSpool(spool), objects, group_id, epic_id, cache, concurrency, executor, epic_state, True)
+        spool.seek(0)
+        for line in spool:
+            writer.writerow(json.loads(line))
+    state["epics"][epic_key] = epic_state
+    print(f"Epic {epic_key}: {note_count} new notes, {changed_issues} changed issues, {new_events} new events")
+
+
+def write_epic_rows(writer, objects, group_id, epic_id, cache=None, concurrency=DEFAULT_CONCURRENCY, executor=None, epic_state=None, incremental=False):
+    '''
+    Writes the rows of write_epic_audit, updating epic_state in place when incremental
+
+        Parameters:
+            epic_state: The epic's incremental state, None when the epic was never audited
+            incremental: Only write what epic_state does not cover yet
+
+        Returns:
+            (notes, changed issues, new events, epic_state): What was written and the updated state
+    '''
+    epic = get_epic_details(objects, group_id, epic_id)
+    first_run = epic_state is None
+    if incremental:
+        epic_state = epic_state or {"notes_after": None, "issues": {}}
+        notes = get_new_epic_notes(objects, group_id, epic_id, epic_state["notes_after"])
+    else:
+        notes = get_epic_notes(objects, group_id, epic_id, cache)
+    issues = get_epic_issues(objects, group_id, epic_id)
+
+    if first_run:
         first_heading = extract_first_heading(epic.description)
 
         # Epic details
@@ -111,68 +423,161 @@ def generate_audit_report(gl, group_id, epic_id, output_file):
         writer.writerow({"Type": "Epic Description", "Author": "", "Date": "", "Content": first_heading})
 
 
-        for change in epic_changes:
-            writer.writerow({
-                "Type": change["Type"],
-                "Author": change["Author"],
-                "Date": change["Date"],
-                "Content": change["Content"],
-                "Last Updated": "",
-                "Closed Date": ""
-            })
-        for note in notes:
-            writer.writerow({
-                "Type": "Comment" if note.system is False else "System Note",
-                "Author": note.author["name"],
-                "Date": note.created_at,
-                "Content": note.body
-            })
+    note_count, newest_note = write_notes(writer, notes)
+
+    if incremental:
+        if newest_note:
+            epic_state["notes_after"] = max(newest_note, epic_state["notes_after"] or "")
+        known = epic_state["issues"]
+        issues = (issue for issue in issues if known.get(str(issue.id), {}).get("updated_at") != issue.updated_at)
+
+    # Linked Issues, with their events fetched concurrently
+    changed_issues = 0
+    new_events = 0
+    for issue, issue_events in get_issue_events(objects, issues, concurrency, cache, executor):
+        linked = True
+        if incremental:
+            issue_state = epic_state["issues"].get(str(issue.id))
+            linked = issue_state is None
+            issue_state = epic_state["issues"][str(issue.id)] = issue_state or {"events_after": {}}
+            after = issue_state["events_after"]
+            issue_events = [event for event in issue_events if event["Date"] > after.get(event["Stream"], "")]
+            for event in issue_events:
+                after[event["Stream"]] = max(event["Date"], after.get(event["Stream"], ""))
+            issue_state["updated_at"] = issue.updated_at
+            changed_issues += 1
+            new_events += len(issue_events)
+        write_issue(writer, issue, issue_events, linked)
 
+    return note_count, changed_issues, new_events, epic_state
 
-        # Linked Issues
-        for issue in issues:
-            writer.writerow({
-                "Type": "Linked Issue",
-                "Author": issue.author["name"],
-                "Date": issue.created_at,
-                "Last Updated": issue.updated_at,
-                "Closed Date": issue.closed_at if issue.state == "closed" else "N/A",
-                "Content": f"{issue.title} ({issue.web_url})"
-            })
 
+def generate_audit_report(gl, group_id, epic_id, output_file, cache=None, concurrency=DEFAULT_CONCURRENCY, objects=None, executor=None, incremental=False, output_format="csv"):
+    """Generates an audit report and saves it to a CSV file, or appends to it when incremental."""
+    objects = objects or GitlabObjects(gl, shared_streams=0)
 
-            issue_events = get_issue_events(issue)
-            for event in issue_events:
-                writer.writerow({
-                    "Type": event["Type"],
-                    "Author": event["Author"],
-                    "Date": event["Date"],
-                    "Content": event["Content"],
-                    "Last Updated": "",
-                    "Closed Date": ""
-                })
+    with open_audit_log(output_file, incremental, output_format) as (writer, state):
+        write_epic_audit(writer, objects, group_id, epic_id, cache, concurrency, executor, state)
 
 
     print(f"Audit report saved as {output_file}")
 
 
+def parse_epic_refs(group_ids, epic_ids):
+    """Turns --epic values into (group_id, epic_iid) pairs, plain IIDs belong to the first group."""
+    refs = []
+    for epic_id in epic_ids:
+        if ":" in epic_id:
+            group_id, epic_id = epic_id.rsplit(":", 1)
+        else:
+            group_id = group_ids[0]
+        refs.append((group_id, epic_id))
+    return refs
+
+
+def find_epics(objects, group_ids, labels):
+    """Returns (group_id, epic_iid) for every epic in the groups carrying all the labels."""
+    refs = []
+    for group_id in group_ids:
+        epics = iter_items(objects.group(group_id).epics, labels=",".join(labels), state="all")
+        refs += [(group_id, epic.iid) for epic in epics]
+    print(f"Found {len(refs)} epics labelled {', '.join(labels)}")
+    return refs
+
+
+def epic_output_file(output_file, group_id, epic_id, output_format="csv"):
+    """Per-epic file name in batch mode, e.g. audit.csv -> audit_<group>_<epic>.csv"""
+    root, ext = os.path.splitext(output_file)
+    if output_format == "parquet":
+        return f"{root}_{group_id}_{epic_id}"  # A dataset directory
+    return f"{root}_{group_id}_{epic_id}{ext or '.csv'}"
+
+
+def generate_batch_audit(gl, epic_refs, output_file, combined=False, cache=None, concurrency=DEFAULT_CONCURRENCY, objects=None, incremental=False, output_format="csv"):
+    '''
+    Audits many epics, across any number of groups, in one run
+
+    All epics share one GitlabObjects and one thread pool, so groups load once and an
+    issue linked from several epics has its events fetched once, as long as the
+    epics linking it are not too far apart. An epic that fails to load is reported
+    and skipped.
+
+        Parameters:
+            gl: Authenticated python-gitlab client
+            epic_refs: (group_id, epic_iid) pairs
+            output_file: Combined CSV, or the base name of the per-epic CSVs
+            combined: Write every epic into output_file instead of one file each
+            cache: Optional ReportCache
+            concurrency: Most event streams fetched at once
+            objects: GitlabObjects to reuse, a new one when None
+            incremental: Append only what is new since the last run, see open_audit_log
+            output_format: "csv" or "parquet"
+    '''
+    objects = objects or GitlabObjects(gl)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if combined:
+            with open_audit_log(output_file, incremental, output_format) as (writer, state):
+                for group_id, epic_id in epic_refs:
+                    try:
+                        write_epic_audit(writer, objects, group_id, epic_id, cache, concurrency, executor, state)
+                    except Exception as e:
+                        print(f"Error auditing epic {epic_id} in group {group_id}: {e}")
+            print(f"Audit report for {len(epic_refs)} epics saved as {output_file}")
+        else:
+            for group_id, epic_id in epic_refs:
+                try:
+                    target_file = epic_output_file(output_file, group_id, epic_id, output_format)
+                    generate_audit_report(gl, group_id, epic_id, target_file, cache, concurrency, objects, executor, incremental, output_format)
+                except Exception as e:
+                    print(f"Error auditing epic {epic_id} in group {group_id}: {e}")
+
+    print(
+        f"Audited {len(epic_refs)} epics in {time.perf_counter() - start:.2f}s: "
+        f"{objects.loads['events']} issue event streams fetched, {objects.reuses['events']} reused for issues shared between epics"
+    )
+
+
 def main():
     """Main function to run the GitLab audit script."""
-    parser = argparse.ArgumentParser(description="Generate an audit report for a GitLab epic")
+    parser = argparse.ArgumentParser(description="Generate an audit report for one or more GitLab epics")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-g", "--group", required=True, help="GitLab group ID containing the epic")
-    parser.add_argument("-e", "--epic", required=True, help="Epic ID to generate the report for")
-    parser.add_argument("-o", "--output", default="gitlab_epic_audit.csv", help="Output CSV file name")
-
+    parser.add_argument("-g", "--group", required=True, nargs="+", help="GitLab group ID(s) containing the epics")
+    epics = parser.add_mutually_exclusive_group(required=True)
+    epics.add_argument("-e", "--epic", nargs="+", help="Epic ID(s) to generate the report for, GROUP:ID for epics outside the first group")
+    epics.add_argument("-l", "--labels", nargs="+", help="Audit every epic in the groups carrying all of these labels")
+    parser.add_argument("-o", "--output", default="gitlab_epic_audit.csv", help="Output CSV file name, the base name of the per-epic files in batch mode")
+    parser.add_argument("--combined", action="store_true", help="Write all epics into the output file instead of one file per epic")
+    parser.add_argument("--incremental", action="store_true", help="Append only notes and events that are new since the last run, tracked in <output>.state.json")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="Write a CSV, or a Parquet dataset partitioned by run date (the output name without its extension)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of issue event streams to fetch at once")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local cache, only refetching notes and events for items updated since the last run")
+
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
    
     # Authenticate GitLab
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
+
+
+    cache = ReportCache(args.cache) if args.cache else None
+
+    objects = GitlabObjects(gl)
+    if args.labels:
+        epic_refs = find_epics(objects, args.group, args.labels)
+    else:
+        epic_refs = parse_epic_refs(args.group, args.epic)
 
+    output_file = os.path.splitext(args.output)[0] if args.format == "parquet" else args.output
 
     # Generate audit report
-    generate_audit_report(gl, args.group, args.epic, args.output)
+    if len(epic_refs) == 1 and not args.labels:
+        group_id, epic_id = epic_refs[0]
+        generate_audit_report(gl, group_id, epic_id, output_file, cache, args.concurrency, incremental=args.incremental, output_format=args.format)
+    else:
+        generate_batch_audit(gl, epic_refs, output_file, args.combined, cache, args.concurrency, objects, args.incremental, args.format)
 
 
 if __name__ == "__main__":
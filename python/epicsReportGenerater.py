@@ -1,11 +1,23 @@
 
-import gitlab
-import csv
 import argparse
 import re
-import pandas as pd
 import yaml
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from reportCache import DEFAULT_CACHE_PATH, ReportCache
+from reportFanout import DEFAULT_MAX_TARGETS, fan_out
+from reportQuery import iter_items
+from reportParquet import OUTPUT_FORMATS, report_path
+from reportStream import open_report_writer, ordered_map, write_streamed_csv
+from textCleaner import clean_text
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
+
+
+# Epics enriched at once, each worker makes a few small API calls per epic
+DEFAULT_CONCURRENCY = 8
 
 
 def load_config():
@@ -16,8 +28,13 @@ def load_config():
 
 
 
-def get_epic_details(gl, group_id, config):
+def get_epic_details(gl, group_id, config, cache=None):
     ''' Get the epic '''
+    return list(iter_epic_details(gl, group_id, config, cache))
+
+
+def iter_epic_details(gl, group_id, config, cache=None):
+    ''' Yield the epics get_epic_details returns, page by page as they are fetched '''
     label_filters = set(config["labels"])
 
 
@@ -26,18 +43,11 @@ def get_epic_details(gl, group_id, config):
 
 
     group = gl.groups.get(group_id)
-    epics = group.epics.list(all=True)
-
-    all_epics = []
-    page = 1
-    while True:
-        epics = group.epics.list(per_page=100, page=page)  # Request 100 items per page
-        if not epics:
-            break
-        all_epics.extend(epics)
-        page += 1
-
-    filtered_epics = []
+    if cache:
+        all_epics = cache.sync_epics(group)
+    else:
+        all_epics = iter_items(group.epics)  # Streamed page by page straight into the filter below
+
     for epic in all_epics:
         if epic.start_date:
             epic_start_at = datetime.strptime(epic.start_date, "%Y-%m-%d")
@@ -46,16 +56,14 @@ def get_epic_details(gl, group_id, config):
             if from_date <= epic_start_at <= to_date and any(
                 label in epic_label for epic_label in epic.labels for label in label_filters
                 ):
-                filtered_epics.append(epic)
+                yield epic
         elif epic.created_at:
             epic_start_at = datetime.strptime(epic.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
 
             if from_date <= epic_start_at <= to_date and any(
                 label in epic_label for epic_label in epic.labels for label in label_filters
                 ):
-                filtered_epics.append(epic)
-
-    return filtered_epics
+                yield epic
 
 
 
@@ -165,118 +173,160 @@ def get_prod_defect(epic):
         return "N/A"
 
 
-def generate_audit_report(gl, group_id, config, output_file):
-    """Generates an audit report and saves it to a CSV file."""
-    epics = get_epic_details(gl, group_id, config)
-    today = datetime.utcnow().date()
+def enrich_epic(epic, cache=None):
+    """Runs the per-epic lookups for one epic and returns them with the time they took."""
+    start = time.perf_counter()
+    if cache:
+        latest_note = cache.cached(epic, "latest_note", lambda: get_latest_note(epic))
+        prod_defect = cache.fresh(epic, "prod_defect", lambda: get_prod_defect(epic))
+    else:
+        latest_note = get_latest_note(epic)
+        prod_defect = get_prod_defect(epic)
+    enrichment = {
+        "extracted_fields": extract_all_headers(epic.description),
+        "label_data": extract_labels(epic),
+        "latest_note": latest_note,
+        "prod_defect": prod_defect,
+    }
+    return enrichment, time.perf_counter() - start
 
-    if not epics:
-        print("No epics found")
-        return
 
+def enrich_epics(epics, concurrency=DEFAULT_CONCURRENCY, cache=None):
+    """Enriches many epics at once on a bounded thread pool, keeping the original epic order."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(partial(enrich_epic, cache=cache), epics))
 
-    extracted_fields = {}
-    all_headers = set()
-    for epic in epics:
-        extracted_fields = extract_all_headers(epic.description)
-        all_headers.update(extracted_fields.keys())
-   
-    fieldnames = ["Epic ID", "Epic Title", "Creation Date", "Created By", "Last Updated", "Type", "Priority", "Status", "Latest Note", "Prod Date", "Days Past Due", "Start Date", "Post PROD Defects"] + sorted(all_headers)
 
+    wall_time = time.perf_counter() - start
+    call_time = sum(elapsed for _, elapsed in results)
+    print(f"Enriched {len(epics)} epics with {concurrency} workers in {wall_time:.2f}s (sum of call times {call_time:.2f}s)")
+    return [enrichment for enrichment, _ in results]
 
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-        writer.writeheader()
 
+REPORT_FIELDS = ["Epic ID", "Epic Title", "Creation Date", "Created By", "Last Updated", "Type", "Priority", "Status", "Latest Note", "Prod Date", "Days Past Due", "Start Date", "Post PROD Defects"]
+
+# Typed columns of the Parquet output, the rest are text
+PARQUET_TYPES = {"Epic ID": "int", "Creation Date": "timestamp", "Last Updated": "timestamp", "Prod Date": "date", "Days Past Due": "int", "Start Date": "date"}
+
+
+def build_epic_row(epic, enrichment, today):
+    """Builds one CSV row from an epic and its enrichment."""
+    extracted_fields = enrichment["extracted_fields"]
+    label_data = enrichment["label_data"]
+    return {
+        "Epic ID": epic.iid, 
+        "Epic Title": epic.title, 
+        "Creation Date": epic.created_at, 
+        "Created By": epic.author["name"], 
+        "Last Updated": epic.updated_at, 
+        "Type": label_data["Type"], 
+        "Priority": label_data["Priority"], 
+        "Status": label_data["Status"], 
+        **extracted_fields, 
+        "Latest Note": enrichment["latest_note"], 
+        "Start Date": epic.start_date if epic.start_date else "N/A",
+        "Prod Date": epic.end_date if epic.end_date else "N/A", 
+        "Days Past Due": (
+            (today - datetime.strptime(epic.end_date, "%Y-%m-%d").date()).days
+            if epic.end_date else "N/A"
+        ),
+        "Post PROD Defects": enrichment["prod_defect"]
+        }
+
+
+def stream_audit_report(gl, group_id, config, output_file, concurrency=DEFAULT_CONCURRENCY, cache=None, output_format="csv"):
+    """Generates the epic report as a stream: fetch, filter, concurrent enrichment and row building run page by page."""
+    today = datetime.utcnow().date()
+    start = time.perf_counter()
+    call_time = 0.0
 
-        for epic in epics:
-            extracted_fields = extract_all_headers(epic.description)
-            label_data = extract_labels(epic)
-            latest_note = get_latest_note(epic)
-            prod_defect = get_prod_defect(epic)
-            writer.writerow({
-                "Epic ID": epic.iid, 
-                "Epic Title": epic.title, 
-                "Creation Date": epic.created_at, 
-                "Created By": epic.author["name"], 
-                "Last Updated": epic.updated_at, 
-                "Type": label_data["Type"], 
-                "Priority": label_data["Priority"], 
-                "Status": label_data["Status"], 
-                **extracted_fields, 
-                "Latest Note": latest_note, 
-                "Start Date": epic.start_date if epic.start_date else "N/A",
-                "Prod Date": epic.end_date if epic.end_date else "N/A", 
-                "Days Past Due": (
-                    (today - datetime.strptime(epic.end_date, "%Y-%m-%d").date()).days
-                    if epic.end_date else "N/A"
-                ),
-                "Post PROD Defects": prod_defect
-                })
 
+    def enrich(epic):
+        enrichment, elapsed = enrich_epic(epic, cache)
+        return epic, enrichment, elapsed
 
+
+    def rows():
+        nonlocal call_time
+        epics = iter_epic_details(gl, group_id, config, cache)
+        for epic, enrichment, elapsed in ordered_map(enrich, epics, concurrency):
+            call_time += elapsed
+            yield build_epic_row(epic, enrichment, today)
+
+
+    count = write_streamed_csv(rows(), REPORT_FIELDS, output_file, clean_text, output_format, PARQUET_TYPES)
+    if not count:
+        print("No epics found")
+        return
+
+
+    print(f"Enriched {count} epics with {concurrency} workers in {time.perf_counter() - start:.2f}s (sum of call times {call_time:.2f}s)")
     print(f"Report saved as {output_file}")
 
 
-def clean_csv_content(file_path):
-    """Loads CSV, cleans all fields, and rewrites it."""
-    df = pd.read_csv(file_path, dtype=str)  # Load CSV as a DataFrame (all text)
+def generate_audit_report(gl, group_id, config, output_file, concurrency=DEFAULT_CONCURRENCY, cache=None, output_format="csv"):
+    """Generates an audit report and saves it to a CSV file."""
+    epics = get_epic_details(gl, group_id, config, cache)
+    today = datetime.utcnow().date()
 
+    if not epics:
+        print("No epics found")
+        return
 
-    def clean_text(text):
-        """Applies regex to remove comments and 'Insert date here:' from text fields."""
-        if pd.isna(text):
-            return ""  # Handle NaN values
 
+    enrichments = enrich_epics(epics, concurrency, cache)
 
-        text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
-        text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
-        text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
-        checkedCheckboxes = re.findall(r"- \[x\] (.+)", text)  # Extract only checked items
-        text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"_([\w\s()]+)_", r"\1", text)
-        text = re.sub(r"`(\d{2}-\d{2}-\d{4})`", r"\1", text)
-        text = re.sub(r" \\", "", text)
-        text = re.sub(r"Enter Text here","",text, flags=re.IGNORECASE)
-        text = re.sub(r"`([\w\s,]+)`", r"\1", text)
-        if checkedCheckboxes:
-          text = ", ".join(checkedCheckboxes)  # Keep checked items as a comma-separated string
-        else:
-           text = text.strip()
-        return text.strip()
 
+    all_headers = set()
+    for enrichment in enrichments:
+        all_headers.update(enrichment["extracted_fields"].keys())
+   
+    fieldnames = REPORT_FIELDS + sorted(all_headers)
 
-    # Apply cleaning to every text field in the DataFrame
-    df = df.applymap(clean_text)
 
+    with open_report_writer(output_file, fieldnames, clean_text, output_format, PARQUET_TYPES) as writer:
+        writer.writeheader()
 
-    # Save cleaned CSV
-    df.to_csv(file_path, index=False, encoding="utf-8")
-    print(f"Cleaned report saved as {file_path}")
 
+        for epic, enrichment in zip(epics, enrichments):
+            writer.writerow(build_epic_row(epic, enrichment, today))
 
 
+    print(f"Report saved as {output_file}")
+
 
 def main():
     """Main function to run the GitLab audit script."""
     parser = argparse.ArgumentParser(description="Generate an audit report for a GitLab epic")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-g", "--group", required=True, help="GitLab group ID containing the epic")
+    parser.add_argument("-g", "--group", required=True, nargs="+", help="GitLab group ID(s) containing the epics, several are reported on concurrently")
     parser.add_argument("-o", "--output", default="gitlab_epic_report", help="Output CSV file name")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of epics to enrich at once")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local epic cache, only fetching epics updated since the last run")
+    parser.add_argument("--stream", action="store_true", help="Stream epics page by page into the CSV instead of building the whole list first")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="Write a CSV, or append a run_date partition to a Parquet dataset")
+    parser.add_argument("--combined", action="store_true", help="Merge every group into one report with a Source column instead of one file per group")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_MAX_TARGETS, help="Number of groups to report on at once")
 
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
+    if args.combined and args.format == "parquet":
+        parser.error("--combined merges CSV reports, it cannot be used with --format parquet")
        # Authenticate GitLab
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
 
 
     config = load_config()
-    output_file = f"{args.output}_{config['fromDate']}_{config['toDate']}.csv"
+    output_file = report_path(f"{args.output}_{config['fromDate']}_{config['toDate']}", args.format)
+    cache = ReportCache(args.cache) if args.cache else None
     # Generate report
-    generate_audit_report(gl, args.group, config, output_file)
-
-
-    clean_csv_content(output_file)
+    if args.stream:
+        run = lambda group_id, target_file: stream_audit_report(gl, group_id, config, target_file, args.concurrency, cache, args.format)
+    else:
+        run = lambda group_id, target_file: generate_audit_report(gl, group_id, config, target_file, args.concurrency, cache, args.format)
+    fan_out(run, args.group, output_file, args.combined, args.jobs)
 
 
 if __name__ == "__main__":
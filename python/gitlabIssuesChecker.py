@@ -1,7 +1,9 @@
-import requests
 import argparse
 from datetime import date, datetime, timedelta
 import yaml
+from httpCache import DEFAULT_HTTP_CACHE_PATH
+from gitlabSession import API_URL, make_session
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 
 def loadFile():
@@ -69,7 +71,7 @@ def subtractBusinessDay(start_date, business_days_to_subtract):
     return current_date
 
 
-def getIssues(project_id, inital_date, base_url, headers):
+def getIssues(project_id, inital_date, base_url, session):
     '''
     Returns a list of issues from gitlab
     
@@ -77,26 +79,29 @@ def getIssues(project_id, inital_date, base_url, headers):
             project_id: Gitlabs project id
             inital_date: The date we start checking for issues.
             base_url: Gitlab api endpoint
-            headers: The headers we pass to our request.get, In our case its just our api token
+            session: Pooled session carrying our api token, see gitlabSession.make_session
             
         Returns:
-            issues: A list of issues from Gitlab
+            issues: A list of issues from Gitlab created at or before inital_date
     '''
-    params = {"created_before": inital_date}
-    response = requests.get(base_url, params=params, headers=headers)
+    # GitLab is asked for the issues created up to the end of that day, the same URL all day long so its
+    # pages can be revalidated against the HTTP cache, and the exact cutoff is applied below
+    params = {"created_before": f"{inital_date[:10]}T23:59:59"}
+    response = session.get(base_url, params=params)
     issues = response.json()
     if response.status_code == 200:
         while "next" in response.links:
             print("Iterating though project Issues")
-            response = requests.get(response.links["next"]["url"], headers=headers)
+            response = session.get(response.links["next"]["url"])
             issues.extend(response.json())
     else:
         print(f"Error fetching issues, Status Code: {response.status_code}, Response Text: {response.text}")
         return response
-    return issues
+    # API timestamps share the ISO 8601 prefix, so the first 19 characters compare chronologically
+    return [issue for issue in issues if issue["created_at"][:19] <= inital_date]
 
 
-def addComment(comment, base_url, issueId, headers, title, label, web_url):
+def addComment(comment, base_url, issueId, session, title, label, web_url):
     '''
     Puts a comment on an issue in gitlab
     
@@ -104,7 +109,7 @@ def addComment(comment, base_url, issueId, headers, title, label, web_url):
             comment: The comment to add to the issue in gitlab
             base_url: Gitlab api endpoint
             issueId: The uniq id of our gitlab issue
-            headers: The headers we pass to our request.post, In our case its just our api token
+            session: Pooled session carrying our api token, see gitlabSession.make_session
             title: the title of the gitlab issue
     '''
     print("Last auto comment past date theshold")
@@ -113,9 +118,8 @@ def addComment(comment, base_url, issueId, headers, title, label, web_url):
     comment_data = {
         "body": f"~{label}<br> {web_url}<br> {comment}"
     }
-    comment_response = requests.post(
+    comment_response = session.post(
     f"{base_url}/{issueId}/notes",
-        headers=headers,
         json=comment_data
     )
     if comment_response.status_code == 201 or comment_response.status_code == 202:
@@ -124,7 +128,7 @@ def addComment(comment, base_url, issueId, headers, title, label, web_url):
         print(f"Failed to add comment to issue {issueId} Title: {title}, Status Code: {comment_response.status_code}, Response Text: {comment_response.text}")
 
 
-def addLabel(existing_labels, label, base_url, issueId, headers):
+def addLabel(existing_labels, label, base_url, issueId, session):
     '''
     Puts a label on an issue in gitlab
     
@@ -133,14 +137,13 @@ def addLabel(existing_labels, label, base_url, issueId, headers):
             label: The label to add to the gitlab issue
             base_url: Gitlab api endpoint
             issueId: The uniq id of our gitlab issue
-            headers: The headers we pass to our request.post, In our case its just our api token
+            session: Pooled session carrying our api token, see gitlabSession.make_session
     '''
     update_labels = existing_labels + [label] if label not in existing_labels else existing_labels
 
     label_data = {"labels": ",".join(update_labels)}
-    label_response = requests.put(
+    label_response = session.put(
         f"{base_url}/{issueId}",
-        headers=headers,
         json=label_data
     )
 
@@ -150,42 +153,45 @@ def addLabel(existing_labels, label, base_url, issueId, headers):
         print(f"Failed to add label to issue {issueId}, Status Code: {label_response.status_code}, Response Text: {label_response.text}")
 
 
-def getComments(base_url, issueId, headers):
+def getComments(base_url, issueId, session):
     '''
     Return the comments on a gitlab issue
     
         Parameters:
             base_url: Gitlab api endpoint
             issueId: The uniq id of our gitlab issue
-            headers: The headers we pass to our request.post, In our case its just our api token
+            session: Pooled session carrying our api token, see gitlabSession.make_session
 
         Returns:
             comment_response: the comments on a git lab issue
     '''
     comments_url = f"{base_url}/{issueId}/notes"
-    comment_response = requests.get(comments_url, headers=headers)
+    comment_response = session.get(comments_url)
 
     return comment_response
 
 
-def updateIssues(token):
+def updateIssues(token, http_cache_path=DEFAULT_HTTP_CACHE_PATH, cassette=None):
     '''
     Updates issues in gitlab based of label and updated date
     
         Parameters:
             token: Auth token for gitlab api
+            http_cache_path: Where to keep cached GET responses, None to disable the cache
+            cassette: httpCassette.Cassette to record the run to or replay it from
     '''
     config = loadFile()
+    # One pooled keep-alive session for the whole run, rate limited and caching GETs unless http_cache_path is None
+    session = make_session(token, http_cache_path, cassette=cassette)
     if config['projects']:
-        headers = {"PRIVATE-TOKEN": token}
         print(f"Projects found, Iterating through them")
         for project in config['projects']:
             print(f"Running through project {project['projectId']}, Checking for issues that need to be updated")
-            base_url = f"https://gitlab.com/api/v4/projects/{project['projectId']}/issues"
+            base_url = f"{API_URL}/projects/{project['projectId']}/issues"
 
             # finding date time for 10 days ago
             inital_date = str((datetime.now() - timedelta(days=10)).strftime('%Y-%m-%dT%H:%M:%S'))
-            createdIssues = getIssues(project['projectId'], inital_date, base_url, headers)
+            createdIssues = getIssues(project['projectId'], inital_date, base_url, session)
             for issue in createdIssues:
                 # Match on open issues
                 if issue['state'] == "opened":
@@ -205,7 +211,7 @@ def updateIssues(token):
                                 if updated_at <= past_second_business_date:
                                     print("Checking for second update")
                                     ### Start matching on comments here ###
-                                    comment_response = getComments(base_url, issueId, headers)
+                                    comment_response = getComments(base_url, issueId, session)
                                 
 
                                     if comment_response.status_code == 200:
@@ -224,12 +230,12 @@ def updateIssues(token):
                                                 title = issue['title']
                                                 web_url = issue['web_url']
 
-                                                addComment(comment, base_url, issueId, headers, title, label, web_url)
+                                                addComment(comment, base_url, issueId, session, title, label, web_url)
                                                 
                                                 # Add label to ticket just in case its not on there already.
                                                 label = project['labelTag']
                                                 existing_labels = issue.get("labels",[])
-                                                addLabel(existing_labels, label, base_url, issueId, headers)
+                                                addLabel(existing_labels, label, base_url, issueId, session)
                                 
                                 ### Initial update here ###
                                 if updated_at <= past_first_business_date:
@@ -241,12 +247,12 @@ def updateIssues(token):
                                     comment = configLabel['secondComment']
                                     title = issue['title']
                                     web_url = issue['web_url']
-                                    addComment(comment, base_url, issueId, headers, title, label, web_url)
+                                    addComment(comment, base_url, issueId, session, title, label, web_url)
                                     
                                     # Add label to ticket. This is set for tracking purpose.
                                     label = project['labelTag']
                                     existing_labels = issue.get("labels",[])
-                                    addLabel(existing_labels, label, base_url, issueId, headers)
+                                    addLabel(existing_labels, label, base_url, issueId, session)
 
                                 else:
                                     print("No Issues found to update") 
@@ -258,10 +264,14 @@ def main():
     '''
     parser = argparse.ArgumentParser(description="Find and Update (if needed) Gitlab Issues based on Label and last updated date")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for auth")
+    parser.add_argument("--http-cache", default=DEFAULT_HTTP_CACHE_PATH, help="File to cache GET responses in, revalidated with ETags on the next run")
+    parser.add_argument("--no-http-cache", action="store_true", help="Disable the HTTP response cache")
+    # created_before is ten days back from today, so a replay on another day asks for a different URL
+    add_cassette_arguments(parser, ignore_params=("created_before",))
 
     args = parser.parse_args()
 
-    updateIssues(args.token)
+    updateIssues(args.token, None if args.no_http_cache else args.http_cache, cassette_from_args(args))
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,8 @@
-import gitlab
 import argparse
 from datetime import date, datetime, timedelta
 import yaml
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 
 def loadFile():
@@ -143,9 +144,10 @@ def main():
     '''
     parser = argparse.ArgumentParser(description="Find and Update (if needed) Gitlab Issues based on Label and last updated date")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for auth")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
-    gl = gitlab.Gitlab('https://gitlab.com', private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
     config = loadFile()
 
     updateWorkItems(gl, config)
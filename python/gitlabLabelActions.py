@@ -1,8 +1,9 @@
-import requests
 import argparse
 import yaml
-import re
 from itertools import cycle
+from httpCache import DEFAULT_HTTP_CACHE_PATH
+from gitlabSession import API_URL, make_session
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 color_palette = ['#cc338b','#dc143c','#c21e56','#cd5b45','#ed9121',
                  '#eee600','#009966','#8fbc8f','#6699cc','#e6e6fa',
@@ -15,102 +16,162 @@ def loadFile():
     return labels
 
 
-def get_labels(project_id, token, base_url):
-    headers = {"PRIVATE-TOKEN": token}
+def get_labels(project_id, session, base_url):
     params = {"per_page": "100"}
-    response = requests.get(base_url, params=params, headers=headers)
+    response = session.get(base_url, params=params)
     labels = response.json()
     while "next" in response.links:
         print("Iterating though project labels")
-        response = requests.get(response.links["next"]["url"], headers=headers)
+        response = session.get(response.links["next"]["url"])
         labels.extend(response.json())
     return labels
 
 
-def labelActions(token):
-    labels = loadFile()
-    headers = {"PRIVATE-TOKEN": token}
-    pattern = r'^[a-zA-Z]+([A-Z][a-z]+)+$'
-
-    ## Runs through our deleteLabels list and deletes them. 
-    if labels['deleteLabels']:
-        print("Running thourgh the delete labels list")
-        for label in labels['deleteLabels']:
-            base_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels"
-            createdLabels = get_labels(label['projectNumber'], token, base_url)
-            if any(createdLabel["name"] == label['name'] for createdLabel in createdLabels):
-                delete_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels/{label['name']}"
-                response = requests.delete(delete_url, headers=headers)
-                if response.status_code == 204:
-                    print(f"Deleted label {label['name']}")
-                else:
-                    print(f"Failed to delete label {label['name']}, Status Code: {response.status_code}, Response Text: {response.text}")
+def labels_url(project_id):
+    return f"{API_URL}/projects/{project_id}/labels"
+
+
+def get_label_index(session, project_id, label_indexes):
+    """Returns the project's labels keyed by name, fetching each project's labels only once per run."""
+    if project_id not in label_indexes:
+        createdLabels = get_labels(project_id, session, labels_url(project_id))
+        label_indexes[project_id] = {createdLabel["name"]: createdLabel for createdLabel in createdLabels}
+    return label_indexes[project_id]
+
+
+def build_plan(labels, session):
+    '''
+    Works out every label change needed to match the config, without changing anything
+
+        Parameters:
+            labels: The parsed labelsConfig.yaml
+            session: Pooled session carrying our api token, see gitlabSession.make_session
+
+        Returns:
+            plan: Ordered list of actions (delete, create, update, unchanged) for apply_plan
+    '''
+    label_indexes = {}
+    plan = []
+
+    ## Runs through our deleteLabels list first, so a label can be deleted and created again in one run
+    for label in labels.get('deleteLabels') or []:
+        index = get_label_index(session, label['projectNumber'], label_indexes)
+        if label['name'] in index:
+            plan.append({"action": "delete", "project": label['projectNumber'], "name": label['name']})
+            del index[label['name']]
+        else:
+            plan.append({"action": "absent", "project": label['projectNumber'], "name": label['name']})
+
+    for label in labels.get('labels') or []:
+        index = get_label_index(session, label['projectNumber'], label_indexes)
+        for child in label['children']:
+            name = label['name'] + child['name']
+            promote = child.get('groupLabel', False) == True
+            matching_label = index.get(name)
+            if matching_label:
+                changes = {}
+                if matching_label['description'] != child['description']:
+                    changes['description'] = (matching_label['description'], child['description'])
+                if matching_label['priority'] != child.get('priority', None):
+                    changes['priority'] = (matching_label['priority'], child.get('priority', None))
+                if matching_label['color'] != label['color']:
+                    changes['color'] = (matching_label['color'], label['color'])
+                if not changes:
+                    plan.append({"action": "unchanged", "project": label['projectNumber'], "name": name})
+                    continue
+                label_data = {"color": label.get('color', matching_label['color']), "description": child['description'], "id": label['projectNumber'], "priority": child.get('priority', '')}
+                plan.append({"action": "update", "project": label['projectNumber'], "name": name, "data": label_data, "changes": changes, "promote": promote})
             else:
-                print(f"Label {label['name']} is already deleted")
-
-    ## Runs through our Labels list and creates them
-    if labels['labels']:
-        print("Running thourgh the create labels list")
-        for label in labels['labels']:
-            for child in label['children']:
-#                isCamelCase = bool(re.match(pattern, label['name']))
-#                if isCamelCase == True:
-                    base_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels"
-                    createdLabels = get_labels(label['projectNumber'], token, base_url)
-                # Check for existing label and differences 
-                    matching_label = next( 
-                        ( createdLabel for createdLabel in createdLabels 
-                        if createdLabel["name"] == label['name'] + child['name'] ), None )
-                    if matching_label: 
-                        print(matching_label)
-                        if ( matching_label['description'] != child['description'] or matching_label['priority'] != child.get('priority', None) or matching_label['color'] != label['color']): 
-                            print(f"Label {label['name']}{child['name']} already exists but needs updating.") 
-                            print("Updating label with config file.")
-                            update_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels/{label['name']}{child['name']}"
-                            label_data = {"color": label.get('color', matching_label['color']), "description": child['description'], "id": label['projectNumber'], "priority": child.get('priority', '')}
-                            response = requests.put(update_url, data=label_data, headers=headers)
-                            if response.status_code == 200:
-                                print(f"Updated label {label['name']}{child['name']}") 
-                                if child.get('groupLabel', False) == True:
-                                    print('Promoting to Group Label')
-                                    promote_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels/{label['name']}{child['name']}/promote"
-                                    response = requests.put(promote_url, headers=headers)
-                                    if response.status_code == 200:
-                                        print(f"Label {label['name']}{child['name']} promoted to group label")
-                                    else:
-                                        print(f"Failed to Promote label {label['name']}{child['name']}, State Code: {response.status_code}, Response Text: {response.text}")
-                            else:
-                                print(f"Failed to update label {label['name']}{child['name']}, State Code: {response.status_code}, Response Text: {response.text}")
-                        else:
-                            print(f"Label {label['name']}{child['name']} already exists and nothing to update")
-                    else:
-                        print(f"Label {label['name']}{child['name']} not created, Creating")
-                        assigned_color = next(color_cycle)
-                        label_data = {"name": label['name'] + child['name'], "color": label['color'], "description": child['description'], "id": label['projectNumber'], "priority": child.get('priority', '')}
-                        response = requests.post(base_url, data=label_data, headers=headers)
-                        if response.status_code == 201:
-                            print(f"Created label {label['name']}{child['name']}")
-                            if child.get('groupLabel', False) == True:
-                                print('Promoting to Group Label')
-                                promote_url = f"https://gitlab.com/api/v4/projects/{label['projectNumber']}/labels/{label['name']}{child['name']}/promote"
-                                response = requests.put(promote_url, headers=headers)
-                                if response.status_code == 200:
-                                    print(f"Label {label['name']}{child['name']} promoted to group label")
-                                else:
-                                    print(f"Failed to Promote label {label['name']}{child['name']}, State Code: {response.status_code}, Response Text: {response.text}")
-                        else:
-                            print(f"Failed to create label {label['name']}{child['name']}, State Code: {response.status_code}, Response Text: {response.text}")
-#                else:
-#                    print(f"Label name {label['name']}{child['name']} is not Camel Cased Please make it Camel Cased in order to proceed.")
-        return False
+                label_data = {"name": name, "color": label['color'], "description": child['description'], "id": label['projectNumber'], "priority": child.get('priority', '')}
+                plan.append({"action": "create", "project": label['projectNumber'], "name": name, "data": label_data, "promote": promote})
+            # Later entries for the same name compare against what this run will leave behind
+            index[name] = {"name": name, "color": label['color'], "description": child['description'], "priority": child.get('priority', None)}
+
+    return plan
+
+
+def print_plan(plan):
+    """Prints the plan as a diff against the labels that exist in GitLab."""
+    for step in plan:
+        promote = " (then promote to group label)" if step.get("promote") else ""
+        if step["action"] == "create":
+            print(f"+ {step['name']} in project {step['project']}{promote}")
+        elif step["action"] == "update":
+            print(f"~ {step['name']} in project {step['project']}{promote}")
+            for field, (old, new) in step["changes"].items():
+                print(f"    {field}: {old!r} -> {new!r}")
+        elif step["action"] == "delete":
+            print(f"- {step['name']} in project {step['project']}")
+    counts = {action: sum(1 for step in plan if step["action"] == action) for action in ("create", "update", "delete", "unchanged")}
+    print(f"Plan: {counts['create']} to create, {counts['update']} to update, {counts['delete']} to delete, {counts['unchanged']} unchanged")
+
+
+def promote_label(session, step):
+    print('Promoting to Group Label')
+    response = session.put(f"{labels_url(step['project'])}/{step['name']}/promote")
+    if response.status_code == 200:
+        print(f"Label {step['name']} promoted to group label")
+    else:
+        print(f"Failed to Promote label {step['name']}, State Code: {response.status_code}, Response Text: {response.text}")
+
+
+def apply_plan(plan, session):
+    """Runs only the label mutations the plan calls for."""
+    for step in plan:
+        if step["action"] == "absent":
+            print(f"Label {step['name']} is already deleted")
+        elif step["action"] == "unchanged":
+            print(f"Label {step['name']} already exists and nothing to update")
+        elif step["action"] == "delete":
+            response = session.delete(f"{labels_url(step['project'])}/{step['name']}")
+            if response.status_code == 204:
+                print(f"Deleted label {step['name']}")
+            else:
+                print(f"Failed to delete label {step['name']}, Status Code: {response.status_code}, Response Text: {response.text}")
+        elif step["action"] == "update":
+            print(f"Label {step['name']} already exists but needs updating.")
+            print("Updating label with config file.")
+            response = session.put(f"{labels_url(step['project'])}/{step['name']}", data=step["data"])
+            if response.status_code == 200:
+                print(f"Updated label {step['name']}")
+                if step["promote"]:
+                    promote_label(session, step)
+            else:
+                print(f"Failed to update label {step['name']}, State Code: {response.status_code}, Response Text: {response.text}")
+        elif step["action"] == "create":
+            print(f"Label {step['name']} not created, Creating")
+            response = session.post(labels_url(step['project']), data=step["data"])
+            if response.status_code == 201:
+                print(f"Created label {step['name']}")
+                if step["promote"]:
+                    promote_label(session, step)
+            else:
+                print(f"Failed to create label {step['name']}, State Code: {response.status_code}, Response Text: {response.text}")
+
+
+def labelActions(token, http_cache_path=DEFAULT_HTTP_CACHE_PATH, plan_only=False, cassette=None):
+    labels = loadFile()
+    # One pooled keep-alive session for the whole run, rate limited and caching GETs unless http_cache_path is None
+    session = make_session(token, http_cache_path, cassette=cassette)
+
+    plan = build_plan(labels, session)
+    print_plan(plan)
+    if plan_only:
+        return plan
+    apply_plan(plan, session)
+    return plan
 
 def main():
     parser = argparse.ArgumentParser(description="Create / Update / or Delete Gitlab labels")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for auth")
+    parser.add_argument("--plan", action="store_true", help="Only print the changes that would be made")
+    parser.add_argument("--http-cache", default=DEFAULT_HTTP_CACHE_PATH, help="File to cache GET responses in, revalidated with ETags on the next run")
+    parser.add_argument("--no-http-cache", action="store_true", help="Disable the HTTP response cache")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
 
-    labelActions(args.token)
+    labelActions(args.token, None if args.no_http_cache else args.http_cache, args.plan, cassette_from_args(args))
 
 if __name__ == "__main__":
     main()
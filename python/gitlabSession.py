@@ -0,0 +1,74 @@
+import os
+import gitlab
+from requests.adapters import HTTPAdapter
+from httpCache import CachedSession, HttpCache
+from httpCassette import CassetteSession
+from rateLimiter import DEFAULT_MAX_CONCURRENCY, RateLimitedSession
+
+# Overridden to point every tool at a self-managed instance or the offline fake in benchmarks/fakeGitlab.py
+GITLAB_URL = os.environ.get("GITLAB_URL", "https://gitlab.com").rstrip("/")
+API_URL = f"{GITLAB_URL}/api/v4"
+
+
+class CachedRateLimitedSession(CachedSession, RateLimitedSession):
+    """Revalidates GETs against an HttpCache and sends whatever reaches GitLab through a RateLimiter."""
+
+
+class CassetteRateLimitedSession(CassetteSession, RateLimitedSession):
+    """Records responses to, or replays them from, a Cassette; recorded requests go through a RateLimiter."""
+
+
+class CassetteCachedRateLimitedSession(CassetteSession, CachedSession, RateLimitedSession):
+    """CachedRateLimitedSession behind a Cassette."""
+
+
+class RateLimitedGitlab(gitlab.Gitlab):
+    """python-gitlab client that leaves 429s to the session's RateLimiter instead of retrying them on top of it."""
+
+    def http_request(self, *args, obey_rate_limit=False, max_retries=0, **kwargs):
+        return super().http_request(*args, obey_rate_limit=obey_rate_limit, max_retries=max_retries, **kwargs)
+
+
+def mount_pool(session, pool_size=DEFAULT_MAX_CONCURRENCY):
+    """Gives a session a keep-alive connection pool big enough for pool_size concurrent requests."""
+    # Retries are the rate limiter's job, so the adapter itself never retries
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def make_session(token, http_cache_path=None, limiter=None, pool_size=DEFAULT_MAX_CONCURRENCY, cassette=None):
+    '''
+    Returns the one session the requests-based tools send all of their calls through
+
+    Connections to GitLab are kept alive and reused from a pool, so a run pays for
+    the TLS handshake once per pooled connection instead of once per request.
+
+        Parameters:
+            token: GitLab private token, set on the session once for every request
+            http_cache_path: File for the ETag response cache, None to go without one
+            limiter: RateLimiter to share, defaults to the process-wide one
+            pool_size: Connections kept open for concurrent requests
+            cassette: httpCassette.Cassette to record the run to or replay it from, None to go without one
+
+        Returns:
+            session: A pooled, rate limited (and optionally caching) requests.Session
+    '''
+    if cassette and http_cache_path:
+        session = CassetteCachedRateLimitedSession(cassette, cache=HttpCache(http_cache_path), limiter=limiter)
+    elif cassette:
+        session = CassetteRateLimitedSession(cassette, limiter=limiter)
+    elif http_cache_path:
+        session = CachedRateLimitedSession(cache=HttpCache(http_cache_path), limiter=limiter)
+    else:
+        session = RateLimitedSession(limiter=limiter)
+    session.headers.update({"PRIVATE-TOKEN": token})
+    return mount_pool(session, pool_size)
+
+
+def connect(token, limiter=None, pool_size=DEFAULT_MAX_CONCURRENCY, cassette=None):
+    """Returns a python-gitlab client on a pooled session whose requests go through the shared rate limiter (or a cassette)."""
+    session = CassetteRateLimitedSession(cassette, limiter=limiter) if cassette else RateLimitedSession(limiter)
+    session = mount_pool(session, pool_size)
+    return RateLimitedGitlab(GITLAB_URL, private_token=token, session=session)
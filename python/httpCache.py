@@ -0,0 +1,135 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_HTTP_CACHE_PATH = ".cache/http_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+"""
+
+
+class HttpCache:
+    '''
+    On-disk store of GET response bodies with their ETag / Last-Modified validators
+
+        Parameters:
+            path: SQLite file the responses are kept in
+    '''
+
+    def __init__(self, path=DEFAULT_HTTP_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "headers": json.loads(row[2]), "body": row[3]}
+
+    def store(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(dict(response.headers)), response.content),
+            )
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def report(self):
+        print(f"HTTP cache: {self.hits} hits (304 Not Modified), {self.misses} misses")
+
+
+def cached_response(entry, request, not_modified):
+    '''
+    Rebuilds a 200 response from a cache entry after the server answered 304
+
+        Parameters:
+            entry: Cache entry from HttpCache.get
+            request: The prepared request that was revalidated
+            not_modified: The 304 response, whose headers replace the stored ones
+
+        Returns:
+            response: requests.Response carrying the cached body
+    '''
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    # A 304 carries fresh headers (rate limit, pagination links); they win over stored ones
+    response.headers.update(not_modified.headers)
+    response.headers.pop("Content-Length", None)
+    response._content = entry["body"]
+    response.url = request.url
+    response.request = request
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+    response.elapsed = not_modified.elapsed
+    response.from_cache = True
+    return response
+
+
+class CachedSession(requests.Session):
+    '''
+    requests.Session that revalidates GETs against an HttpCache
+
+    Every GET with a stored ETag / Last-Modified is sent with If-None-Match /
+    If-Modified-Since. An unchanged page comes back as a 304 with no body and is
+    answered from the cache, so it costs almost no bandwidth. Hit and miss counts
+    are printed when the process exits.
+
+        Parameters:
+            cache: HttpCache to use, defaults to one at DEFAULT_HTTP_CACHE_PATH
+    '''
+
+    def __init__(self, cache=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache or HttpCache()
+        atexit.register(self.cache.report)
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.record(hit=True)
+            return cached_response(entry, request, response)
+
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            self.cache.store(request.url, response)
+        return response
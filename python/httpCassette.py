@@ -0,0 +1,199 @@
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+
+RECORD = "record"
+REPLAY = "replay"
+
+# The stored body is already decoded, so the headers describing the wire encoding no longer apply
+DROPPED_HEADERS = ("Content-Encoding", "Content-Length", "Transfer-Encoding", "Connection", "Set-Cookie")
+
+# Query parameters left out of every request key: the ReportCache sync watermark moves between runs
+VOLATILE_PARAMS = ("updated_after",)
+
+
+def request_key(request, ignore_params=VOLATILE_PARAMS):
+    '''
+    Identifies a request by method, URL (query and pagination included) and body, never by its token
+
+    Query parameters in ignore_params are left out, so a request whose URL carries
+    a value taken from the clock or a local watermark is matched on replay.
+
+        Parameters:
+            request: The prepared request
+            ignore_params: Names of the query parameters to leave out
+    '''
+    url = request.url
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(name, value) for name, value in query if name not in ignore_params]
+    if len(kept) != len(query):
+        url = urlunsplit(parts._replace(query=urlencode(kept)))
+
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return f"{request.method} {url} {hashlib.sha1(body).hexdigest() if body else ''}"
+
+
+class Cassette:
+    '''
+    Gzipped file of every GitLab response a run received, for replaying the run offline
+
+    Recording keeps each response with its status, headers (pagination links,
+    totals, rate limit) and body, keyed on the request's method, URL and body,
+    minus the query parameters that differ from run to run (see request_key).
+    Replaying loads the whole file into memory and answers every request from it,
+    so a run that paged through GitLab for minutes replays in seconds. A request
+    made several times with different answers (an issue before and after an
+    update) gets them back in the order they were recorded, then the last one.
+    The token is never written to the cassette.
+
+        Parameters:
+            path: Cassette file, e.g. runs/issues.cassette.gz
+            mode: RECORD to capture a live run, REPLAY to answer from an earlier one
+            ignore_params: Query parameters left out of the request keys, the same for recording and replaying
+    '''
+
+    def __init__(self, path, mode=REPLAY, ignore_params=VOLATILE_PARAMS):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.ignore_params = tuple(ignore_params)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._played = {}
+        self.count = 0
+        self.misses = 0
+        if mode == REPLAY:
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, gzip.open(self.path, "wt", encoding="utf-8") as file:
+            for entries in self._entries.values():
+                for entry in entries:
+                    file.write(json.dumps(entry) + "\n")
+
+    def record(self, request, response):
+        entry = {
+            "key": request_key(request, self.ignore_params),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items() if name not in DROPPED_HEADERS},
+        }
+        try:
+            entry["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(response.content).decode("ascii")
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            self.count += 1
+
+    def play(self, request):
+        '''
+        Answers a request from the cassette
+
+            Parameters:
+                request: The prepared request the tool would have sent
+
+            Returns:
+                response: requests.Response rebuilt from the recorded one
+
+            Raises:
+                requests.ConnectionError: The request was not recorded, as if GitLab could not be reached
+        '''
+        key = request_key(request, self.ignore_params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise requests.ConnectionError(f"{request.method} {request.url} is not in the cassette {self.path}", request=request)
+            index = self._played.get(key, 0)
+            self._played[key] = index + 1
+            self.count += 1
+        entry = entries[min(index, len(entries) - 1)]
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8") if "body" in entry else base64.b64decode(entry["body_base64"])
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+        response.from_cassette = True
+        return response
+
+    def close(self):
+        """Writes a recording out and prints what the cassette did."""
+        if self.mode == RECORD:
+            self.save()
+            print(f"Cassette: {self.count} responses recorded to {self.path}")
+        else:
+            print(f"Cassette: {self.count} responses replayed from {self.path}, {self.misses} requests not in it")
+
+
+class CassetteSession(requests.Session):
+    '''
+    requests.Session that records its responses to, or replays them from, a Cassette
+
+    Put it in front of the other session mixins: a recording captures responses
+    as the tool finally sees them, after the rate limiter and the HTTP cache, and a
+    replay answers before either of them, so nothing is sent and nothing waits.
+    The cassette is written (or its replay summary printed) when the process exits.
+
+        Parameters:
+            cassette: Cassette to record to or replay from
+    '''
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        atexit.register(cassette.close)
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == REPLAY:
+            return self.cassette.play(request)
+        response = super().send(request, **kwargs)
+        self.cassette.record(request, response)
+        return response
+
+
+def add_cassette_arguments(parser, ignore_params=()):
+    '''
+    Adds the mutually exclusive --record / --replay options to a tool's argument parser
+
+        Parameters:
+            parser: The tool's argparse.ArgumentParser
+            ignore_params: Query parameters the tool derives from the clock, left out of the request keys with VOLATILE_PARAMS
+    '''
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="CASSETTE", help="Save every GitLab response of this run to a compressed cassette file")
+    group.add_argument("--replay", metavar="CASSETTE", help="Answer every GitLab request from a cassette saved with --record, without going online")
+    parser.set_defaults(cassette_ignore_params=VOLATILE_PARAMS + tuple(ignore_params))
+
+
+def cassette_from_args(args):
+    """The Cassette the --record / --replay options ask for, or None."""
+    ignore_params = getattr(args, "cassette_ignore_params", VOLATILE_PARAMS)
+    if args.record:
+        return Cassette(args.record, RECORD, ignore_params)
+    if args.replay:
+        return Cassette(args.replay, REPLAY, ignore_params)
+    return None
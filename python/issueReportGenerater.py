@@ -1,10 +1,16 @@
-import gitlab
-import csv
 import argparse
 import re
-import pandas as pd
 import yaml
 from datetime import datetime
+from reportQuery import build_issue_query, iter_items, matches_labels, matches_params
+from reportCache import DEFAULT_CACHE_PATH, ReportCache
+from reportFanout import DEFAULT_MAX_TARGETS, fan_out
+import graphqlFetcher
+from reportParquet import OUTPUT_FORMATS, report_path
+from reportStream import open_report_writer, write_streamed_csv
+from textCleaner import clean_basic_text
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 def load_config(labels, fromDate, toDate, state):
 
@@ -21,44 +27,25 @@ def load_config(labels, fromDate, toDate, state):
 
 
 
-def get_issues_details(gl, project_id, config):
+def get_issues_details(gl, project_id, config, cache=None):
     """Retrieve all issues in a GitLab project matching labels and date range."""
-    label_filters = set(config["labels"])
-    print(label_filters)
-
-    from_date = datetime.strptime(config["fromDate"], "%m-%d-%Y")
-    to_date = datetime.strptime(config["toDate"], "%m-%d-%Y")
-
-    project = gl.projects.get(project_id)
+    return list(iter_issues_details(gl, project_id, config, cache))
 
-    all_issues = []
-    page = 1
-    while True:
-        issues = project.issues.list(per_page=100, page=page)  # Request 100 issues per page
-        if not issues:
-            break
-        all_issues.extend(issues)
-        page += 1
 
-    filtered_issues = []
-    for issue in all_issues:
-        if config['state'] is not None:
-            if issue.state == config['state']:
-                issue_created_at = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+def iter_issues_details(gl, project_id, config, cache=None):
+    """Yields the issues get_issues_details returns, page by page as they are fetched."""
+    params, label_filters = build_issue_query(config)
+    print(label_filters)
 
-                if from_date <= issue_created_at <= to_date and issue.labels and any(
-                    label in issue_label for issue_label in issue.labels for label in label_filters
-                    ):
-                    filtered_issues.append(issue)
-        else:
-            issue_created_at = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+    project = gl.projects.get(project_id)
 
-            if from_date <= issue_created_at <= to_date and issue.labels and any(
-                label in issue_label for issue_label in issue.labels for label in label_filters
-                ):
-                filtered_issues.append(issue)
+    if cache:
+        # The cache holds the whole project, so apply the server-side filters locally
+        all_issues = [issue for issue in cache.sync_issues(project) if matches_params(issue, params)]
+    else:
+        all_issues = iter_items(project.issues, **params)  # State, dates and label presence are filtered by GitLab
 
-    return filtered_issues
+    return (issue for issue in all_issues if matches_labels(issue, label_filters))
 
 
 def extract_labels(issue):
@@ -149,9 +136,78 @@ def get_related_issues(issue, label_filters):
         return "N/A"
 
 
-def generate_issues_report(gl, project_id, config, output_file):
+REPORT_FIELDS = ["Issue ID", "Issue Title", "Assignees", "Created Date", "Created By", "Last Updated", "Type", "Priority", "Status", "Release", "Latest Comment", "Due Date", "Days Past Due", "Related Issues"]
+
+# Typed columns of the Parquet output, the rest are text
+PARQUET_TYPES = {"Issue ID": "int", "Created Date": "date", "Last Updated": "date", "Due Date": "date", "Days Past Due": "int"}
+
+
+def build_issue_row(issue, config, today, backend="rest", cache=None):
+    """Builds one CSV row for an issue, fetching its latest comment and related issues."""
+    extracted_fields = extract_all_headers(issue.description)
+    label_data = extract_labels(issue)
+    if backend == "graphql":
+        latest_comment = issue.latest_comment
+        related_issues = issue.related_issues
+    elif cache:
+        latest_comment = cache.cached(issue, "latest_comment", lambda: get_latest_comment(issue))
+        related_issues = cache.fresh(issue, "related_issues", lambda: get_related_issues(issue, set(config["labels"])))
+    else:
+        latest_comment = get_latest_comment(issue)
+        related_issues = get_related_issues(issue, set(config["labels"]))
+    assignees = ", ".join([assignee["name"] for assignee in issue.assignees]) if issue.assignees else "Unassigned"
+    created_date_datetime = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+    created_date = created_date_datetime.strftime("%m-%d-%Y")
+    updated_at_datetime = datetime.strptime(issue.updated_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+    updated_at = updated_at_datetime.strftime("%m-%d-%Y")
+
+    return {
+        "Issue ID": issue.iid,
+        "Issue Title": issue.title,
+        "Created Date": created_date,
+        "Assignees": assignees,
+        "Created By": issue.author["name"],
+        "Last Updated": updated_at,
+        "Type": label_data["Type"],
+        "Priority": label_data["Priority"],
+        "Status": label_data["Status"],
+        "Release": label_data["Release"],
+        **extracted_fields,
+        "Latest Comment": latest_comment,
+        "Due Date": issue.due_date if issue.due_date else "N/A",
+        "Days Past Due": (
+            (today - datetime.strptime(issue.due_date, "%Y-%m-%d").date()).days
+            if issue.due_date else "N/A"
+        ),
+        "Related Issues": related_issues
+    }
+
+
+def stream_issues_report(gl, project_id, config, output_file, cache=None, output_format="csv"):
+    """Generates the issue report as a stream: fetch, filter and row building run page by page."""
+    today = datetime.utcnow().date()
+    issues = iter_issues_details(gl, project_id, config, cache)
+    rows = (build_issue_row(issue, config, today, cache=cache) for issue in issues)
+
+    if not write_streamed_csv(rows, REPORT_FIELDS, output_file, clean_basic_text, output_format, PARQUET_TYPES):
+        print("No issues found")
+        return
+
+    print(f"Report saved as {output_file}")
+
+
+def generate_issues_report(gl, project_id, config, output_file, backend="rest", cache=None, output_format="csv"):
     """Generates an issue report and saves it to a CSV file."""
-    issues = get_issues_details(gl, project_id, config)
+    if backend == "graphql":
+        # Comments and linked issues come back inlined, so there are no per-issue calls below
+        issues = graphqlFetcher.get_issues_details(gl, project_id, config)
+    else:
+        issues = get_issues_details(gl, project_id, config, cache)
+    write_issues_report(issues, config, output_file, backend, cache, output_format)
+
+
+def write_issues_report(issues, config, output_file, backend="rest", cache=None, output_format="csv"):
+    """Writes the issue report CSV (or Parquet partition) for issues already fetched and filtered."""
     today = datetime.utcnow().date()
 
     if not issues:
@@ -164,86 +220,52 @@ def generate_issues_report(gl, project_id, config, output_file):
         extracted_fields = extract_all_headers(issue.description)
         all_headers.update(extracted_fields.keys())
 
-    fieldnames = ["Issue ID", "Issue Title", "Assignees", "Created Date", "Created By", "Last Updated", "Type", "Priority", "Status", "Release", "Latest Comment", "Due Date", "Days Past Due", "Related Issues"] + sorted(all_headers)
+    fieldnames = REPORT_FIELDS + sorted(all_headers)
 
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+    with open_report_writer(output_file, fieldnames, clean_basic_text, output_format, PARQUET_TYPES) as writer:
         writer.writeheader()
 
         for issue in issues:
-            extracted_fields = extract_all_headers(issue.description)
-            label_data = extract_labels(issue)
-            latest_comment = get_latest_comment(issue)
-            related_issues = get_related_issues(issue, set(config["labels"]))
-            assignees = ", ".join([assignee["name"] for assignee in issue.assignees]) if issue.assignees else "Unassigned"
-            created_date_datetime = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
-            created_date = created_date_datetime.strftime("%m-%d-%Y")
-            updated_at_datetime = datetime.strptime(issue.updated_at, "%Y-%m-%dT%H:%M:%S.%fZ")
-            updated_at = updated_at_datetime.strftime("%m-%d-%Y")
-
-            writer.writerow({
-                "Issue ID": issue.iid,
-                "Issue Title": issue.title,
-                "Created Date": created_date,
-                "Assignees": assignees,
-                "Created By": issue.author["name"],
-                "Last Updated": updated_at,
-                "Type": label_data["Type"],
-                "Priority": label_data["Priority"],
-                "Status": label_data["Status"],
-                "Release": label_data["Release"],
-                **extracted_fields,
-                "Latest Comment": latest_comment,
-                "Due Date": issue.due_date if issue.due_date else "N/A",
-                "Days Past Due": (
-                    (today - datetime.strptime(issue.due_date, "%Y-%m-%d").date()).days
-                    if issue.due_date else "N/A"
-                ),
-                "Related Issues": related_issues
-            })
+            writer.writerow(build_issue_row(issue, config, today, backend, cache))
 
     print(f"Report saved as {output_file}")
 
 
-def clean_csv_content(file_path):
-    """Cleans CSV content after writing."""
-    df = pd.read_csv(file_path, dtype=str)
-
-    def clean_text(text):
-        if pd.isna(text):
-            return ""
-        text = text.replace("\u00A0", " ").replace("\r", "").strip()
-        text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
-        text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
-        text = re.sub(r"`([\w\s,]+)`", r"\1", text)
-        text = re.sub(r"_([\w\s()]+)_", r"\1", text)
-        text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
-        return text.strip()
-
-    df = df.applymap(clean_text)
-    df.to_csv(file_path, index=False, encoding="utf-8")
-    print(f"Cleaned report saved as {file_path}")
-
-
 def main():
     """Main function to run the GitLab issues report."""
     parser = argparse.ArgumentParser(description="Generate an issue report for a GitLab project")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-p", "--project", required=True, help="GitLab project ID")
+    parser.add_argument("-p", "--project", required=True, nargs="+", help="GitLab project ID(s), several are reported on concurrently")
     parser.add_argument("-o", "--output", default="gitlab_issues_report", help="Output CSV file name")
     parser.add_argument("-td", "--toDate", required=True, help="the date to end the report generation")
     parser.add_argument("-fd", "--fromDate", required=True, help="the date to start the report generation")
     parser.add_argument("-l", "--labels", required=True, nargs="+", help="labels to match on")
     parser.add_argument("-s", "--state", default='', help="state the ticket is in, EI open or closed")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local issue cache, only fetching issues updated since the last run")
+    parser.add_argument("--stream", action="store_true", help="Stream issues page by page into the CSV instead of building the whole list first")
+    parser.add_argument("--combined", action="store_true", help="Merge every project into one report with a Source column instead of one file per project")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_MAX_TARGETS, help="Number of projects to report on at once")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="Write a CSV, or append a run_date partition to a Parquet dataset")
+    parser.add_argument("-b", "--backend", choices=["rest", "graphql"], default="rest", help="API used to fetch issues, graphql fetches comments and linked issues in bulk")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    if args.combined and args.format == "parquet":
+        parser.error("--combined merges CSV reports, it cannot be used with --format parquet")
+    if args.stream and args.backend == "graphql":
+        parser.error("--stream pages through the REST API, it cannot be used with --backend graphql")
+    gl = connect(args.token, cassette=cassette_from_args(args))
 
     config = load_config(args.labels, args.fromDate, args.toDate, args.state)
-    output_file = f"Reports/Issues/{args.output}_{config['fromDate']}_{config['toDate']}.csv"
+    output_file = report_path(f"Reports/Issues/{args.output}_{config['fromDate']}_{config['toDate']}", args.format)
+
+    cache = ReportCache(args.cache) if args.cache else None
 
-    generate_issues_report(gl, args.project, config, output_file)
-    clean_csv_content(output_file)
+    if args.stream:
+        run = lambda project_id, target_file: stream_issues_report(gl, project_id, config, target_file, cache, args.format)
+    else:
+        run = lambda project_id, target_file: generate_issues_report(gl, project_id, config, target_file, args.backend, cache, args.format)
+    fan_out(run, args.project, output_file, args.combined, args.jobs)
 
 
 if __name__ == "__main__":
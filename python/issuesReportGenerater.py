@@ -1,10 +1,12 @@
-import gitlab
-import csv
 import argparse
 import re
-import pandas as pd
 import yaml
 from datetime import datetime
+from reportQuery import build_issue_query, iter_items, matches_labels
+from reportFanout import DEFAULT_MAX_TARGETS, fan_out
+from textCleaner import CleaningDictWriter, clean_text
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
 
 
 def load_config():
@@ -15,31 +17,15 @@ def load_config():
 
 def get_issues_details(gl, project_id, config):
     """Retrieve all issues in a GitLab project matching labels and date range."""
-    label_filters = set(config["labels"])
+    params, label_filters = build_issue_query(config)
     print(label_filters)
 
-    from_date = datetime.strptime(config["fromDate"], "%m-%d-%Y")
-    to_date = datetime.strptime(config["toDate"], "%m-%d-%Y")
-
     project = gl.projects.get(project_id)
 
-    all_issues = []
-    page = 1
-    while True:
-        issues = project.issues.list(per_page=100, page=page)  # Request 100 issues per page
-        if not issues:
-            break
-        all_issues.extend(issues)
-        page += 1
-
-    filtered_issues = []
-    for issue in all_issues:
-        issue_created_at = datetime.strptime(issue.created_at, "%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if from_date <= issue_created_at <= to_date and issue.labels and any(
-            label in issue_label for issue_label in issue.labels for label in label_filters
-        ):
-            filtered_issues.append(issue)
+    all_issues = iter_items(project.issues, **params)  # State, dates and label presence are filtered by GitLab
+
+    filtered_issues = [issue for issue in all_issues if matches_labels(issue, label_filters)]
+
     return filtered_issues
 
 
@@ -113,6 +99,11 @@ def extract_all_headers(description):
 def generate_issues_report(gl, project_id, config, output_file):
     """Generates an issue report and saves it to a CSV file."""
     issues = get_issues_details(gl, project_id, config)
+    write_issues_report(issues, config, output_file)
+
+
+def write_issues_report(issues, config, output_file, cache=None):
+    """Writes the issue report CSV for issues already fetched and filtered, reusing per-issue details from cache when given."""
     today = datetime.utcnow().date()
 
     if not issues:
@@ -128,13 +119,16 @@ def generate_issues_report(gl, project_id, config, output_file):
     fieldnames = ["Issue ID", "Issue Title", "Assignees", "Created Date", "Created By", "Last Updated", "Type", "Priority", "Status", "Release", "Latest Comment", "Due Date", "Days Past Due"] + sorted(all_headers)
 
     with open(output_file, mode="w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer = CleaningDictWriter(csv_file, fieldnames, clean_text)
         writer.writeheader()
 
         for issue in issues:
             extracted_fields = extract_all_headers(issue.description)
             label_data = extract_labels(issue)
-            latest_comment = get_latest_comment(issue)
+            if cache:
+                latest_comment = cache.cached(issue, "latest_comment", lambda: get_latest_comment(issue))
+            else:
+                latest_comment = get_latest_comment(issue)
             assignees = ", ".join([assignee["name"] for assignee in issue.assignees]) if issue.assignees else "Unassigned"
             
             writer.writerow({
@@ -160,58 +154,24 @@ def generate_issues_report(gl, project_id, config, output_file):
     print(f"Report saved as {output_file}")
 
 
-def clean_csv_content(file_path):
-    """Loads CSV, cleans all fields, and rewrites it."""
-    df = pd.read_csv(file_path, dtype=str)  # Load CSV as a DataFrame (all text)
-
-
-    def clean_text(text):
-        """Applies regex to remove comments and 'Insert date here:' from text fields."""
-        if pd.isna(text):
-            return ""  # Handle NaN values
-
-
-        text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
-        text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
-        text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
-        checkedCheckboxes = re.findall(r"- \[x\] (.+)", text)  # Extract only checked items
-        text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"_([\w\s()]+)_", r"\1", text)
-        text = re.sub(r"`(\d{2}-\d{2}-\d{4})`", r"\1", text)
-        text = re.sub(r" \\", "", text)
-        text = re.sub(r"Enter Text here","",text, flags=re.IGNORECASE)
-        text = re.sub(r"`([\w\s,]+)`", r"\1", text)
-        if checkedCheckboxes:
-          text = ", ".join(checkedCheckboxes)  # Keep checked items as a comma-separated string
-        else:
-           text = text.strip()
-        return text.strip()
-
-
-    # Apply cleaning to every text field in the DataFrame
-    df = df.applymap(clean_text)
-
-
-    # Save cleaned CSV
-    df.to_csv(file_path, index=False, encoding="utf-8")
-    print(f"Cleaned report saved as {file_path}")
-
-
 def main():
     """Main function to run the GitLab issues report."""
     parser = argparse.ArgumentParser(description="Generate an issue report for a GitLab project")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-p", "--project", required=True, help="GitLab project ID")
+    parser.add_argument("-p", "--project", required=True, nargs="+", help="GitLab project ID(s), several are reported on concurrently")
     parser.add_argument("-o", "--output", default="gitlab_issues_report", help="Output CSV file name")
+    parser.add_argument("--combined", action="store_true", help="Merge every project into one report with a Source column instead of one file per project")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_MAX_TARGETS, help="Number of projects to report on at once")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
 
     config = load_config()
     output_file = f"{args.output}_{config['fromDate']}_{config['toDate']}.csv"
 
-    generate_issues_report(gl, args.project, config, output_file)
-    clean_csv_content(output_file)
+    run = lambda project_id, target_file: generate_issues_report(gl, project_id, config, target_file)
+    fan_out(run, args.project, output_file, args.combined, args.jobs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+import requests
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 6
+
+# Below this share of the window's budget, requests are spread evenly over the time left until reset
+LOW_HEADROOM = 0.2
+# Above this share, the concurrency limit is raised again after a throttle
+HIGH_HEADROOM = 0.5
+
+
+def header_number(response, name):
+    value = response.headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    '''
+    Shared request executor that keeps GitLab calls inside the rate limit
+
+    It reads RateLimit-Limit / RateLimit-Remaining / RateLimit-Reset from every
+    response. When the remaining budget runs low, requests are spaced out so the
+    rest of the budget lasts until the window resets. A 429 is retried with
+    jittered exponential backoff (honouring Retry-After), pauses every thread
+    sharing the limiter, and halves the number of requests allowed in flight.
+    The limit grows back by one per response while headroom stays high.
+
+        Parameters:
+            max_concurrency: Most requests allowed in flight at once
+            max_retries: Retries for a throttled request before its 429 is returned
+            base_backoff: First backoff in seconds when the server gives no Retry-After
+            max_backoff: Longest single backoff in seconds
+    '''
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES, base_backoff=1.0, max_backoff=60.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self.concurrency = max_concurrency
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._next_slot = 0.0
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.throttled = 0
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = time.time()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                elif self._in_flight >= self.concurrency:
+                    self._cond.wait()
+                else:
+                    break
+            self._in_flight += 1
+            delay = self._pace(time.time())
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _pace(self, now):
+        """Returns how long the caller should wait so the remaining budget lasts until reset."""
+        if self.remaining is None or self.limit is None or self.reset_at is None:
+            return 0.0
+        if self.remaining > self.limit * LOW_HEADROOM:
+            return 0.0
+        spacing = max(self.reset_at - now, 0.0) / max(self.remaining, 1.0)
+        self._next_slot = max(self._next_slot, now) + spacing
+        return self._next_slot - spacing - now
+
+    def update(self, response):
+        """Records the budget reported by a response and widens concurrency while there is headroom."""
+        limit = header_number(response, "RateLimit-Limit")
+        remaining = header_number(response, "RateLimit-Remaining")
+        reset_at = header_number(response, "RateLimit-Reset")
+        with self._cond:
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+            if reset_at is not None:
+                self.reset_at = reset_at
+            headroom = self.remaining is None or self.limit is None or self.remaining > self.limit * HIGH_HEADROOM
+            if response.status_code != 429 and headroom and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._cond.notify_all()
+
+    def backoff_delay(self, response, attempt):
+        """Seconds to wait before retrying a throttled request."""
+        retry_after = header_number(response, "Retry-After")
+        if retry_after is not None:
+            delay = retry_after
+        elif self.reset_at is not None and self.reset_at > time.time():
+            delay = self.reset_at - time.time()
+        else:
+            delay = self.base_backoff * (2 ** attempt)
+        delay = min(delay, self.max_backoff)
+        # Jitter so threads that were throttled together do not all retry together
+        return delay + random.uniform(0, delay * 0.5)
+
+    def throttle(self, response, attempt):
+        delay = self.backoff_delay(response, attempt)
+        with self._cond:
+            self.throttled += 1
+            self.concurrency = max(1, self.concurrency // 2)
+            self._paused_until = max(self._paused_until, time.time() + delay)
+        print(f"Rate limited by GitLab, retrying in {delay:.1f}s (attempt {attempt + 1} of {self.max_retries})")
+        time.sleep(delay)
+
+    def execute(self, send, *args, **kwargs):
+        '''
+        Runs one request through the limiter, retrying it while GitLab answers 429
+
+            Parameters:
+                send: Callable making the request and returning a requests.Response
+                *args, **kwargs: Passed on to send
+
+            Returns:
+                response: The first response that was not throttled, or the last 429
+        '''
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                response = send(*args, **kwargs)
+            finally:
+                self.release()
+            self.update(response)
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
+            response.close()  # Hands its pooled connection back before the wait
+            self.throttle(response, attempt)
+            attempt += 1
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def default_limiter():
+    """Returns the process-wide limiter shared by every session that is not given its own."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
+
+
+class RateLimitedSession(requests.Session):
+    '''
+    requests.Session that sends every request through a RateLimiter
+
+    Works for plain requests code and as the session of a python-gitlab client.
+
+        Parameters:
+            limiter: RateLimiter to use, defaults to the process-wide one
+    '''
+
+    def __init__(self, limiter=None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or default_limiter()
+
+    def send(self, request, **kwargs):
+        return self.limiter.execute(super().send, request, **kwargs)
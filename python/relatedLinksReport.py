@@ -1,11 +1,27 @@
-import gitlab
-import csv
 import argparse
 import re
-import pandas as pd
 import yaml
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pprint import pprint
+from reportCache import DEFAULT_CACHE_PATH, ReportCache
+from reportFanout import DEFAULT_MAX_TARGETS, fan_out
+from reportQuery import iter_items
+from reportParquet import OUTPUT_FORMATS, report_path
+from reportStream import open_report_writer
+from textCleaner import clean_text
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
+
+
+# Link graph requests in flight at once while a level of the release graph is fetched
+DEFAULT_CONCURRENCY = 8
+# Levels of related epics and linked issues followed from each release epic
+DEFAULT_MAX_DEPTH = 6
+# Issues asked for by iid in one request, on a cold cache
+LIST_BY_IID_SIZE = 100
 
 
 def load_config(number):
@@ -19,23 +35,16 @@ def load_config(number):
     return config
 
 
-def get_epic_details(gl, group_id, config):
+def get_epic_details(gl, group_id, config, cache=None):
     ''' Get the epic '''
     label_filters = set(config["labels"])
 
 
     group = gl.groups.get(group_id)
-    epics = group.epics.list(all=True)
-
-
-    all_epics = []
-    page = 1
-    while True:
-        epics = group.epics.list(per_page=100, page=page)  # Request 100 items per page
-        if not epics:
-            break
-        all_epics.extend(epics)
-        page += 1
+    if cache:
+        all_epics = cache.sync_epics(group)
+    else:
+        all_epics = iter_items(group.epics)  # Streamed page by page straight into the filter below
 
 
     filtered_epics = []
@@ -51,7 +60,6 @@ def get_epic_details(gl, group_id, config):
 ## probably can remove
 def extract_labels(epic):
     """Extracts all labels from the epic and categorizes important ones."""
-    print(f"The Data: {epic}")
     all_labels = epic["labels"] if epic["labels"] else []
 
     # Important labels to prioritize
@@ -122,7 +130,217 @@ def extract_all_headers(description):
     return extracted_data
 
 
-def collect_linked_epics(gl, group_id, epic_iid, visited_epics=None, visited_issues=None, depth=1, max_depth=6):
+class LinkGraph:
+    '''
+    In-memory store of the release link graph, filled level by level on a bounded thread pool
+
+    prefetch walks the graph breadth first from every release epic at once. Each
+    level's related epics, epic child issues and issues with their links are fetched
+    concurrently, and nodes already reached at a shallower depth are skipped, so an
+    issue shared by several epics is only requested once. The collect functions below
+    then walk the graph depth first exactly as before, reading from the store;
+    anything prefetch did not reach is fetched on demand.
+
+    With a ReportCache the graph is also kept on disk across runs. Epics are synced
+    into the cache's items table, which brings their current updated_at. Issues are
+    synced the same way for projects the cache already holds; otherwise only the
+    issues the graph reaches are listed by iid, so a cold run never downloads whole
+    projects. Each node's outgoing edges (related epics, child issues, issue links) are
+    stored in its details table against the updated_at of their source. Edges whose
+    source has not changed since they were stored are reused without a request, so
+    a report for another release that shares most of the graph only queries nodes
+    that changed or were never seen. This relies on GitLab bumping updated_at when
+    links or child issues change, which it does through the system notes it adds.
+
+        Parameters:
+            gl: Authenticated python-gitlab client
+            group_id: Group the release epics live in
+            concurrency: Most requests in flight at once
+            cache: Optional ReportCache to keep the graph in between runs
+    '''
+
+    def __init__(self, gl, group_id, concurrency=DEFAULT_CONCURRENCY, cache=None):
+        self.gl = gl
+        self.group_id = group_id
+        self.concurrency = concurrency
+        self.cache = cache
+        self._store = {}
+        self._epics = {}
+        self._issues = {}
+        self._synced = set()
+        self._listed = set()
+        self.fetched = 0
+        self.reused = 0
+        if cache:
+            self._epics = {epic.iid: epic for epic in cache.sync_epics(gl.groups.get(group_id, lazy=True))}
+
+    def _sync_project(self, project_id, iids):
+        """Loads the current attributes and updated_at of the issues the graph reached in a project."""
+        if not self.cache or project_id in self._synced:
+            return
+        issues = self._issues.setdefault(project_id, {})
+        project = self.gl.projects.get(project_id, lazy=True)
+        try:
+            if self.cache.has_synced(project):
+                # One incremental sync brings the whole project up to date
+                issues.update({issue.iid: issue for issue in self.cache.sync_issues(project)})
+                self._synced.add(project_id)
+                return
+            missing = [iid for iid in dict.fromkeys(iids) if (project_id, iid) not in self._listed]
+            self._listed.update((project_id, iid) for iid in missing)
+            for start in range(0, len(missing), LIST_BY_IID_SIZE):
+                batch = missing[start:start + LIST_BY_IID_SIZE]
+                for issue in project.issues.list(iids=batch, scope="all", state="all", per_page=LIST_BY_IID_SIZE, iterator=True):
+                    issues[issue.iid] = issue
+        except Exception as e:
+            print(f"Error syncing issues for project {project_id}: {e}")
+
+    def _refs(self, source, name, url, fields):
+        """Returns the refs listed at url and whether they came from the on-disk index."""
+        requested = []
+
+        def fetch():
+            requested.append(url)
+            return [{field: ref[field] for field in fields} for ref in self.gl.http_get(url)]
+
+        if not self.cache or source is None:
+            return fetch(), False
+        return self.cache.cached(source, name, fetch), not requested
+
+    def _load(self, key):
+        kind, *ids = key
+        reused = False
+        try:
+            if kind == "related_epics":
+                url = f"/groups/{self.group_id}/epics/{ids[0]}/related_epics"
+                value, reused = self._refs(self._epics.get(ids[0]), "related_epic_refs", url, ("iid",))
+            elif kind == "child_issues":
+                url = f"/groups/{self.group_id}/epics/{ids[0]}/issues"
+                value, reused = self._refs(self._epics.get(ids[0]), "child_issue_refs", url, ("project_id", "iid"))
+            else:
+                project_id, issue_iid = ids
+                issue = self._issues.get(project_id, {}).get(issue_iid)
+                synced = issue is not None
+                if not synced:
+                    # lazy=True skips loading the project, only the issue itself is needed
+                    issue = self.gl.projects.get(project_id, lazy=True).issues.get(issue_iid)
+                url = f"/projects/{project_id}/issues/{issue_iid}/links"
+                links, reused = self._refs(issue, "link_refs", url, ("project_id", "iid"))
+                value = compact_issue(issue.attributes, links)
+                reused = reused and synced
+        except Exception as e:
+            value = e  # Kept so the depth first walk reports the error where it always did
+        return key, value, reused
+
+    def _count(self, reused):
+        if reused:
+            self.reused += 1
+        else:
+            self.fetched += 1
+
+    def _get(self, key):
+        if key not in self._store:
+            if key[0] == "issue":
+                self._sync_project(key[1], [key[2]])
+            _, self._store[key], reused = self._load(key)
+            self._count(reused)
+        value = self._store[key]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def related_epics(self, epic_iid):
+        return self._get(("related_epics", epic_iid))
+
+    def child_issues(self, epic_iid):
+        return self._get(("child_issues", epic_iid))
+
+    def issue(self, project_id, issue_iid):
+        """Returns the issue as an IssueRecord, including the (project_id, iid) refs it links to."""
+        return self._get(("issue", project_id, issue_iid))
+
+    def _fetch(self, executor, keys):
+        keys = [key for key in keys if key not in self._store]
+        for key, value, reused in executor.map(self._load, keys):
+            self._store[key] = value
+            self._count(reused)
+
+    def _ok(self, key):
+        return not isinstance(self._store.get(key), Exception)
+
+    def prefetch(self, epic_iids, max_depth=DEFAULT_MAX_DEPTH):
+        '''
+        Fetches everything collect_linked_epics can reach from the given epics, one level at a time
+
+            Parameters:
+                epic_iids: IIDs of the release epics the walk starts from
+                max_depth: Deepest level the walk goes to, as in collect_linked_epics
+        '''
+        start = time.perf_counter()
+        seen_epics = set()
+        seen_children = set()
+        seen_issues = set()
+        epics = list(epic_iids)
+        linked_epics = []
+        issue_refs = []
+        depth = 1
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while (epics or linked_epics or issue_refs) and depth <= max_depth:
+                # Epics at this depth: their related epics, and child issues for epics reached through a link
+                epics = [iid for iid in dict.fromkeys(epics + linked_epics) if iid not in seen_epics]
+                children = [iid for iid in dict.fromkeys(linked_epics) if iid not in seen_children]
+                seen_epics.update(epics)
+                seen_children.update(children)
+                self._fetch(executor, [("related_epics", iid) for iid in epics] + [("child_issues", iid) for iid in children])
+
+                for iid in children:
+                    if self._ok(("child_issues", iid)):
+                        issue_refs += [(i["project_id"], i["iid"]) for i in self._store[("child_issues", iid)]]
+
+                # Issues at this depth, linked from the previous level or children of this level's epics
+                issues = [ref for ref in dict.fromkeys(issue_refs) if ref not in seen_issues]
+                seen_issues.update(issues)
+                for project_id in dict.fromkeys(project_id for project_id, _ in issues):
+                    self._sync_project(project_id, [iid for issue_project, iid in issues if issue_project == project_id])
+                self._fetch(executor, [("issue", *ref) for ref in issues])
+                print(f"Depth {depth}: {len(epics)} epics, {len(issues)} issues")
+
+                linked_epics = [
+                    linked["iid"]
+                    for iid in epics if self._ok(("related_epics", iid))
+                    for linked in self._store[("related_epics", iid)]
+                ]
+                issue_refs = [
+                    ref
+                    for key in issues if self._ok(("issue", *key))
+                    for ref in self._store[("issue", *key)].links_to
+                ]
+                epics = []
+                depth += 1
+
+        print(f"Link graph: {self.fetched} nodes fetched, {self.reused} unchanged nodes reused from the index, {self.concurrency} workers, {time.perf_counter() - start:.2f}s")
+
+
+# Only the parts of an issue the release report renders, see compact_issue
+IssueRecord = namedtuple("IssueRecord", ["project_id", "iid", "title", "release", "cr", "fields", "links_to"])
+
+
+def compact_issue(attributes, link_refs):
+    """Reduces an issue to an IssueRecord, so full descriptions and API fields are not kept per node."""
+    label_data = extract_labels(attributes)
+    return IssueRecord(
+        attributes["project_id"],
+        attributes["iid"],
+        attributes["title"],
+        label_data["Release"],
+        label_data["CR"],
+        extract_all_headers(attributes.get("description", "")),
+        tuple((ref["project_id"], ref["iid"]) for ref in link_refs),
+    )
+
+
+def collect_linked_epics(graph, group_id, epic_iid, visited_epics=None, visited_issues=None, depth=1, max_depth=DEFAULT_MAX_DEPTH):
     if visited_epics is None:
         visited_epics = set()
     if visited_issues is None:
@@ -135,9 +353,8 @@ def collect_linked_epics(gl, group_id, epic_iid, visited_epics=None, visited_iss
     collected_epics = [f"{'  ' * depth}Epic {epic_iid}"]
     collected_issues = []
 
-    related_epics_url = f"/groups/{group_id}/epics/{epic_iid}/related_epics"
     try:
-        related_epics = gl.http_get(related_epics_url)
+        related_epics = graph.related_epics(epic_iid)
     except Exception as e:
         print(f"Error fetching related epics for Epic {epic_iid}: {e}")
         return [], []
@@ -150,22 +367,22 @@ def collect_linked_epics(gl, group_id, epic_iid, visited_epics=None, visited_iss
 
         collected_epics.append(f"{'  ' * depth}Linked Epic {linked_id}")
 
-        # Get child issues
-        try:
-            child_issues_url = f"/groups/{group_id}/epics/{linked_id}/issues"
-            child_issues = gl.http_get(child_issues_url)
-        except Exception as e:
-            print(f"Error fetching issues for Epic {linked_id}: {e}")
-            child_issues = []
+        # Get child issues, they sit one level down so past max_depth they would all be skipped
+        child_issues = []
+        if depth + 1 <= max_depth:
+            try:
+                child_issues = graph.child_issues(linked_id)
+            except Exception as e:
+                print(f"Error fetching issues for Epic {linked_id}: {e}")
 
-        issue_refs = [{"project_id": i["project_id"], "iid": i["iid"]} for i in child_issues]
+        issue_refs = [(i["project_id"], i["iid"]) for i in child_issues]
 
         # Recurse to collect linked issues
-        linked_issues = collect_linked_issues(gl, {}, issue_refs, visited_issues, depth + 1, max_depth)
+        linked_issues = collect_linked_issues(graph, {}, issue_refs, visited_issues, depth + 1, max_depth)
         collected_issues += linked_issues
 
         # Recurse into deeper epics
-        deeper_epics, deeper_issues = collect_linked_epics(gl, group_id, linked_id, visited_epics, visited_issues, depth + 1, max_depth)
+        deeper_epics, deeper_issues = collect_linked_epics(graph, group_id, linked_id, visited_epics, visited_issues, depth + 1, max_depth)
         collected_epics += deeper_epics
         collected_issues += deeper_issues
 
@@ -173,19 +390,15 @@ def collect_linked_epics(gl, group_id, epic_iid, visited_epics=None, visited_iss
 
         
 
-def collect_linked_issues(gl, project_id_lookup, issue_refs, visited_issues=None, depth=1, max_depth=6, parent_key=None):
-    print(f"Starting linked issues flow: {issue_refs}")
+def collect_linked_issues(graph, project_id_lookup, issue_refs, visited_issues=None, depth=1, max_depth=DEFAULT_MAX_DEPTH, parent_key=None):
     if visited_issues is None:
         visited_issues = set()
 
     collected_issues = []
 
-    for ref in issue_refs:
-        project_id = ref["project_id"]
-        issue_iid = ref["iid"]
+    for project_id, issue_iid in issue_refs:
         unique_key = f"{project_id}:{issue_iid}"
         
-        print(visited_issues)
         if unique_key == parent_key:
             pass  # Allow entry issue to pass through
         elif unique_key in visited_issues or depth > max_depth:
@@ -194,21 +407,12 @@ def collect_linked_issues(gl, project_id_lookup, issue_refs, visited_issues=None
         visited_issues.add(unique_key)
 
         try:
-            print("Trying linked issue loop")
-            issue = gl.projects.get(project_id).issues.get(issue_iid)            
+            issue = graph.issue(project_id, issue_iid)
             print(f"{'  ' * depth}Linked Issue {issue_iid} in project {project_id}")
 
-            # Get related (linked) issues
-            linked_url = f"/projects/{project_id}/issues/{issue_iid}/links"
-            linked = gl.http_get(linked_url)
-            next_refs = [{"project_id": l["project_id"], "iid": l["iid"]} for l in linked]
-            issue_data = issue.attributes.copy()
-            issue_data["_links_to"] = next_refs 
-            links_data = issue_data["_links_to"]
-            print(f"links to data: {links_data}")
-            collected_issues.append(issue_data)
+            collected_issues.append(issue)
             # Recurse
-            collected_issues += collect_linked_issues(gl, project_id_lookup, next_refs, visited_issues, depth + 1, max_depth)
+            collected_issues += collect_linked_issues(graph, project_id_lookup, issue.links_to, visited_issues, depth + 1, max_depth)
 
         except Exception as e:
             print(f"Error loading issue {project_id}/{issue_iid}: {e}")
@@ -218,13 +422,13 @@ def collect_linked_issues(gl, project_id_lookup, issue_refs, visited_issues=None
 
 
 
-def collect_all_linked_items(gl, group_id, epic):
+def collect_all_linked_items(graph, group_id, epic):
     print(f"Starting with Parent Epic {epic.iid}: {epic.title}")
     visited_epics = set()
     visited_issues = set()
 
     # Kick off collection
-    epics, issues = collect_linked_epics(gl, group_id, epic.iid, visited_epics, visited_issues)
+    epics, issues = collect_linked_epics(graph, group_id, epic.iid, visited_epics, visited_issues)
 
     return {
         "epics": epics,
@@ -233,8 +437,54 @@ def collect_all_linked_items(gl, group_id, epic):
 
 
 
-def generate_audit_report(gl, group_id, config, output_file):
-    epics = get_epic_details(gl, group_id, config)
+def iter_linked_rows(issues):
+    '''
+    Yields a report row per issue, each followed depth first by the issues it links to
+
+    Walks with an explicit stack instead of recursion, so long link chains cannot hit
+    the recursion limit, and rows go straight to the writer instead of into a list.
+
+        Parameters:
+            issues: IssueRecords in collection order, duplicates are reported once
+
+        Yields:
+            row: CSV row dict, linked issues indented with one arrow per level
+    '''
+    issue_lookup = {(issue.project_id, issue.iid): issue for issue in issues}
+    visited = set()
+
+    for root in issues:
+        stack = [(root, 0)]
+        while stack:
+            issue, depth = stack.pop()
+            issue_key = (issue.project_id, issue.iid)
+            if issue_key in visited:
+                continue
+            visited.add(issue_key)
+
+            yield {
+                "Issue ID": f"{'→' * depth} {issue.iid}" if depth > 0 else issue.iid,
+                "Depth": depth,
+                "Issue Title": issue.title,
+                "Release #": issue.release,
+                "CR #": issue.cr,
+                **issue.fields
+            }
+
+            # Pushed in reverse so the first link is walked first, as the recursive walk did
+            for linked_ref in reversed(issue.links_to):
+                linked_issue = issue_lookup.get(linked_ref)
+                if linked_issue and linked_ref not in visited:
+                    stack.append((linked_issue, depth + 1))
+
+
+
+# Typed columns of the Parquet output, the rest are text ("Issue ID" carries the depth arrows)
+PARQUET_TYPES = {"Depth": "int"}
+
+
+def generate_audit_report(gl, group_id, config, output_file, cache=None, concurrency=DEFAULT_CONCURRENCY, output_format="csv"):
+    epics = get_epic_details(gl, group_id, config, cache)
     if not epics:
         print("No epics found")
         return
@@ -242,111 +492,53 @@ def generate_audit_report(gl, group_id, config, output_file):
     all_issues = []
     print("Traversing epics and collecting issues...")
 
+    graph = LinkGraph(gl, group_id, concurrency, cache)
+    graph.prefetch([epic.iid for epic in epics])
     for epic in epics:
-        linked_items = collect_all_linked_items(gl, group_id, epic)
+        linked_items = collect_all_linked_items(graph, group_id, epic)
         all_issues.extend(linked_items["issues"])
 
-    issue_lookup = {
-        f"{i['project_id']}:{i['iid']}": i for i in all_issues
-    }
-
-    visited = set()
     all_headers = set()
-    all_rows = []
-
-    # Recursively walk and collect all rows
-    def walk_and_collect(issue, depth=0):
-        issue_key = f"{issue['project_id']}:{issue['iid']}"
-        if issue_key in visited:
-            return
-        visited.add(issue_key)
-
-        label_data = extract_labels(issue)
-        extracted_fields = extract_all_headers(issue.get("description", ""))
-        all_headers.update(extracted_fields.keys())
-
-        row = {
-            "Issue ID": f"{'→' * depth} {issue['iid']}" if depth > 0 else issue["iid"],
-            "Depth": depth,
-            "Issue Title": issue['title'],
-            "Release #": label_data["Release"],
-            "CR #": label_data["CR"],
-            **extracted_fields
-        }
-        all_rows.append(row)
-
-        linked_refs = issue.get("_links_to", [])
-        for linked_ref in linked_refs:
-            linked_key = f"{linked_ref['project_id']}:{linked_ref['iid']}"
-            linked_issue = issue_lookup.get(linked_key)
-            if linked_issue:
-                walk_and_collect(linked_issue, depth + 1)
-
     for issue in all_issues:
-        walk_and_collect(issue)
+        all_headers.update(issue.fields.keys())
 
-    # Now we know all headers
     fieldnames = ["Issue ID", "Depth", "Issue Title", "Release #", "CR #"] + sorted(all_headers)
 
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+    with open_report_writer(output_file, fieldnames, clean_text, output_format, PARQUET_TYPES) as writer:
         writer.writeheader()
-        writer.writerows(all_rows)
+        writer.writerows(iter_linked_rows(all_issues))
 
     print(f"Report saved as {output_file}")
 
 
 
 
-def clean_csv_content(file_path):
-    """Loads CSV, cleans all fields, and rewrites it."""
-    df = pd.read_csv(file_path, dtype=str)  # Load CSV as a DataFrame (all text)
-
-    def clean_text(text):
-        """Applies regex to remove comments and 'Insert date here:' from text fields."""
-        if pd.isna(text):
-            return ""  # Handle NaN values
-
-        text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
-        text = re.sub(r"<!--[\s\S]*?-->", "", text, flags=re.DOTALL)
-        text = re.sub(r"(?i)`Insert\s*date\s*here:`\s*", "", text)
-        checkedCheckboxes = re.findall(r"- \[x\] (.+)", text)  # Extract only checked items
-        text = re.sub(r"- \[\s?\] .*", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"_([\w\s()]+)_", r"\1", text)
-        text = re.sub(r"`(\d{2}-\d{2}-\d{4})`", r"\1", text)
-        text = re.sub(r" \\", "", text)
-        text = re.sub(r"Enter Text here","",text, flags=re.IGNORECASE)
-        text = re.sub(r"`([\w\s,]+)`", r"\1", text)
-        if checkedCheckboxes:
-          text = ", ".join(checkedCheckboxes)  # Keep checked items as a comma-separated string
-        else:
-           text = text.strip()
-        return text.strip()
-
-    # Apply cleaning to every text field in the DataFrame
-    df = df.applymap(clean_text)
-
-    # Save cleaned CSV
-    df.to_csv(file_path, index=False, encoding="utf-8")
-    print(f"Cleaned report saved as {file_path}")
-
 def main():
     """Main function to run the GitLab audit script."""
     parser = argparse.ArgumentParser(description="Generate an audit report for a GitLab epic")
     parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
-    parser.add_argument("-g", "--group", required=True, help="GitLab group ID containing the epic")
+    parser.add_argument("-g", "--group", required=True, nargs="+", help="GitLab group ID(s) containing the epics, several are reported on concurrently")
     parser.add_argument("-o", "--output", default="release", help="Output CSV file name")
     parser.add_argument("-n", "--number", required=True, help="Release number to report on")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of link graph requests to run at once")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local epic, issue and link cache, only querying items updated since the last run")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="Write a CSV, or append a run_date partition to a Parquet dataset")
+    parser.add_argument("--combined", action="store_true", help="Merge every group into one report with a Source column instead of one file per group")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_MAX_TARGETS, help="Number of groups to report on at once")
+    add_cassette_arguments(parser)
 
     args = parser.parse_args()
+    if args.combined and args.format == "parquet":
+        parser.error("--combined merges CSV reports, it cannot be used with --format parquet")
        # Authenticate GitLab
-    gl = gitlab.Gitlab("https://gitlab.com", private_token=args.token)
+    gl = connect(args.token, cassette=cassette_from_args(args))
 
     config = load_config(args.number)
-    output_file = f"{args.output}_{args.number}_report.csv"
+    output_file = report_path(f"{args.output}_{args.number}_report", args.format)
+    cache = ReportCache(args.cache) if args.cache else None
     # Generate report
-    generate_audit_report(gl, args.group, config, output_file)
-    clean_csv_content(output_file)
+    run = lambda group_id, target_file: generate_audit_report(gl, group_id, config, target_file, cache, args.concurrency, args.format)
+    fan_out(run, args.group, output_file, args.combined, args.jobs)
 
 if __name__ == "__main__":
     main()
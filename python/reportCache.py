@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_CACHE_PATH = ".cache/gitlab_reports.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    iid INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, iid)
+);
+CREATE TABLE IF NOT EXISTS details (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    iid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, iid, name)
+);
+CREATE TABLE IF NOT EXISTS sync (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    watermark TEXT NOT NULL,
+    PRIMARY KEY (scope, kind)
+);
+"""
+
+
+def item_key(item):
+    """Returns the (scope, kind, iid) an issue or epic is cached under."""
+    if "group_id" in item.attributes and "project_id" not in item.attributes:
+        return f"group:{item.group_id}", "epic", item.iid
+    return f"project:{item.project_id}", "issue", item.iid
+
+
+class ReportCache:
+    '''
+    On-disk SQLite cache of issues, epics and their notes and links, shared by the report scripts.
+
+    Items are keyed by project/group and IID. Each sync only asks GitLab for items
+    updated since the previous sync's watermark and merges them in, so a cold run
+    downloads everything once and later runs only what changed. Notes and links are
+    stored against the item's updated_at and refetched once the item changes.
+    Issues deleted or moved out of a project stay cached until the file is removed.
+    '''
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        # Report scripts enrich items from worker threads, so serialize access to one connection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _watermark(self, scope, kind):
+        row = self._conn.execute("SELECT watermark FROM sync WHERE scope = ? AND kind = ?", (scope, kind)).fetchone()
+        return row[0] if row else None
+
+    def _sync(self, scope, kind, manager, params):
+        """Fetches items changed since the last sync into the cache and returns every cached item."""
+        with self._lock:
+            watermark = self._watermark(scope, kind)
+
+        if watermark:
+            params = {**params, "updated_after": watermark}
+        fetched = 0
+        newest = watermark
+        rows = []
+        for item in manager.list(iterator=True, per_page=100, **params):
+            rows.append((scope, kind, item.iid, item.updated_at, json.dumps(item.attributes)))
+            if newest is None or item.updated_at > newest:
+                newest = item.updated_at
+            fetched += 1
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)", rows)
+            if newest:
+                self._conn.execute("INSERT OR REPLACE INTO sync VALUES (?, ?, ?)", (scope, kind, newest))
+            cached = self._conn.execute(
+                "SELECT data FROM items WHERE scope = ? AND kind = ? ORDER BY iid DESC", (scope, kind)
+            ).fetchall()
+
+        print(f"Cache sync for {scope} {kind}s: {fetched} fetched, {len(cached)} cached")
+        return [manager._obj_cls(manager, json.loads(data)) for (data,) in cached]
+
+    def sync_issues(self, project):
+        """Returns every issue in the project, fetching only those updated since the last sync."""
+        return self._sync(f"project:{project.id}", "issue", project.issues, {"scope": "all", "state": "all"})
+
+    def has_synced(self, project):
+        """Whether the project's issues were synced before, so a sync only fetches what changed since."""
+        with self._lock:
+            return self._watermark(f"project:{project.id}", "issue") is not None
+
+    def sync_epics(self, group):
+        """Returns every epic in the group, fetching only those updated since the last sync."""
+        return self._sync(f"group:{group.id}", "epic", group.epics, {"state": "all"})
+
+    def cached(self, item, name, fetch):
+        '''
+        Returns a stored detail (notes, links, ...) for an item, calling fetch only when the item changed.
+
+            Parameters:
+                item: The issue or epic the detail belongs to
+                name: Name of the detail, e.g. "latest_note" or "linked_issues"
+                fetch: Callable returning a JSON serializable value
+
+            Returns:
+                The cached or freshly fetched value
+        '''
+        scope, kind, iid = item_key(item)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at, data FROM details WHERE scope = ? AND kind = ? AND iid = ? AND name = ?",
+                (scope, kind, iid, name),
+            ).fetchone()
+        if row and row[0] == item.updated_at:
+            return json.loads(row[1])
+
+        value = fetch()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, kind, iid, name, item.updated_at, json.dumps(value)),
+            )
+        return value
+
+    def fresh(self, item, name, fetch):
+        '''
+        Returns a detail built from other items (linked issues, child epics), fetched on every run.
+
+        Those items change without moving the item's updated_at, so nothing is stored for them.
+        '''
+        return fetch()
+
+    def cached_list(self, item, name, manager):
+        """Like cached, for a full child listing such as epic.notes, returned as python-gitlab objects."""
+        attributes = self.cached(item, name, lambda: [child.attributes for child in manager.list(all=True)])
+        return [manager._obj_cls(manager, data) for data in attributes]
@@ -0,0 +1,216 @@
+import argparse
+import importlib
+import threading
+import time
+from reportCache import DEFAULT_CACHE_PATH, ReportCache, item_key
+from reportQuery import build_issue_query, iter_items, matches_labels, matches_params
+from gitlabSession import connect
+from httpCassette import add_cassette_arguments, cassette_from_args
+
+
+class ReportPlugin:
+    '''
+    One report rendered from the engine's shared issue dataset
+
+    The plugin selects its issues locally with the same filters its own script
+    asks GitLab for, then hands them to the script's renderer.
+
+        Parameters:
+            name: Name of the report on the command line
+            config: Report config, its labels, dates and state select the issues
+            output_file: File the report is written to
+            render: Callable (issues, output_file, details) writing the report, details is the run's SharedDetails
+            exact_labels: Labels every issue must carry exactly, see build_issue_query
+    '''
+
+    def __init__(self, name, config, output_file, render, exact_labels=None):
+        self.name = name
+        self.config = config
+        self.output_file = output_file
+        self.render = render
+        self.exact_labels = exact_labels
+
+    def query(self):
+        return build_issue_query(self.config, self.exact_labels)
+
+    def select(self, issues):
+        params, label_filters = self.query()
+        return [issue for issue in issues if matches_params(issue, params) and matches_labels(issue, label_filters)]
+
+
+class SharedDetails:
+    '''
+    Per-issue details (latest comment, related issues) fetched once per run for every report
+
+    The issue, issues and raid reports all enrich the same issues with the same
+    per-issue calls. Passed to their renderers as the cache, each detail is
+    fetched for the first report that needs it and reused by the others. Values
+    are keyed on the issue and its updated_at. Values from cached() also go
+    through the on-disk ReportCache when the run has one, those from fresh() do not.
+
+        Parameters:
+            cache: Optional ReportCache behind the run's memo
+    '''
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._values = {}
+        self.fetches = 0
+        self.reuses = 0
+
+    def cached(self, item, name, fetch):
+        """Same as ReportCache.cached, for the duration of the run."""
+        key = (*item_key(item), item.updated_at, name)
+        with self._lock:
+            if key in self._values:
+                self.reuses += 1
+                return self._values[key]
+        value = self.cache.cached(item, name, fetch) if self.cache else fetch()
+        with self._lock:
+            self._values[key] = value
+            self.fetches += 1
+        return value
+
+    def fresh(self, item, name, fetch):
+        """Same as ReportCache.fresh: shared between the reports of the run, never read from the on-disk cache."""
+        key = (*item_key(item), item.updated_at, name)
+        with self._lock:
+            if key in self._values:
+                self.reuses += 1
+                return self._values[key]
+        value = fetch()
+        with self._lock:
+            self._values[key] = value
+            self.fetches += 1
+        return value
+
+
+def issue_report(args, cache):
+    """issueReportGenerater: issues matching the command line labels, dates and state."""
+    if not (args.labels and args.fromDate and args.toDate):
+        raise ValueError("the issue report needs -l/--labels, -fd/--fromDate and -td/--toDate")
+    module = importlib.import_module("issueReportGenerater")
+    config = module.load_config(args.labels, args.fromDate, args.toDate, args.state or "")
+    output_file = f"Reports/Issues/gitlab_issues_report_{config['fromDate']}_{config['toDate']}.csv"
+    return ReportPlugin("issue", config, output_file, lambda issues, output_file, details: module.write_issues_report(issues, config, output_file, cache=details))
+
+
+def issues_report(args, cache):
+    """issuesReportGenerater: issues matching config/report.yaml."""
+    module = importlib.import_module("issuesReportGenerater")
+    config = module.load_config()
+    output_file = f"gitlab_issues_report_{config['fromDate']}_{config['toDate']}.csv"
+    return ReportPlugin("issues", config, output_file, lambda issues, output_file, details: module.write_issues_report(issues, config, output_file, details))
+
+
+def raid_report(args, cache):
+    """321issueReportGenerater: risks, action items, issues and decisions in the given state."""
+    # The module name starts with a digit, so it can only be imported by name
+    module = importlib.import_module("321issueReportGenerater")
+    config = module.load_config(args.state)
+    output_file = f"Reports/RAID/{config['state']}_gitlab_raid_report.csv"
+    return ReportPlugin("raid", config, output_file, lambda issues, output_file, details: module.write_issues_report(issues, config, output_file, details))
+
+
+def brd_report(args, cache):
+    """crReportGenerater: the requirements of the CR in config/report.yaml, as a PDF."""
+    module = importlib.import_module("crReportGenerater")  # Only needs reportlab when the BRD is asked for
+    config = module.load_config()
+    if "CR Number" not in config:
+        raise ValueError("the brd report needs a 'CR Number' in config/report.yaml")
+    output_file = f"gitlab_brd_report_CR{config['CR Number']}_{config['fromDate']}_{config['toDate']}.pdf"
+    return ReportPlugin("brd", config, output_file, lambda issues, output_file, details: module.write_brd_pdf(issues, config, output_file), module.brd_labels(config))
+
+
+REPORTS = {
+    "issue": issue_report,
+    "issues": issues_report,
+    "raid": raid_report,
+    "brd": brd_report,
+}
+
+
+def shared_query(plugins):
+    '''
+    Server-side filters for one fetch that covers every plugin's issues
+
+    Filters all plugins agree on are kept, date ranges are widened to cover every
+    plugin, and unlabelled issues are skipped when every plugin needs labels.
+    '''
+    queries = [plugin.query()[0] for plugin in plugins]
+    params = {key: value for key, value in queries[0].items() if all(query.get(key) == value for query in queries[1:])}
+    if all("created_after" in query for query in queries):
+        params["created_after"] = min(query["created_after"] for query in queries)
+    if all("created_before" in query for query in queries):
+        params["created_before"] = max(query["created_before"] for query in queries)
+    if "labels" not in params and all(query.get("labels") for query in queries):
+        params["labels"] = "Any"
+    return params
+
+
+def fetch_project_issues(gl, project_id, params, cache=None):
+    """Fetches the project's issues once for every report."""
+    project = gl.projects.get(project_id)
+    if cache:
+        return [issue for issue in cache.sync_issues(project) if matches_params(issue, params)]
+    return list(iter_items(project.issues, **params))
+
+
+def run_reports(gl, project_id, plugins, cache=None):
+    '''
+    Fetches a project's issues once and renders every report from them
+
+    Each report used to page through the project on its own, so a run now costs
+    one listing however many reports it writes. The per-issue comment and link
+    lookups are shared too, see SharedDetails. A report that fails is reported
+    and the others still run.
+
+        Parameters:
+            gl: Authenticated python-gitlab client
+            project_id: GitLab project ID
+            plugins: ReportPlugins to render
+            cache: Optional ReportCache
+    '''
+    start = time.perf_counter()
+    issues = fetch_project_issues(gl, project_id, shared_query(plugins), cache)
+    print(f"Fetched {len(issues)} issues once for {len(plugins)} reports in {time.perf_counter() - start:.2f}s")
+
+    details = SharedDetails(cache)
+    for plugin in plugins:
+        selected = plugin.select(issues)
+        print(f"{plugin.name}: {len(selected)} issues")
+        try:
+            plugin.render(selected, plugin.output_file, details)
+        except Exception as e:
+            print(f"Error writing the {plugin.name} report: {e}")
+    print(f"Per-issue details: {details.fetches} fetched, {details.reuses} reused between reports")
+
+
+def main():
+    """Main function to run several issue reports off one fetch."""
+    parser = argparse.ArgumentParser(description="Generate several issue reports for a GitLab project from one fetch of its issues")
+    parser.add_argument("-t", "--token", required=True, help="GitLab private token for authentication")
+    parser.add_argument("-p", "--project", required=True, help="GitLab project ID")
+    parser.add_argument("-r", "--reports", required=True, nargs="+", choices=sorted(REPORTS), help="Reports to generate")
+    parser.add_argument("-l", "--labels", nargs="+", help="labels to match on, for the issue report")
+    parser.add_argument("-fd", "--fromDate", help="the date to start the issue report generation")
+    parser.add_argument("-td", "--toDate", help="the date to end the issue report generation")
+    parser.add_argument("-s", "--state", help="state the ticket is in, EI open or closed, for the issue and raid reports")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, help="Use a local issue cache, only fetching issues updated since the last run")
+    add_cassette_arguments(parser)
+
+    args = parser.parse_args()
+    cache = ReportCache(args.cache) if args.cache else None
+
+    try:
+        plugins = [REPORTS[name](args, cache) for name in dict.fromkeys(args.reports)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    gl = connect(args.token, cassette=cassette_from_args(args))
+    run_reports(gl, args.project, plugins, cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import csv
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Projects or groups reported on at once, their requests still share the process-wide rate limiter
+DEFAULT_MAX_TARGETS = 4
+
+# Leading column of a combined report, naming the project or group each row came from
+SOURCE_FIELD = "Source"
+
+
+def target_output_file(output_file, target):
+    """Per-target file name, e.g. report.csv -> report_<target>.csv"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{target}{ext}"
+
+
+def run_target(run, target, output_file):
+    """Runs one target's report, returning the file it wrote or None when it failed or found nothing."""
+    start = time.perf_counter()
+    try:
+        run(target, output_file)
+    except Exception as e:
+        print(f"Error reporting on {target}: {e}")
+        return None
+    print(f"Finished {target} in {time.perf_counter() - start:.2f}s")
+    return output_file if os.path.exists(output_file) else None
+
+
+def merge_csv_reports(sources, output_file):
+    '''
+    Merges per-target CSV reports into one, with a Source column in front
+
+    Columns keep the order they first appear in, so the fixed report columns lead
+    and the description headers only some targets have are added after them.
+
+        Parameters:
+            sources: (target, csv file) pairs, in the order their rows are written
+            output_file: Combined CSV to write
+
+        Returns:
+            count: Number of rows written
+    '''
+    fieldnames = [SOURCE_FIELD]
+    for _, path in sources:
+        with open(path, newline="", encoding="utf-8") as csv_file:
+            header = next(csv.reader(csv_file), [])
+        fieldnames += [name for name in header if name not in fieldnames]
+
+    count = 0
+    # Rows were cleaned when the per-target files were written, so they are copied as they are
+    with open(output_file, mode="w", newline="", encoding="utf-8") as out_file:
+        writer = csv.DictWriter(out_file, fieldnames=fieldnames, restval="", lineterminator=os.linesep)
+        writer.writeheader()
+        for target, path in sources:
+            with open(path, newline="", encoding="utf-8") as csv_file:
+                for row in csv.DictReader(csv_file):
+                    writer.writerow({SOURCE_FIELD: target, **row})
+                    count += 1
+    return count
+
+
+def fan_out(run, targets, output_file, combined=False, max_workers=DEFAULT_MAX_TARGETS):
+    '''
+    Runs a report for several projects or groups at once on a thread pool
+
+    Every target goes through the same client, so all of their requests share one
+    connection pool and one rate limiter, and the rate limiter's concurrency cap
+    holds across the whole run. The run takes about as long as the slowest target
+    instead of the sum of all of them. A target that fails is reported and skipped.
+    A single target is run as before, straight into output_file.
+
+        Parameters:
+            run: Callable (target, output_file) that writes one target's report
+            targets: Project or group IDs
+            output_file: Combined CSV, or the base name of the per-target files
+            combined: Merge every target into output_file with a Source column, CSV reports only
+            max_workers: Most targets reported on at once
+    '''
+    if len(targets) == 1:
+        run(targets[0], output_file)
+        return
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        if combined:
+            outputs = [os.path.join(tmp, f"{index}.csv") for index in range(len(targets))]
+        else:
+            outputs = [target_output_file(output_file, target) for target in targets]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            written = list(executor.map(lambda job: run_target(run, *job), zip(targets, outputs)))
+
+        if combined:
+            sources = [(target, path) for target, path in zip(targets, written) if path]
+            if sources:
+                count = merge_csv_reports(sources, output_file)
+                print(f"Combined report with {count} rows from {len(sources)} targets saved as {output_file}")
+            else:
+                print("No rows found for any target")
+
+    print(f"Reported on {len(targets)} targets, {max_workers} at a time, in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,183 @@
+import glob
+import os
+import time
+from datetime import datetime, timezone
+from textCleaner import PANDAS_NA_VALUES, clean_cell
+
+OUTPUT_FORMATS = ["csv", "parquet"]
+
+# Rows buffered before they are written out as one Parquet row group
+ROW_GROUP_SIZE = 10000
+
+DATE_FORMATS = ("%m-%d-%Y", "%Y-%m-%d")
+
+
+def load_pyarrow():
+    """Imports pyarrow, which is only needed for Parquet output."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet output needs pyarrow, install it with: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def report_path(base, output_format="csv"):
+    """The CSV file, or the Parquet dataset directory, a report with this base name is written to."""
+    return f"{base}.csv" if output_format == "csv" else base
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_date(value):
+    """Parses the MM-DD-YYYY and YYYY-MM-DD dates reports write, and the date part of API timestamps."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value[:10], date_format).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def to_timestamp(value):
+    """Parses an API timestamp (2024-03-01T12:00:00.000Z) as UTC."""
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+CONVERTERS = {"int": to_int, "date": to_date, "timestamp": to_timestamp}
+
+
+class ParquetDictWriter:
+    '''
+    Report writer with the csv.DictWriter interface that writes a Parquet partition
+
+    Each run adds a run_date=YYYY-MM-DD partition (hive style) under the dataset
+    directory, so notebooks can scan months of runs with pyarrow.dataset or
+    pandas.read_parquet and read only the columns and dates they need. Columns
+    named in column_types are typed, "N/A" and empty cells become nulls; every
+    other column is text, cleaned like the CSV cell would be. Rows are written in
+    row groups as they come, so the whole report is never held in memory.
+
+    Reports add a column per description section, so runs do not all have the same
+    columns. Files already written are never touched again: each file has its own
+    run's columns, the known ones always with their declared type (even on a day
+    where every cell is "N/A"), the section columns always as text, so the schemas
+    of all runs unify cleanly. Read the dataset with open_report_dataset, which
+    does that, rather than a reader that takes the schema of one file.
+
+    Rows go to a hidden temporary file, only renamed into the partition by close(),
+    and the files an earlier run wrote to the same partition are only dropped then.
+    A run that fails calls abort() instead and the dataset is left as it was.
+
+        Parameters:
+            dataset_dir: Directory of the report's Parquet dataset
+            fieldnames: Column names
+            cleaner: Optional textCleaner.TextCleaner applied to text cells
+            column_types: {column: "int" | "date" | "timestamp"}
+            run_date: Partition key, today (UTC) when None
+            replace: Drop files an earlier run wrote to the same partition
+    '''
+
+    def __init__(self, dataset_dir, fieldnames, cleaner=None, column_types=None, run_date=None, replace=True):
+        self.pa, self.pq = load_pyarrow()
+        types = {"int": self.pa.int64(), "date": self.pa.date32(), "timestamp": self.pa.timestamp("ms", tz="UTC")}
+
+        self.fieldnames = list(fieldnames)
+        self.cleaner = cleaner
+        self.column_types = {name: kind for name, kind in (column_types or {}).items() if name in self.fieldnames}
+        self.schema = self.pa.schema([(name, types.get(self.column_types.get(name), self.pa.string())) for name in self.fieldnames])
+
+        run_date = run_date or datetime.utcnow().date().isoformat()
+        partition = os.path.join(dataset_dir, f"run_date={run_date}")
+        os.makedirs(partition, exist_ok=True)
+        # A rerun on the same day replaces that day's report instead of duplicating it
+        self.replaced = glob.glob(os.path.join(partition, "*.parquet")) if replace else []
+        self.path = os.path.join(partition, f"part-{time.strftime('%H%M%S')}-{os.getpid()}.parquet")
+        self._temp_path = os.path.join(partition, f".{os.path.basename(self.path)}.tmp")  # Hidden from dataset readers
+        self._rows = []
+        self._writer = None
+
+    def convert(self, rowdict):
+        row = {}
+        for name in self.fieldnames:
+            value = rowdict.get(name)
+            kind = self.column_types.get(name)
+            if kind:
+                value = None if value is None or str(value).strip() in PANDAS_NA_VALUES else CONVERTERS[kind](str(value).strip())
+            elif self.cleaner:
+                value = clean_cell(value, self.cleaner)
+            else:
+                value = "" if value is None else str(value)
+            row[name] = value
+        return row
+
+    def writeheader(self):
+        """Nothing to write, the columns are in the Parquet schema."""
+
+    def writerow(self, rowdict):
+        self._rows.append(self.convert(rowdict))
+        if len(self._rows) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def writerows(self, rowdicts):
+        for rowdict in rowdicts:
+            self.writerow(rowdict)
+
+    def flush(self):
+        if self._writer is None:
+            self._writer = self.pq.ParquetWriter(self._temp_path, self.schema)
+        self._writer.write_table(self.pa.Table.from_pylist(self._rows, schema=self.schema))
+        self._rows = []
+
+    def close(self):
+        """Finishes the file, moves it into the partition and drops the files it replaces."""
+        if self._rows or self._writer is None:
+            self.flush()
+        self._writer.close()
+        os.replace(self._temp_path, self.path)
+        for path in self.replaced:
+            if path != self.path:  # A rerun within the same second reuses the file name
+                os.remove(path)
+
+    def abort(self):
+        """Drops the unfinished file, leaving the dataset as it was."""
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            if os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+            partition = os.path.dirname(self.path)
+            if not os.listdir(partition):
+                os.rmdir(partition)
+
+
+def open_report_dataset(dataset_dir):
+    '''
+    Opens a report's Parquet dataset with every column any run wrote
+
+    pyarrow.dataset and pandas.read_parquet take the schema of a single file and
+    drop the columns only other runs have. Here the schemas of all files are unified
+    first; a run without a column reads it as nulls.
+
+        Parameters:
+            dataset_dir: Directory of the report's Parquet dataset
+
+        Returns:
+            dataset: pyarrow.dataset.Dataset with the run_date partition column, e.g. .to_table().to_pandas()
+    '''
+    pa, pq = load_pyarrow()
+    import pyarrow.dataset
+    files = sorted(glob.glob(os.path.join(dataset_dir, "run_date=*", "*.parquet")))
+    schema = None
+    if files:
+        schema = pa.unify_schemas([pq.read_schema(path) for path in files] + [pa.schema([("run_date", pa.string())])])
+    return pyarrow.dataset.dataset(dataset_dir, format="parquet", partitioning="hive", schema=schema)
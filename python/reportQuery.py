@@ -0,0 +1,111 @@
+from datetime import datetime
+
+CONFIG_DATE_FORMAT = "%m-%d-%Y"
+API_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Values a report config uses to mean "any state"
+UNSET_STATES = (None, "", "None")
+
+
+def to_api_date(config_date):
+    """Converts a report config date (MM-DD-YYYY) to the ISO 8601 form the GitLab API expects."""
+    return datetime.strptime(config_date, CONFIG_DATE_FORMAT).strftime(API_DATE_FORMAT)
+
+
+def cr_label(config):
+    """Returns the exact CR label for the config's 'CR Number'."""
+    return f"CR::{config['CR Number']}"
+
+
+def build_issue_query(config, exact_labels=None):
+    """
+    Translates a report config into server-side filters for project.issues.list.
+
+    The API can filter on state, creation date and exact label names. The report
+    configs match labels by substring, which the API cannot express, so those are
+    returned separately and still have to be checked with matches_labels.
+
+        Parameters:
+            config: Report config with optional labels, fromDate, toDate and state
+            exact_labels: Label names every issue must carry exactly (ANDed by GitLab)
+
+        Returns:
+            params: Keyword arguments for project.issues.list
+            label_filters: Substring label filters left to apply in Python
+    """
+    params = {"per_page": 100}
+
+    state = config.get("state")
+    if state not in UNSET_STATES:
+        params["state"] = state
+
+    if config.get("fromDate"):
+        params["created_after"] = to_api_date(config["fromDate"])
+    if config.get("toDate"):
+        params["created_before"] = to_api_date(config["toDate"])
+
+    label_filters = set()
+    if exact_labels:
+        params["labels"] = ",".join(exact_labels)
+    elif config.get("labels"):
+        label_filters = set(config["labels"])
+        # Substring matching needs at least one label, so skip unlabelled issues server side
+        params["labels"] = "Any"
+
+    return params, label_filters
+
+
+def matches_labels(item, label_filters, require_all=False):
+    """Checks an issue or epic against substring label filters."""
+    if not label_filters:
+        return True
+    if not item.labels:
+        return False
+    if require_all:
+        return all(any(label in item_label for item_label in item.labels) for label in label_filters)
+    return any(label in item_label for item_label in item.labels for label in label_filters)
+
+
+def matches_params(issue, params):
+    """Applies build_issue_query parameters locally, for issues that were not filtered by GitLab (e.g. cached ones)."""
+    if params.get("state", "all") != "all" and issue.state != params["state"]:
+        return False
+    # API timestamps share the ISO 8601 prefix, so the first 19 characters compare chronologically
+    if "created_after" in params and issue.created_at[:19] < params["created_after"][:19]:
+        return False
+    if "created_before" in params and issue.created_at[:19] > params["created_before"][:19]:
+        return False
+    if params.get("labels") == "Any":
+        return bool(issue.labels)
+    if params.get("labels"):
+        return all(label in issue.labels for label in params["labels"].split(","))
+    return True
+
+
+# List endpoints GitLab serves keyset pagination for, with the order_by each one requires.
+# The issue and epic endpoints are not among them, so they are paged by offset.
+KEYSET_ORDERS = {
+    "/projects": "id",
+    "/users": "id",
+    "/projects/{project_id}/jobs": "id",
+    "/projects/{project_id}/audit_events": "id",
+    "/groups/{group_id}/audit_events": "id",
+}
+
+
+def iter_items(manager, **params):
+    """
+    Yields issues or epics from a list endpoint as each page arrives.
+
+    Endpoints in KEYSET_ORDERS are paged by keyset, which stays fast on deep pages,
+    in the order they support; every other endpoint follows the offset Link headers.
+    The choice is made from the endpoint up front, so an error on a later page is
+    raised as it is. Either way every page is fetched once and nothing is held
+    beyond the current page.
+    """
+    keyset_order = KEYSET_ORDERS.get(manager._path)
+    if keyset_order:
+        params = {"per_page": 100, **params, "pagination": "keyset", "order_by": keyset_order}
+    else:
+        params = {"per_page": 100, "order_by": "created_at", "sort": "desc", **params}
+    yield from manager.list(iterator=True, **params)
@@ -0,0 +1,114 @@
+import csv
+import json
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from reportParquet import ParquetDictWriter
+from textCleaner import CleaningDictWriter
+
+
+def ordered_map(fn, items, concurrency, executor=None):
+    """
+    Like executor.map, but pulls items lazily and keeps at most a few batches in flight.
+
+    Results come back in input order as soon as they are ready, so a generator of
+    fetched pages can flow through concurrent enrichment without being collected first.
+    Several maps can share one pool by passing the same executor, which is left running.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            yield from ordered_map(fn, items, concurrency, executor)
+        return
+
+    window = deque()
+    for item in items:
+        window.append(executor.submit(fn, item))
+        if len(window) >= concurrency * 2:
+            yield window.popleft().result()
+    while window:
+        yield window.popleft().result()
+
+
+@contextmanager
+def open_report_writer(output_file, fieldnames, cleaner=None, output_format="csv", column_types=None, append=False):
+    '''
+    Opens the writer a report's rows go to, a CSV file or a Parquet dataset partition
+
+        Parameters:
+            output_file: CSV file, or the Parquet dataset directory
+            fieldnames: Column names
+            cleaner: Optional textCleaner.TextCleaner applied to every cell
+            output_format: "csv" or "parquet"
+            column_types: Typed Parquet columns, see reportParquet.ParquetDictWriter
+            append: Add to the CSV, or to today's Parquet partition, instead of replacing it
+
+        Yields:
+            writer: Object with the csv.DictWriter writeheader, writerow and writerows methods
+    '''
+    if output_format == "parquet":
+        writer = ParquetDictWriter(output_file, fieldnames, cleaner, column_types, replace=not append)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()  # The files of earlier runs are kept
+            raise
+        writer.close()
+        return
+
+    with open(output_file, mode="a" if append else "w", newline="", encoding="utf-8") as csv_file:
+        if cleaner:
+            yield CleaningDictWriter(csv_file, fieldnames, cleaner)
+        else:
+            yield csv.DictWriter(csv_file, fieldnames=fieldnames)
+
+
+def write_streamed_csv(rows, base_fields, output_file, cleaner=None, output_format="csv", column_types=None):
+    """
+    Writes report rows as they are produced, without holding the report in memory.
+
+    Each row goes to a temporary spool file the moment it is built, while the
+    dynamic description headers are collected. Once the rows run out the final CSV
+    is assembled from the spool with the base fields followed by the sorted
+    dynamic headers, the same layout the list-based reports write. With a cleaner,
+    cells are cleaned as they leave the spool, like the list-based reports.
+    With output_format="parquet" the spool is written as a Parquet partition instead.
+
+        Parameters:
+            rows: Iterable of row dicts
+            base_fields: Fixed leading columns, every other key is a dynamic header
+            output_file: CSV file to write
+            cleaner: Optional textCleaner.TextCleaner applied to every cell
+            output_format: "csv" or "parquet", see open_report_writer
+            column_types: Typed Parquet columns
+
+        Returns:
+            count: Number of rows written, 0 if there were none (nothing is written)
+    """
+    start = time.perf_counter()
+    base = set(base_fields)
+    dynamic_headers = set()
+    count = 0
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as spool:
+        for row in rows:
+            spool.write(json.dumps(row) + "\n")
+            dynamic_headers.update(key for key in row if key not in base)
+            count += 1
+            if count == 1:
+                print(f"First row ready after {time.perf_counter() - start:.2f}s")
+            elif count % 500 == 0:
+                print(f"{count} rows spooled")
+
+        if not count:
+            return 0
+
+        spool.seek(0)
+        fieldnames = list(base_fields) + sorted(dynamic_headers)
+        with open_report_writer(output_file, fieldnames, cleaner, output_format, column_types) as writer:
+            writer.writeheader()
+            for line in spool:
+                writer.writerow(json.loads(line))
+
+    return count
@@ -0,0 +1,160 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import epicsAuditLogGenerater as audit
+
+
+def note(note_id, created_at, body, system=False):
+    return SimpleNamespace(id=note_id, system=system, author={"name": "Author"}, created_at=created_at, body=body)
+
+
+def label_event(event_id, created_at, action="add"):
+    return SimpleNamespace(id=event_id, user={"name": "User"}, action=action, label={"name": "Label"}, created_at=created_at)
+
+
+class FakeGitlab:
+    '''
+    Just enough of a python-gitlab client for the audit generator
+
+    Epics live in group 1 and are keyed by IID. Their notes are listed newest first,
+    and the label events of any issue IID can be set to raise.
+    '''
+
+    def __init__(self):
+        self.epics = {}
+        self.label_events = {}
+        self.failing = set()
+        self.groups = SimpleNamespace(get=lambda group_id: SimpleNamespace(epics=SimpleNamespace(get=self.epic)))
+        self.projects = SimpleNamespace(get=lambda project_id, lazy=False: SimpleNamespace(issues=SimpleNamespace(get=self.issue)))
+
+    def add_epic(self, epic_id, issue_iids):
+        self.epics[epic_id] = {
+            "notes": [note(1, "2024-01-01T00:00:00Z", f"created epic {epic_id}", system=True)],
+            "issues": [self.new_issue(iid) for iid in issue_iids],
+        }
+        for iid in issue_iids:
+            self.label_events[iid] = [label_event(1, "2024-01-02T00:00:00Z")]
+
+    def new_issue(self, iid):
+        return SimpleNamespace(
+            id=1000 + iid, project_id=1, iid=iid, author={"name": "Author"}, created_at="2024-01-01T00:00:00Z",
+            updated_at="2024-01-02T00:00:00Z", closed_at=None, state="opened", title=f"Issue {iid}", web_url=f"https://gitlab/{iid}",
+        )
+
+    def epic(self, epic_id):
+        data = self.epics[epic_id]
+        return SimpleNamespace(
+            title=f"Epic {epic_id}", description="# Heading\ntext",
+            notes=SimpleNamespace(list=lambda **kwargs: sorted(data["notes"], key=lambda n: n.created_at, reverse=True)),
+            issues=SimpleNamespace(list=lambda **kwargs: list(data["issues"])),
+        )
+
+    def issue(self, iid, lazy=False):
+        def events(kind):
+            def list_events(**kwargs):
+                if iid in self.failing:
+                    raise RuntimeError(f"events of issue {iid} failed")
+                return list(self.label_events[iid]) if kind == "Label" else []
+            return SimpleNamespace(list=list_events)
+        return SimpleNamespace(**{manager: events(kind) for kind, manager in audit.EVENT_STREAMS.items()})
+
+
+class IncrementalAuditTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, "audit.csv")
+        self.gl = FakeGitlab()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_single(self, epic_id=2):
+        with contextlib.redirect_stdout(io.StringIO()):
+            audit.generate_audit_report(self.gl, 1, epic_id, self.output, incremental=True)
+
+    def run_combined(self, epic_ids):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            audit.generate_batch_audit(self.gl, [(1, epic_id) for epic_id in epic_ids], self.output, combined=True, incremental=True)
+        return log.getvalue()
+
+    def rows(self):
+        with open(self.output, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def state(self):
+        with open(f"{self.output}.state.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_unchanged_epic_appends_nothing(self):
+        self.gl.add_epic(2, [10, 11])
+        self.run_single()
+        first = self.rows()
+        self.run_single()
+        self.assertEqual(self.rows(), first)
+        self.assertEqual(sum(row.startswith("Linked Issue") for row in first), 2)
+
+    def test_only_new_notes_and_events_are_appended(self):
+        self.gl.add_epic(2, [10, 11])
+        self.run_single()
+        first = self.rows()
+
+        self.gl.epics[2]["notes"].append(note(2, "2024-02-01T00:00:00Z", "new comment"))
+        self.gl.epics[2]["issues"][1].updated_at = "2024-02-02T00:00:00Z"
+        self.gl.label_events[11].append(label_event(2, "2024-02-02T00:00:00Z", action="remove"))
+        self.run_single()
+
+        added = self.rows()[len(first):]
+        self.assertEqual(added, ["Comment,Author,2024-02-01T00:00:00Z,new comment,,", "Label Removed,User,2024-02-02T00:00:00Z,Label,,"])
+        issue_state = self.state()["epics"]["1:2"]["issues"][str(1011)]
+        self.assertEqual(issue_state, {"events_after": {"Label": "2024-02-02T00:00:00Z"}, "updated_at": "2024-02-02T00:00:00Z"})
+
+    def test_failed_run_adds_nothing(self):
+        self.gl.add_epic(2, [10, 11])
+        self.run_single()
+        first, state = self.rows(), self.state()
+
+        self.gl.epics[2]["notes"].append(note(2, "2024-02-01T00:00:00Z", "new comment"))
+        self.gl.epics[2]["issues"][1].updated_at = "2024-02-02T00:00:00Z"
+        self.gl.failing.add(11)
+        with self.assertRaises(RuntimeError):
+            self.run_single()
+        self.assertEqual(self.rows(), first)
+        self.assertEqual(self.state(), state)
+        self.assertFalse(os.path.exists(f"{self.output}.pending"))
+
+    def test_failed_epic_of_combined_run_is_written_once_later(self):
+        self.gl.add_epic(2, [20, 21])
+        self.gl.add_epic(3, [30, 31])
+        self.gl.failing.add(31)
+        self.assertIn("Error auditing epic 3", self.run_combined([2, 3]))
+        self.assertNotIn("1:3", self.state()["epics"])
+        self.assertFalse(any("Epic 3" in row or "epic 3" in row for row in self.rows()))
+
+        self.gl.failing.clear()
+        self.run_combined([2, 3])
+        self.run_combined([2, 3])
+        rows = self.rows()
+        for epic_id, iids in ((2, (20, 21)), (3, (30, 31))):
+            block = rows.index(f"Epic Title,,,Epic {epic_id},,")
+            self.assertEqual(rows[block + 3:block + 9], [
+                f"Epic Change,Author,2024-01-01T00:00:00Z,created epic {epic_id},,",
+                f"System Note,Author,2024-01-01T00:00:00Z,created epic {epic_id},,",
+                f"Linked Issue,Author,2024-01-01T00:00:00Z,Issue {iids[0]} (https://gitlab/{iids[0]}),2024-01-02T00:00:00Z,N/A",
+                "Label Added,User,2024-01-02T00:00:00Z,Label,,",
+                f"Linked Issue,Author,2024-01-01T00:00:00Z,Issue {iids[1]} (https://gitlab/{iids[1]}),2024-01-02T00:00:00Z,N/A",
+                "Label Added,User,2024-01-02T00:00:00Z,Label,,",
+            ])
+        self.assertEqual(len(rows), 1 + 2 * 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from httpCache import CachedSession, HttpCache, cached_response
+
+
+def response(status, body=b"", headers=None):
+    sent = requests.Response()
+    sent.status_code = status
+    sent.headers.update(headers or {})
+    sent._content = body
+    return sent
+
+
+class FakeGitlabAdapter(BaseAdapter):
+    '''
+    Answers every GET with the same page, or a 304 when the request carries its ETag
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            sent = response(304, headers={"ETag": '"v1"', "RateLimit-Remaining": "41"})
+        else:
+            sent = response(200, b'[{"iid": 1}]', {"ETag": '"v1"', "Content-Type": "application/json", "Content-Length": "12", "RateLimit-Remaining": "42"})
+        sent.request = request
+        sent.url = request.url
+        return sent
+
+    def close(self):
+        pass
+
+
+class HttpCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = HttpCache(os.path.join(self.directory, "http.sqlite"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_only_validated_responses_are_stored(self):
+        self.cache.store("https://gitlab/a", response(200, b"a"))
+        self.cache.store("https://gitlab/b", response(200, b"b", {"Last-Modified": "Fri, 01 Mar 2024 12:00:00 GMT"}))
+        self.assertIsNone(self.cache.get("https://gitlab/a"))
+        self.assertEqual(self.cache.get("https://gitlab/b")["body"], b"b")
+
+    def test_not_modified_is_rebuilt_from_the_cache(self):
+        self.cache.store("https://gitlab/issues", response(200, b"[]", {"ETag": '"v1"', "Content-Length": "2", "X-Next-Page": "2"}))
+        request = requests.Request("GET", "https://gitlab/issues").prepare()
+        rebuilt = cached_response(self.cache.get("https://gitlab/issues"), request, response(304, headers={"X-Next-Page": "3"}))
+        self.assertEqual((rebuilt.status_code, rebuilt.json(), rebuilt.headers["X-Next-Page"]), (200, [], "3"))
+        self.assertNotIn("Content-Length", rebuilt.headers)
+        self.assertTrue(rebuilt.from_cache)
+
+    def test_session_revalidates_cached_pages(self):
+        adapter = FakeGitlabAdapter()
+        session = CachedSession(self.cache)
+        session.mount("https://", adapter)
+
+        first = session.get("https://gitlab/api/v4/projects/1/issues")
+        second = session.get("https://gitlab/api/v4/projects/1/issues")
+        self.assertNotIn("If-None-Match", adapter.requests[0].headers)
+        self.assertEqual(adapter.requests[1].headers["If-None-Match"], '"v1"')
+        self.assertEqual((second.status_code, second.json(), second.headers["RateLimit-Remaining"]), (200, [{"iid": 1}], "41"))
+        self.assertFalse(getattr(first, "from_cache", False))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from httpCassette import RECORD, REPLAY, Cassette, request_key
+
+
+def prepared(url, method="GET", token="secret-token", body=None):
+    return requests.Request(method, url, headers={"PRIVATE-TOKEN": token}, data=body).prepare()
+
+
+def response(status, body, headers=None):
+    recorded = requests.Response()
+    recorded.status_code = status
+    recorded.reason = "OK"
+    recorded.headers.update(headers or {})
+    recorded._content = body.encode("utf-8")
+    return recorded
+
+
+class RequestKeyTest(unittest.TestCase):
+
+    def test_watermark_is_left_out(self):
+        first = prepared("https://gitlab/api/v4/projects/1/issues?per_page=100&updated_after=2024-01-01T00%3A00%3A00Z&page=2")
+        second = prepared("https://gitlab/api/v4/projects/1/issues?per_page=100&updated_after=2024-02-01T00%3A00%3A00Z&page=2")
+        self.assertEqual(request_key(first), request_key(second))
+        self.assertEqual(request_key(first), "GET https://gitlab/api/v4/projects/1/issues?per_page=100&page=2 ")
+
+    def test_other_params_and_bodies_are_kept(self):
+        page_one = prepared("https://gitlab/api/v4/projects/1/issues?page=1")
+        page_two = prepared("https://gitlab/api/v4/projects/1/issues?page=2")
+        self.assertNotEqual(request_key(page_one), request_key(page_two))
+        post_a = prepared("https://gitlab/api/v4/projects/1/issues", method="POST", body={"title": "a"})
+        post_b = prepared("https://gitlab/api/v4/projects/1/issues", method="POST", body={"title": "b"})
+        self.assertNotEqual(request_key(post_a), request_key(post_b))
+
+    def test_custom_ignored_params(self):
+        first = prepared("https://gitlab/api/v4/issues?created_before=2024-01-01&state=opened")
+        second = prepared("https://gitlab/api/v4/issues?created_before=2024-01-02&state=opened")
+        self.assertNotEqual(request_key(first), request_key(second))
+        self.assertEqual(request_key(first, ("created_before",)), request_key(second, ("created_before",)))
+
+    def test_token_is_never_part_of_the_key(self):
+        self.assertEqual(request_key(prepared("https://gitlab/api/v4/user", token="a")), request_key(prepared("https://gitlab/api/v4/user", token="b")))
+        self.assertNotIn("secret-token", request_key(prepared("https://gitlab/api/v4/user")))
+
+
+class CassetteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "run.cassette.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replays_recorded_responses_in_order(self):
+        recording = Cassette(self.path, mode=RECORD)
+        url = "https://gitlab/api/v4/projects/1/issues/5?updated_after=2024-01-01"
+        recording.record(prepared(url), response(200, '{"state": "opened"}', {"X-Total": "1", "Content-Length": "19"}))
+        recording.record(prepared(url), response(200, '{"state": "closed"}'))
+        recording.save()
+
+        replay = Cassette(self.path, mode=REPLAY)
+        next_run = prepared("https://gitlab/api/v4/projects/1/issues/5?updated_after=2024-02-01")
+        first = replay.play(next_run)
+        self.assertEqual((first.status_code, first.json(), first.headers["x-total"]), (200, {"state": "opened"}, "1"))
+        self.assertNotIn("Content-Length", first.headers)
+        self.assertEqual(replay.play(next_run).json(), {"state": "closed"})
+        self.assertEqual(replay.play(next_run).json(), {"state": "closed"})
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            self.assertNotIn("secret-token", file.read())
+
+    def test_unrecorded_request_is_a_connection_error(self):
+        Cassette(self.path, mode=RECORD).save()
+        replay = Cassette(self.path, mode=REPLAY)
+        with self.assertRaises(requests.ConnectionError):
+            replay.play(prepared("https://gitlab/api/v4/projects/2"))
+        self.assertEqual(replay.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
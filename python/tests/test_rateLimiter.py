@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import sys
+import time
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rateLimiter import RateLimiter
+
+
+def response(status, headers=None):
+    sent = requests.Response()
+    sent.status_code = status
+    sent.headers.update(headers or {})
+    sent._content = b""
+    sent._content_consumed = True
+    return sent
+
+
+class BackoffTest(unittest.TestCase):
+
+    def test_retry_after_is_honoured(self):
+        delay = RateLimiter().backoff_delay(response(429, {"Retry-After": "4"}), attempt=0)
+        self.assertTrue(4 <= delay <= 6)
+
+    def test_reset_time_is_used_without_retry_after(self):
+        limiter = RateLimiter()
+        limiter.reset_at = time.time() + 10
+        self.assertTrue(9 <= limiter.backoff_delay(response(429), attempt=0) <= 15)
+
+    def test_exponential_backoff_is_capped(self):
+        limiter = RateLimiter(base_backoff=1.0, max_backoff=5.0)
+        self.assertTrue(4 <= limiter.backoff_delay(response(429), attempt=2) <= 6)
+        self.assertTrue(5 <= limiter.backoff_delay(response(429), attempt=10) <= 7.5)
+        self.assertTrue(5 <= limiter.backoff_delay(response(429, {"Retry-After": "3600"}), attempt=0) <= 7.5)
+
+
+class ExecuteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(max_concurrency=4, max_retries=2, base_backoff=0.001, max_backoff=0.001)
+
+    def execute(self, send):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.limiter.execute(send)
+
+    def test_retries_until_not_throttled(self):
+        responses = [response(429), response(429), response(200)]
+        self.assertEqual(self.execute(lambda: responses.pop(0)).status_code, 200)
+        self.assertEqual(responses, [])
+        self.assertEqual(self.limiter.throttled, 2)
+        self.assertEqual(self.limiter.concurrency, 2)  # Halved twice, grown back by the 200
+
+    def test_gives_up_after_max_retries(self):
+        sent = []
+        result = self.execute(lambda: sent.append(1) or response(429))
+        self.assertEqual(result.status_code, 429)
+        self.assertEqual(len(sent), 3)
+
+    def test_budget_is_read_from_headers(self):
+        self.limiter.execute(lambda: response(200, {"RateLimit-Limit": "600", "RateLimit-Remaining": "42", "RateLimit-Reset": "1700000000"}))
+        self.assertEqual((self.limiter.limit, self.limiter.remaining, self.limiter.reset_at), (600, 42, 1700000000))
+
+
+if __name__ == "__main__":
+    unittest.main()
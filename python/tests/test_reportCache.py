@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reportCache import ReportCache, item_key
+
+
+class FakeIssue:
+
+    def __init__(self, manager, attributes):
+        self.manager = manager
+        self.attributes = attributes
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["attributes"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeIssueManager:
+    '''
+    project.issues that honours updated_after and records the parameters of every listing
+    '''
+
+    _obj_cls = FakeIssue
+
+    def __init__(self):
+        self.issues = {}
+        self.listings = []
+
+    def put(self, iid, updated_at):
+        self.issues[iid] = {"iid": iid, "project_id": 1, "updated_at": updated_at, "title": f"Issue {iid} at {updated_at}"}
+
+    def list(self, **params):
+        self.listings.append(params)
+        after = params.get("updated_after", "")
+        return iter([FakeIssue(self, dict(data)) for data in self.issues.values() if data["updated_at"] > after])
+
+
+class ReportCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ReportCache(os.path.join(self.directory, "cache.sqlite"))
+        self.project = SimpleNamespace(id=1, issues=FakeIssueManager())
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def sync(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.cache.sync_issues(self.project)
+
+    def test_sync_only_fetches_what_changed_since_the_watermark(self):
+        self.project.issues.put(1, "2024-03-01T00:00:00Z")
+        self.project.issues.put(2, "2024-03-02T00:00:00Z")
+        self.assertFalse(self.cache.has_synced(self.project))
+        self.assertEqual([issue.iid for issue in self.sync()], [2, 1])
+        self.assertNotIn("updated_after", self.project.issues.listings[0])
+        self.assertTrue(self.cache.has_synced(self.project))
+
+        self.project.issues.put(1, "2024-03-05T00:00:00Z")
+        issues = self.sync()
+        self.assertEqual(self.project.issues.listings[1]["updated_after"], "2024-03-02T00:00:00Z")
+        self.assertEqual({issue.iid: issue.updated_at for issue in issues}, {1: "2024-03-05T00:00:00Z", 2: "2024-03-02T00:00:00Z"})
+
+        self.sync()
+        self.assertEqual(self.project.issues.listings[2]["updated_after"], "2024-03-05T00:00:00Z")
+
+    def test_details_are_refetched_once_the_item_changes(self):
+        self.project.issues.put(1, "2024-03-01T00:00:00Z")
+        issue = self.sync()[0]
+        self.assertEqual(item_key(issue), ("project:1", "issue", 1))
+        fetches = []
+        fetch = lambda: fetches.append(1) or {"notes": len(fetches)}
+
+        self.assertEqual(self.cache.cached(issue, "latest_note", fetch), {"notes": 1})
+        self.assertEqual(self.cache.cached(issue, "latest_note", fetch), {"notes": 1})
+        issue.attributes["updated_at"] = "2024-03-02T00:00:00Z"
+        self.assertEqual(self.cache.cached(issue, "latest_note", fetch), {"notes": 2})
+        self.assertEqual(self.cache.fresh(issue, "related_issues", fetch), {"notes": 3})
+        self.assertEqual(self.cache.fresh(issue, "related_issues", fetch), {"notes": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
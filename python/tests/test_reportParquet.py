@@ -0,0 +1,96 @@
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reportParquet import ParquetDictWriter, open_report_dataset, to_date, to_int, to_timestamp
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COLUMN_TYPES = {"ID": "int", "Created": "date", "Updated": "timestamp"}
+
+
+class ConverterTest(unittest.TestCase):
+
+    def test_converters(self):
+        self.assertEqual(to_int("42"), 42)
+        self.assertIsNone(to_int("N/A"))
+        self.assertEqual(to_date("03-01-2024"), datetime.date(2024, 3, 1))
+        self.assertEqual(to_date("2024-03-01T12:00:00.000Z"), datetime.date(2024, 3, 1))
+        self.assertIsNone(to_date("soon"))
+        self.assertEqual(to_timestamp("2024-03-01T12:30:00.000Z"), datetime.datetime(2024, 3, 1, 12, 30, tzinfo=datetime.timezone.utc))
+        self.assertIsNone(to_timestamp(""))
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class ParquetDictWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dataset)
+
+    def write(self, run_date, fieldnames, rows):
+        writer = ParquetDictWriter(self.dataset, fieldnames, column_types=COLUMN_TYPES, run_date=run_date)
+        writer.writeheader()
+        writer.writerows(rows)
+        writer.close()
+        return writer.path
+
+    def test_typed_columns(self):
+        path = self.write("2024-03-01", ["ID", "Created", "Updated", "Title"], [
+            {"ID": "7", "Created": "03-01-2024", "Updated": "2024-03-01T12:00:00.000Z", "Title": "First"},
+            {"ID": "N/A", "Created": "", "Updated": "N/A", "Title": None},
+        ])
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual([str(field.type) for field in table.schema], ["int64", "date32[day]", "timestamp[ms, tz=UTC]", "string"])
+        self.assertEqual(table.column("ID").to_pylist(), [7, None])
+        self.assertEqual(table.column("Created").to_pylist(), [datetime.date(2024, 3, 1), None])
+        self.assertEqual(table.column("Title").to_pylist(), ["First", ""])
+
+    def test_all_missing_day_keeps_declared_types(self):
+        path = self.write("2024-03-02", ["ID", "Created", "Updated"], [{"ID": "N/A", "Created": "N/A", "Updated": "N/A"}])
+        schema = pyarrow.parquet.read_schema(path)
+        self.assertEqual([str(field.type) for field in schema], ["int64", "date32[day]", "timestamp[ms, tz=UTC]"])
+
+    def test_runs_with_different_columns_read_together(self):
+        first = self.write("2024-03-01", ["ID", "Title", "Summary"], [{"ID": "1", "Title": "One", "Summary": "Old section"}])
+        self.write("2024-03-02", ["ID", "Title", "Risks"], [{"ID": "N/A", "Title": "Two", "Risks": "New section"}])
+        with open(first, "rb") as file:
+            before = file.read()
+
+        rows = open_report_dataset(self.dataset).to_table().sort_by("run_date").to_pylist()
+        self.assertEqual(rows, [
+            {"ID": 1, "Title": "One", "Summary": "Old section", "Risks": None, "run_date": "2024-03-01"},
+            {"ID": None, "Title": "Two", "Summary": None, "Risks": "New section", "run_date": "2024-03-02"},
+        ])
+        with open(first, "rb") as file:
+            self.assertEqual(file.read(), before)
+
+    def test_rerun_replaces_the_days_file(self):
+        self.write("2024-03-01", ["ID"], [{"ID": "1"}])
+        self.write("2024-03-01", ["ID"], [{"ID": "2"}])
+        self.assertEqual(open_report_dataset(self.dataset).to_table().column("ID").to_pylist(), [2])
+
+    def test_abort_leaves_the_dataset_as_it_was(self):
+        self.write("2024-03-01", ["ID"], [{"ID": "1"}])
+        for run_date in ("2024-03-01", "2024-03-02"):
+            writer = ParquetDictWriter(self.dataset, ["ID"], column_types=COLUMN_TYPES, run_date=run_date)
+            writer.writerow({"ID": "2"})
+            writer.flush()
+            writer.abort()
+        self.assertEqual(sorted(os.listdir(self.dataset)), ["run_date=2024-03-01"])
+        self.assertEqual(len(os.listdir(os.path.join(self.dataset, "run_date=2024-03-01"))), 1)
+        self.assertEqual(open_report_dataset(self.dataset).to_table().column("ID").to_pylist(), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reportQuery import build_issue_query, iter_items, matches_labels, matches_params
+
+
+def issue(state="opened", created_at="2024-03-01T12:00:00.000Z", labels=()):
+    return SimpleNamespace(state=state, created_at=created_at, labels=list(labels))
+
+
+class FakeManager:
+
+    def __init__(self, path):
+        self._path = path
+        self.params = None
+
+    def list(self, **params):
+        self.params = params
+        return iter(["item"])
+
+
+class BuildIssueQueryTest(unittest.TestCase):
+
+    def test_config_filters(self):
+        params, label_filters = build_issue_query({"state": "opened", "fromDate": "03-01-2024", "toDate": "03-31-2024", "labels": ["Type::"]})
+        self.assertEqual(params, {
+            "per_page": 100, "state": "opened", "created_after": "2024-03-01T00:00:00Z",
+            "created_before": "2024-03-31T00:00:00Z", "labels": "Any",
+        })
+        self.assertEqual(label_filters, {"Type::"})
+
+    def test_unset_state_and_exact_labels(self):
+        for state in (None, "", "None"):
+            params, label_filters = build_issue_query({"state": state, "labels": ["Type::"]}, exact_labels=["CR::12", "Team A"])
+            self.assertEqual(params, {"per_page": 100, "labels": "CR::12,Team A"})
+            self.assertEqual(label_filters, set())
+
+
+class MatchesTest(unittest.TestCase):
+
+    def test_matches_params_agrees_with_the_query(self):
+        params, _ = build_issue_query({"state": "opened", "fromDate": "03-01-2024", "toDate": "03-31-2024", "labels": ["Type::"]})
+        self.assertTrue(matches_params(issue(labels=["Type::Bug"]), params))
+        self.assertFalse(matches_params(issue(labels=[]), params))
+        self.assertFalse(matches_params(issue(state="closed", labels=["Type::Bug"]), params))
+        self.assertFalse(matches_params(issue(created_at="2024-02-29T23:59:59Z", labels=["Type::Bug"]), params))
+        self.assertFalse(matches_params(issue(created_at="2024-03-31T00:00:01Z", labels=["Type::Bug"]), params))
+
+    def test_matches_params_exact_labels(self):
+        params, _ = build_issue_query({}, exact_labels=["CR::12", "Team A"])
+        self.assertTrue(matches_params(issue(state="closed", labels=["CR::12", "Team A", "Other"]), params))
+        self.assertFalse(matches_params(issue(labels=["CR::123", "Team A"]), params))
+
+    def test_matches_labels(self):
+        item = issue(labels=["Type::Bug", "Priority::High"])
+        self.assertTrue(matches_labels(item, set()))
+        self.assertTrue(matches_labels(item, {"Bug", "Missing"}))
+        self.assertFalse(matches_labels(item, {"Bug", "Missing"}, require_all=True))
+        self.assertFalse(matches_labels(issue(), {"Bug"}))
+
+
+class IterItemsTest(unittest.TestCase):
+
+    def test_issue_endpoints_page_by_offset(self):
+        manager = FakeManager("/projects/1/issues")
+        self.assertEqual(list(iter_items(manager, state="opened")), ["item"])
+        self.assertEqual(manager.params, {"iterator": True, "per_page": 100, "order_by": "created_at", "sort": "desc", "state": "opened"})
+
+    def test_keyset_endpoints_use_their_order(self):
+        manager = FakeManager("/projects")
+        list(iter_items(manager, order_by="name"))
+        self.assertEqual(manager.params, {"iterator": True, "per_page": 100, "pagination": "keyset", "order_by": "id"})
+
+
+if __name__ == "__main__":
+    unittest.main()
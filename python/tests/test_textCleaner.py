@@ -0,0 +1,27 @@
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from textCleaner import CleaningDictWriter, clean_basic_text, clean_text
+
+
+class CleaningDictWriterTest(unittest.TestCase):
+
+    def test_header_is_written_unchanged(self):
+        for cleaner in (clean_text, clean_basic_text):
+            output = io.StringIO()
+            writer = CleaningDictWriter(output, ["a_b_c", "None", "x"], cleaner, lineterminator="\n")
+            writer.writeheader()
+            self.assertEqual(output.getvalue(), "a_b_c,None,x\n")
+
+    def test_rows_are_cleaned(self):
+        output = io.StringIO()
+        writer = CleaningDictWriter(output, ["a", "b"], clean_text, lineterminator="\n")
+        writer.writerow({"a": "N/A", "b": None})
+        self.assertEqual(output.getvalue(), ",\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import csv
+import functools
+import os
+import re
+
+# Cells pd.read_csv(dtype=str) turned into NaN, which the old read-back cleaners then blanked
+PANDAS_NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+class TextCleaner:
+    '''
+    Precompiled text normalization used on every report cell
+
+    Steps run in order. Each step is (guards, pattern, replacement); guards are
+    lowercase substrings the pattern cannot match without, so the regex only runs on
+    cells that could contain a match. Neighbouring removals are fused into a single
+    alternation so they cost one pass. Results are memoized per distinct value.
+
+        Parameters:
+            steps: (guards, compiled pattern, replacement) tuples
+            checked_step: Index of the step before which checked checkboxes are collected,
+                          None to leave checkboxes in the text
+            cache_size: Number of distinct cleaned values kept
+    '''
+
+    CHECKED = re.compile(r"- \[x\] (.+)")
+
+    def __init__(self, steps, checked_step=None, cache_size=4096):
+        self.steps = steps
+        self.checked_step = checked_step
+        # Status, label, date and "N/A" cells repeat row after row, so each distinct value is cleaned once
+        self._clean = functools.lru_cache(maxsize=cache_size)(self._clean_uncached)
+
+    def __call__(self, text):
+        if text is None:
+            return ""
+        return self._clean(text)
+
+    def _clean_uncached(self, text):
+        text = text.replace("\u00A0", " ").replace("\r", "").strip()  # Normalize spaces & line endings
+        lowered = text.lower()
+        checked = None
+        for index, (guards, pattern, replacement) in enumerate(self.steps):
+            if index == self.checked_step and "- [x]" in text:
+                checked = self.CHECKED.findall(text)  # Extract only checked items
+            for guard in guards:
+                if guard in lowered:
+                    text = pattern.sub(replacement, text)
+                    lowered = text.lower()
+                    break
+        if checked:
+            return ", ".join(checked).strip()  # Keep checked items as a comma-separated string
+        return text.strip()
+
+
+# Comments and the "Insert date here:" placeholder are both dropped, so they share one pass
+COMMENTS_AND_DATE_PLACEHOLDER = (("<!--", "`"), re.compile(r"<!--[\s\S]*?-->|(?i:`Insert\s*date\s*here:`\s*)"), "")
+UNCHECKED_BOXES = (("- [",), re.compile(r"- \[\s?\] .*", re.IGNORECASE), "")
+UNDERSCORE_EMPHASIS = (("_",), re.compile(r"_([\w\s()]+)_"), r"\1")
+BACKTICK_DATES = (("`",), re.compile(r"`(\d{2}-\d{2}-\d{4})`"), r"\1")
+# " \" line continuations and the "Enter Text here" placeholder, again both dropped
+CONTINUATIONS_AND_TEXT_PLACEHOLDER = ((" \\", "enter text here"), re.compile(r" \\|(?i:Enter Text here)"), "")
+BACKTICK_WORDS = (("`",), re.compile(r"`([\w\s,]+)`"), r"\1")
+BRD_HEADINGS = (("##",), re.compile(r"^##\s*(.*)", re.MULTILINE), r"<b>\1</b><br/>")
+BRD_SECTION_BREAKS = (("<b>",), re.compile(r"(<b>.*?</b><br/>(.*?))(?=(<b>|$))", re.DOTALL), r"\1<br/><br/>")
+
+# issueReportGenerater and 321issueReportGenerater
+clean_basic_text = TextCleaner([
+    COMMENTS_AND_DATE_PLACEHOLDER,
+    BACKTICK_WORDS,
+    UNDERSCORE_EMPHASIS,
+    UNCHECKED_BOXES,
+])
+
+# issuesReportGenerater, epicsReportGenerater and relatedLinksReport
+clean_text = TextCleaner([
+    COMMENTS_AND_DATE_PLACEHOLDER,
+    UNCHECKED_BOXES,
+    UNDERSCORE_EMPHASIS,
+    BACKTICK_DATES,
+    CONTINUATIONS_AND_TEXT_PLACEHOLDER,
+    BACKTICK_WORDS,
+], checked_step=1)
+
+# crReportGenerater, which also turns "##" headings into bold PDF markup
+clean_brd_text = TextCleaner([
+    BRD_HEADINGS,
+    BRD_SECTION_BREAKS,
+    COMMENTS_AND_DATE_PLACEHOLDER,
+    UNCHECKED_BOXES,
+    UNDERSCORE_EMPHASIS,
+    BACKTICK_DATES,
+    CONTINUATIONS_AND_TEXT_PLACEHOLDER,
+    BACKTICK_WORDS,
+], checked_step=3)
+
+
+def clean_cell(value, cleaner):
+    """Cleans one CSV value the way the old write, pd.read_csv, applymap, rewrite round trip did."""
+    if value is None:
+        return ""
+    value = str(value)
+    if value in PANDAS_NA_VALUES:
+        return ""
+    return cleaner(value)
+
+
+class CleaningDictWriter(csv.DictWriter):
+    '''
+    csv.DictWriter that cleans every value as the row is written
+
+    Replaces writing a report and then reading it back with pandas to clean it.
+    Lines end with os.linesep like the pandas rewrite did.
+
+        Parameters:
+            csv_file: Open file to write to
+            fieldnames: Column names, written unchanged by writeheader
+            cleaner: TextCleaner applied to each value
+    '''
+
+    def __init__(self, csv_file, fieldnames, cleaner=clean_text, **kwargs):
+        kwargs.setdefault("lineterminator", os.linesep)
+        super().__init__(csv_file, fieldnames=fieldnames, **kwargs)
+        self.cleaner = cleaner
+
+    def writeheader(self):
+        # csv.DictWriter.writeheader goes through writerow, which would clean the column names
+        return csv.DictWriter.writerow(self, dict(zip(self.fieldnames, self.fieldnames)))
+
+    def clean_row(self, row):
+        return {key: clean_cell(value, self.cleaner) for key, value in row.items()}
+
+    def writerow(self, rowdict):
+        return super().writerow(self.clean_row(rowdict))
+
+    def writerows(self, rowdicts):
+        return super().writerows(self.clean_row(row) for row in rowdicts)